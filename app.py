@@ -1,15 +1,122 @@
-from flask import Flask, send_file, request
+from flask import Flask, send_file, request, Response, stream_with_context
+import os
+import io
+import sys
+import hmac
 import json
+import base64
+import mimetypes
+import signal
+import argparse
+from typing import Optional
 
 from src.modules.camera_manager import CameraManager
 from src.modules.config_handler import ConfigHandler
 from src.modules.capture_handler import CaptureHandler
+from src.modules.card_handler import CardHandler
+from src.modules.thumbnail_handler import ThumbnailHandler
+from src.modules.camera_worker import CameraWorker
+from src.modules.camera_supervisor import CameraSupervisor
+from src.modules.liveview_publisher import FramePublisher
+from src.modules.sequence_handler import SequenceHandler
+from src.modules.focus_handler import FocusHandler
+from src.modules.job_manager import JobManager
+from src.modules.batch_runner import BatchRunner, BATCH_OPERATIONS, PATH_PARAMETERS
+from src.modules.image_variants import ImageVariantService
+from src.utils.event_broadcaster import EventBroadcaster
+from src.utils.flight_recorder import FlightRecorder
+from src.utils.single_flight import SingleFlight
+from src.utils.profiler import Profiler
 
 app = Flask(__name__)
 
-camera_manager = CameraManager()
-camera_capture = CaptureHandler(camera_manager)
-config_handler = ConfigHandler(camera_manager)
+# Components are built by create_app(), never at import time: spawned camera workers, supervisor workers and
+# render processes import this module again (as __mp_main__ when the server runs as a script), and starting a
+# process while the child is still bootstrapping fails.
+camera_manager = None
+camera_capture = None
+config_handler = None
+card_handler = None
+thumbnail_handler = None
+sequence_handler = None
+focus_handler = None
+worker_recorder = None
+camera_profiler = None
+camera_supervisor = None
+event_broadcaster = None
+job_manager = None
+image_variants = None
+batch_runner = None
+liveview_publisher = None
+
+
+def create_app(config_path: Optional[str] = None) -> Flask:
+    """
+    Build the camera components and return the Flask application. Later calls return the same application.
+
+    WSGI servers load it with ``gunicorn "app:create_app()"``; ``python app.py`` calls it before serving.
+
+    :param config_path: Configuration file. Defaults to config.yaml next to this file.
+    :return: The Flask application.
+    """
+    global camera_manager, camera_capture, config_handler, card_handler, thumbnail_handler, sequence_handler, \
+        focus_handler, worker_recorder, camera_profiler, camera_supervisor, event_broadcaster, job_manager, \
+        image_variants, batch_runner
+    if camera_manager is not None:
+        return app
+
+    manager = CameraManager(config_path)
+    settings = manager.get_config()
+    # Defer gphoto2, the camera worker, save directories and settings until first use or /api/warmup
+    lazy_init = settings.get('general', {}).get('lazy_init', False)
+    events_config = settings.get('events', {})
+    event_broadcaster = EventBroadcaster(buffer_size=events_config.get('buffer_size', 1024),
+                                         heartbeat=events_config.get('heartbeat', 15.0))
+
+    if settings.get('worker', {}).get('enabled'):
+        # Run the gphoto2 session in a supervised child process so that a hung call cannot wedge the server
+        camera_worker = CameraWorker(settings, config_path)
+        camera_worker.add_event_listener(event_broadcaster.publish)
+        if not lazy_init:
+            camera_worker.start()
+        camera_manager = camera_worker.get_proxy("camera_manager")
+        camera_capture = camera_worker.get_proxy("capture_handler")
+        config_handler = camera_worker.get_proxy("config_handler")
+        card_handler = camera_worker.get_proxy("card_handler")
+        thumbnail_handler = camera_worker.get_proxy("thumbnail_handler")
+        sequence_handler = camera_worker.get_proxy("sequence_handler")
+        focus_handler = camera_worker.get_proxy("focus_handler")
+        worker_recorder = camera_worker.get_proxy("flight_recorder")
+        # The camera operations run in the worker, so that is the process to profile
+        camera_profiler = camera_worker.get_proxy("profiler")
+    else:
+        manager.add_event_listener(event_broadcaster.publish)
+        camera_manager = manager
+        camera_capture = CaptureHandler(manager)
+        config_handler = ConfigHandler(manager)
+        card_handler = CardHandler(manager)
+        thumbnail_handler = ThumbnailHandler(manager)
+        sequence_handler = SequenceHandler(manager, config_handler, camera_capture)
+        focus_handler = FocusHandler(manager, config_handler, camera_capture)
+        worker_recorder = None
+        camera_profiler = Profiler.get_instance()
+
+    if settings.get('supervisor', {}).get('enabled'):
+        # Multi-camera rigs: cameras are sharded across worker processes and driven through /api/cameras
+        camera_supervisor = CameraSupervisor(settings, config_path)
+        camera_supervisor.add_event_listener(event_broadcaster.publish)
+        if not lazy_init:
+            camera_supervisor.start()
+
+    job_manager = JobManager(max_history=settings.get('jobs', {}).get('max_history', 1000))
+    # Resized renditions are rendered in this process's pool, next to the HTTP server rather than the camera session
+    image_variants = ImageVariantService.from_config(settings)
+    batch_runner = BatchRunner({"camera_manager": camera_manager, "config_handler": config_handler,
+                                "capture_handler": camera_capture, "card_handler": card_handler,
+                                "thumbnail_handler": thumbnail_handler, "sequence_handler": sequence_handler,
+                                "focus_handler": focus_handler})
+    return app
+
 
 config = {
     'iso': None,
@@ -28,6 +135,17 @@ def connect_to_cam():
     return json.dumps(result)
 
 
+@app.route('/api/warmup', methods=['GET', 'POST'])
+def warm_up():
+    results = {
+        "camera_manager": camera_manager.warm_up(),
+        "capture_handler": camera_capture.warm_up(),
+        "config_handler": config_handler.warm_up(),
+    }
+    success = all(result["success"] for result in results.values())
+    return json.dumps({"success": success, "data": results, "message": "Warm-up finished."})
+
+
 @app.route('/api/disconnect')
 def disconnect_from_cam():
     result = camera_manager.disconnect_camera()
@@ -60,32 +178,532 @@ def test_camera():
         return json.dumps({"status": "error", "message": "Camera is not connected."})
 
 
-@app.route('/api/capture')
+def check_written(result, wait_for_file):
+    """Turns a capture whose file could not be written (write-behind) into a failed result."""
+    save_path = (result.get("data") or {}).get("save_path") if result["success"] else None
+    if save_path and wait_for_file(save_path) is not True:
+        return {"success": False, "data": result["data"], "message": f"Image could not be written to {save_path}."}
+    return result
+
+
+def run_capture_job():
+    if not camera_manager.is_connected:
+        return {"success": False, "data": {}, "message": "Camera is not connected."}
+    if not camera_capture.wait_until_ready():
+        return {"success": False, "data": {}, "message": "Camera is not ready."}
+    result = camera_capture.capture_image()
+    result = check_written(result, camera_capture.wait_for_file)
+    event_broadcaster.publish("capture_complete" if result["success"] else "error",
+                              {"operation": "capture", **(result.get("data") or {}), "message": result["message"]})
+    return result
+
+
+@app.route('/api/capture', methods=['GET', 'POST'])
 def capture_photo():
-    global result
-    if camera_manager.is_connected and camera_capture.wait_until_ready():
-        result = camera_capture.capture_image()
-        return json.dumps({"status": "success", "message": "Photo captured successfully."})
-    else:
-        return json.dumps({"status": "error", "message": "Camera is not connected."})
+    if not camera_manager.is_connected:
+        return json.dumps({"status": "error", "message": "Camera is not connected."}), 409
+    job = job_manager.submit("capture", run_capture_job)
+    return json.dumps({"status": "accepted", "job_id": job["job_id"],
+                       "status_url": f"/api/jobs/{job['job_id']}"}), 202
+
+
+@app.route('/api/jobs')
+def list_jobs():
+    jobs = job_manager.list_jobs(kind=request.args.get('kind'), status=request.args.get('status'),
+                                 limit=request.args.get('limit', 50, type=int))
+    return json.dumps({"jobs": jobs, "queued": job_manager.get_queue_length()})
+
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    wait = min(request.args.get('wait', 0, type=float), 60)
+    job = job_manager.wait(job_id, wait) if wait > 0 else job_manager.get(job_id)
+    if job is None:
+        return json.dumps({"status": "error", "message": f"Unknown job {job_id}."}), 404
+    return json.dumps(job)
+
+
+@app.route('/api/jobs/<job_id>/file')
+def get_job_file(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return json.dumps({"status": "error", "message": f"Unknown job {job_id}."}), 404
+    if job["status"] != JobManager.STATUS_SUCCEEDED or not (job["result"].get("data") or {}).get("save_path"):
+        return json.dumps({"status": job["status"], "message": "Job has no downloaded file."}), 409
+    # The storage writer may still be flushing the file to disk
+    if not camera_capture.wait_for_file(job["result"]["data"]["save_path"]):
+        return json.dumps({"status": job["status"], "message": "File is not written yet."}), 503
+    # Flask resolves relative paths against the application directory, not the working directory
+    path = os.path.abspath(job["result"]["data"]["save_path"])
+    return send_file(path_or_file=path, mimetype=file_mimetype(path))
+
 
 @app.route('/api/get_photos')
 def get_photos():
-    global result
+    job_id = request.args.get('job')
+    if job_id is None:
+        # Without a job ID, return the most recent successful capture
+        latest = job_manager.list_jobs(kind="capture", status=JobManager.STATUS_SUCCEEDED, limit=1)
+        if not latest:
+            return json.dumps({"status": "error", "message": "No photo has been captured yet."}), 404
+        job_id = latest[0]["job_id"]
+    return get_job_file(job_id)
+
+
+def get_supervisor():
+    if camera_supervisor is None:
+        return None
+    if not camera_supervisor.is_running():
+        camera_supervisor.start()
+    return camera_supervisor
+
+
+def capture_on_camera(port):
+    ready = camera_supervisor.call(port, "capture_handler", "wait_until_ready")
+    if ready is not True:
+        return {"success": False, "data": {}, "message": "Camera is not ready."}
+    result = camera_supervisor.call(port, "capture_handler", "capture_image")
+    result = check_written(result, lambda path: camera_supervisor.call(port, "capture_handler", "wait_for_file", path))
+    event_broadcaster.publish("capture_complete" if result["success"] else "error",
+                              {"operation": "capture", "camera": port, **(result.get("data") or {}),
+                               "message": result["message"]})
+    return result
+
+
+def run_multi_capture_job(ports):
+    results = camera_supervisor.map(capture_on_camera, ports)
+    success = bool(results) and all(result["success"] for result in results.values())
+    failed = [port for port, result in results.items() if not result["success"]]
+    message = "All cameras captured." if success else f"Capture failed on: {', '.join(failed) or 'no cameras'}"
+    return {"success": success, "data": {"results": results}, "message": message}
+
+
+@app.route('/api/cameras')
+def list_cameras():
+    supervisor = get_supervisor()
+    if supervisor is None:
+        return json.dumps({"status": "error", "message": "Camera supervisor is not enabled."}), 409
+    return json.dumps({"cameras": supervisor.list_cameras()})
+
+
+@app.route('/api/cameras/capture', methods=['GET', 'POST'])
+def capture_cameras():
+    supervisor = get_supervisor()
+    if supervisor is None:
+        return json.dumps({"status": "error", "message": "Camera supervisor is not enabled."}), 409
+    # ?camera=<port> may be repeated; without it every camera captures
+    ports = request.args.getlist('camera') or [camera["port"] for camera in supervisor.list_cameras()]
+    job = job_manager.submit("multi_capture", lambda: run_multi_capture_job(ports), params={"cameras": ports})
+    return json.dumps({"status": "accepted", "job_id": job["job_id"],
+                       "status_url": f"/api/jobs/{job['job_id']}"}), 202
+
+
+@app.route('/api/cameras/call', methods=['POST'])
+def call_camera():
+    supervisor = get_supervisor()
+    if supervisor is None:
+        return json.dumps({"status": "error", "message": "Camera supervisor is not enabled."}), 409
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not body.get("camera") or not isinstance(body.get("op"), str) \
+            or not isinstance(body.get("params", {}), dict):
+        return json.dumps({"status": "error",
+                           "message": "A camera, an operation (op) and optional params object are required."}), 400
+    if body["op"] not in BATCH_OPERATIONS:
+        return json.dumps({"status": "error", "message": f"Unknown operation '{body['op']}'.",
+                           "operations": sorted(BATCH_OPERATIONS)}), 400
+    refused = sorted(PATH_PARAMETERS.intersection(body.get("params") or {}))
+    if refused:
+        return json.dumps({"status": "error", "message": f"Parameter(s) {', '.join(refused)} cannot be set."}), 400
+    result = supervisor.call_operation(body["camera"], body["op"], body.get("params"))
+    return json.dumps(result, default=str)
+
+
+@app.route('/api/cameras/clone', methods=['POST'])
+def clone_camera_config():
+    supervisor = get_supervisor()
+    if supervisor is None:
+        return json.dumps({"status": "error", "message": "Camera supervisor is not enabled."}), 409
+    body = request.get_json(silent=True) or {}
+    if not body.get("source"):
+        return json.dumps({"status": "error", "message": "The port of the source camera is required."}), 400
+    result = supervisor.clone_config(body["source"], cameras=body.get("cameras"), dry_run=body.get("dry_run", False))
+    return json.dumps(result, default=str)
+
+
+@app.route('/api/supervisor/status')
+def supervisor_status():
+    if camera_supervisor is None:
+        return json.dumps({"status": "error", "message": "Camera supervisor is not enabled."}), 409
+    return json.dumps(camera_supervisor.get_status())
+
+
+def file_mimetype(path: str) -> str:
+    """Returns the mimetype of a stored capture from its extension; RAW formats are sent as binary data."""
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+@app.route('/api/images/<int:capture_id>')
+def get_image(capture_id):
+    kind = request.args.get('kind', 'capture')
+    record = camera_capture.get_capture(capture_id, kind=kind)
+    if not record["success"]:
+        return json.dumps({"status": "error", "message": record["message"]}), 404
+    capture = record["data"]
+
+    variant = image_variants.get_variant(capture["path"], capture["sha256"], request.args.get('size', 'full'),
+                                         wait_for_source=lambda: camera_capture.wait_for_file(capture["path"]))
+    if not variant["success"]:
+        return json.dumps({"status": "error", "message": variant["message"]}), 400
+
+    # Variants are content-addressed: the same ETag always means the same bytes
+    etag = variant["data"]["etag"]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif variant["data"]["width"] == "full":
+        # The original keeps its stored format (JPEG or RAW) and may still be queued in the storage writer
+        if not camera_capture.wait_for_file(capture["path"]):
+            return json.dumps({"status": "error", "message": "File is not written yet."}), 503
+        response = send_file(os.path.abspath(capture["path"]), mimetype=file_mimetype(capture["path"]),
+                             conditional=False, etag=False)
+    else:
+        response = send_file(os.path.abspath(variant["data"]["path"]), mimetype="image/jpeg", conditional=False,
+                             etag=False)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
+@app.route('/api/images/status')
+def image_variants_status():
+    return json.dumps(image_variants.get_stats())
+
+
+@app.route('/api/card/storage')
+def card_storage():
+    return json.dumps(card_handler.get_storage_info())
+
+
+@app.route('/api/coalescing')
+def coalescing_status():
+    result = {"server": SingleFlight.collect_stats()}
+    if worker_recorder is not None:
+        # Reads coalesced inside the camera worker process
+        result["worker"] = camera_manager.get_coalescing_stats()["data"]
+    return json.dumps(result)
+
+
+@app.route('/api/storage')
+def storage_status():
+    return json.dumps(camera_capture.get_storage_stats())
+
+
+@app.route('/api/card/files')
+def list_card_files():
+    result = card_handler.list_files(
+        folder=request.args.get('folder', '/'),
+        offset=request.args.get('offset', 0, type=int),
+        limit=request.args.get('limit', 100, type=int),
+        with_info=request.args.get('info', '0') == '1'
+    )
+    return json.dumps(result)
+
+
+@app.route('/api/thumbnail')
+def get_thumbnail():
+    folder, _, name = request.args.get('path', '').rpartition('/')
+    result = thumbnail_handler.get_thumbnail(folder or '/', name)
+    if not result["success"]:
+        return json.dumps(result), 404
+    return send_file(io.BytesIO(result["data"]["thumbnail"]), mimetype="image/jpeg")
+
+
+@app.route('/api/liveview/start')
+def start_liveview():
+    global liveview_publisher
+    liveview_config = camera_manager.get_config().get('liveview', {})
+    if liveview_publisher is None:
+        try:
+            liveview_publisher = FramePublisher(
+                name=liveview_config.get('shm_name', 'rcp_liveview'),
+                slot_count=liveview_config.get('slot_count', 4),
+                slot_size=liveview_config.get('slot_size', 4 * 1024 * 1024)
+            )
+        except FileExistsError as e:
+            return json.dumps({"success": False, "data": {}, "message": str(e)}), 409
+    result = liveview_publisher.start(camera_capture, interval=liveview_config.get('interval', 0.0))
+    return json.dumps(result)
+
+
+@app.route('/api/liveview/stop')
+def stop_liveview():
+    if liveview_publisher is None:
+        return json.dumps({"success": False, "data": {}, "message": "Live view is not running."})
+    return json.dumps(liveview_publisher.stop())
+
+
+@app.route('/api/liveview/status')
+def status_liveview():
+    stats = liveview_publisher.get_stats() if liveview_publisher else {"running": False}
+    return json.dumps(stats)
+
+
+@app.route('/api/liveview/session/start', methods=['GET', 'POST'])
+def start_liveview_session():
+    idle_timeout = request.args.get('idle_timeout', type=float)
+    result = camera_capture.start_liveview_session(idle_timeout=idle_timeout)
+    return json.dumps(result), 200 if result["success"] else 409
+
+
+@app.route('/api/liveview/session/stop', methods=['GET', 'POST'])
+def stop_liveview_session():
+    return json.dumps(camera_capture.stop_liveview_session())
+
+
+@app.route('/api/liveview/session')
+def status_liveview_session():
+    return json.dumps(camera_capture.get_liveview_stats())
+
+
+@app.route('/api/sequence', methods=['POST'])
+def run_sequence():
+    body = request.get_json(force=True, silent=True)
+    if not isinstance(body, dict):
+        return json.dumps({"status": "error", "message": "The request body must be a JSON object."}), 400
+    steps = body.get("steps")
+    bracket = body.get("bracket")
+    if steps is None and bracket:
+        if not isinstance(bracket, dict) or not isinstance(bracket.get("setting"), str) \
+                or not isinstance(bracket.get("offsets"), list) \
+                or not all(isinstance(offset, int) and not isinstance(offset, bool) for offset in bracket["offsets"]):
+            return json.dumps({"status": "error",
+                               "message": "bracket must have a 'setting' name and a list of integer 'offsets'."}), 400
+        steps = SequenceHandler.build_bracket(bracket["setting"], bracket["offsets"])
+    if steps is not None and (not isinstance(steps, list) or not all(isinstance(step, dict) for step in steps)):
+        return json.dumps({"status": "error", "message": "steps must be a list of objects."}), 400
+    interval = body.get("interval", 0.0)
+    if not isinstance(interval, (int, float)) or isinstance(interval, bool) or interval < 0:
+        return json.dumps({"status": "error", "message": "interval must be a non-negative number of seconds."}), 400
+    result = sequence_handler.run_sequence(steps or [], download=body.get("download", "interleaved"),
+                                           restore=body.get("restore", True), interval=interval)
+    return json.dumps(result)
+
+
+@app.route('/api/focus/auto', methods=['POST'])
+def run_autofocus():
+    body = request.get_json(force=True, silent=True) or {}
+    options = {name: body[name] for name in ("max_steps", "coarse_step", "fine_step", "roi", "settle_ms")
+               if body.get(name) is not None}
+    result = focus_handler.autofocus(**options)
+    return json.dumps(result)
+
+
+def encode_binary(value):
+    """Returns ``value`` with every bytes object replaced by its base64 text, so that it can be sent as JSON."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    if isinstance(value, dict):
+        return {key: encode_binary(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_binary(item) for item in value]
+    return value
+
+
+@app.route('/api/batch', methods=['POST'])
+def run_batch():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return json.dumps({"status": "error", "message": "The request body must be a JSON object."}), 400
     try:
-        path = result["data"]["save_path"]
-        return send_file(path_or_file=path, mimetype="image/jpeg")
-    except Exception as e:
-        return json.dumps({"status": "error", "message": "Camera is not connected."})
+        timeout = float(body.get("timeout", 60))
+    except (TypeError, ValueError):
+        timeout = -1.0
+    if not 0 <= timeout:
+        return json.dumps({"status": "error", "message": "timeout must be a non-negative number of seconds."}), 400
+    operations = body.get("operations")
+    validation = batch_runner.validate(operations)
+    if not validation["success"]:
+        return json.dumps(validation), 400
+
+    # Runs as one job: queued captures and other batches wait for it, direct camera endpoints do not
+    job = job_manager.submit("batch", lambda: encode_binary(batch_runner.run(operations)),
+                             params={"operations": [operation["op"] for operation in operations]})
+    if body.get("async", False):
+        return json.dumps({"status": "accepted", "job_id": job["job_id"],
+                           "status_url": f"/api/jobs/{job['job_id']}"}), 202
+
+    job = job_manager.wait(job["job_id"], min(timeout, 300))
+    if job["status"] not in (JobManager.STATUS_SUCCEEDED, JobManager.STATUS_FAILED):
+        return json.dumps({"status": job["status"], "job_id": job["job_id"],
+                           "status_url": f"/api/jobs/{job['job_id']}",
+                           "message": "Batch is still running."}), 202
+    return json.dumps(dict(job["result"], job_id=job["job_id"]))
+
+
+@app.route('/api/events')
+def stream_events():
+    # Last-Event-ID is sent by EventSource when it reconnects; ?last_event_id= lets other clients resume too
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    return Response(stream_with_context(event_broadcaster.stream(last_event_id)), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route('/api/events/status')
+def status_events():
+    return json.dumps(event_broadcaster.get_stats())
+
+
+@app.route('/api/recorder')
+def get_flight_recorder():
+    limit = request.args.get('limit', type=int)
+    failures_only = request.args.get('failures', '0') == '1'
+    recorder = FlightRecorder.get_instance()
+    result = {"server": {"stats": recorder.get_stats(), "records": recorder.snapshot(limit, failures_only)}}
+    if worker_recorder is not None:
+        # Operations inside the camera worker process
+        result["worker"] = {"stats": worker_recorder.get_stats(), "records": worker_recorder.snapshot(limit, failures_only)}
+    return json.dumps(result, default=str)
+
+
+@app.route('/api/recorder/dump', methods=['POST'])
+def dump_flight_recorder():
+    paths = {"server": FlightRecorder.get_instance().dump(reason="api")}
+    if worker_recorder is not None:
+        paths["worker"] = worker_recorder.dump(reason="api")
+    return json.dumps({"success": all(paths.values()), "data": paths, "message": "Flight recorder dumped."})
+
+
+def is_number(value, integer: bool = False) -> bool:
+    """Returns True if a JSON value is a number (an integer with ``integer``); booleans are not numbers."""
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) if integer else isinstance(value, (int, float))
+
+
+def check_profiling_token():
+    """Returns an error response unless the request carries the profiling token, None if it does."""
+    token = camera_manager.get_config().get('profiling', {}).get('token') or os.environ.get('RCP_PROFILING_TOKEN')
+    if not token:
+        return json.dumps({"status": "error", "message": "Profiling is disabled: no profiling token is set."}), 403
+    supplied = request.headers.get('X-Profiling-Token') or request.headers.get('Authorization', '')
+    if supplied.startswith('Bearer '):
+        supplied = supplied[len('Bearer '):]
+    if not hmac.compare_digest(supplied.strip().encode(), token.encode()):
+        return json.dumps({"status": "error", "message": "Invalid or missing profiling token."}), 401
+    return None
+
+
+@app.route('/api/profiling/start', methods=['POST'])
+def start_profiling():
+    denied = check_profiling_token()
+    if denied:
+        return denied
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        return json.dumps({"status": "error", "message": "The request body must be a JSON object."}), 400
+    operations = body.get("operations", 10)
+    if not is_number(operations, integer=True) or operations < 1:
+        return json.dumps({"status": "error", "message": "operations must be a positive integer."}), 400
+    interval_ms = body.get("interval_ms")
+    if interval_ms is not None and (not is_number(interval_ms) or interval_ms <= 0):
+        return json.dumps({"status": "error", "message": "interval_ms must be a positive number."}), 400
+    components = body.get("components")
+    if components is not None and (not isinstance(components, list)
+                                   or not all(isinstance(component, str) for component in components)):
+        return json.dumps({"status": "error", "message": "components must be a list of component names."}), 400
+    result = camera_profiler.start(mode=body.get("mode", "cprofile"), operations=operations,
+                                   components=components, interval_ms=interval_ms)
+    return json.dumps(result), 200 if result["success"] else 409
+
+
+@app.route('/api/profiling/stop', methods=['POST'])
+def stop_profiling():
+    denied = check_profiling_token()
+    if denied:
+        return denied
+    return json.dumps(camera_profiler.stop())
+
+
+@app.route('/api/profiling/status')
+def profiling_status():
+    denied = check_profiling_token()
+    if denied:
+        return denied
+    return json.dumps(camera_profiler.get_status())
+
+
+@app.route('/api/profiling/memory', methods=['POST'])
+def profile_memory():
+    denied = check_profiling_token()
+    if denied:
+        return denied
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        return json.dumps({"status": "error", "message": "The request body must be a JSON object."}), 400
+    top, frames = body.get("top", 20), body.get("frames")
+    if not is_number(top, integer=True) or top < 1:
+        return json.dumps({"status": "error", "message": "top must be a positive integer."}), 400
+    if frames is not None and (not is_number(frames, integer=True) or frames < 1):
+        return json.dumps({"status": "error", "message": "frames must be a positive integer."}), 400
+    result = camera_profiler.memory(action=body.get("action", "snapshot"), frames=frames, top=top)
+    return json.dumps(result), 200 if result["success"] else 409
+
+
+@app.route('/api/profiling/files')
+def list_profiling_files():
+    denied = check_profiling_token()
+    if denied:
+        return denied
+    return json.dumps({"files": camera_profiler.list_files()})
+
+
+@app.route('/api/profiling/files/<name>')
+def download_profiling_file(name):
+    denied = check_profiling_token()
+    if denied:
+        return denied
+    path = camera_profiler.get_file_path(name)
+    if path is None:
+        return json.dumps({"status": "error", "message": f"Unknown profiling file {name}."}), 404
+    return send_file(path, mimetype="application/octet-stream", as_attachment=True, download_name=name)
+
+
+@app.route('/api/config/snapshot')
+def export_config_snapshot():
+    result = config_handler.export_snapshot()
+    return json.dumps(result, default=str), 200 if result["success"] else 409
+
+
+@app.route('/api/config/restore', methods=['POST'])
+def restore_config_snapshot():
+    body = request.get_json(force=True)
+    # Accepts the snapshot itself or the response of /api/config/snapshot
+    snapshot = (body.get("data") or {}).get("snapshot") or body.get("snapshot") or body
+    result = config_handler.restore_snapshot(snapshot, dry_run=request.args.get('dry_run', '0') == '1')
+    return json.dumps(result, default=str), 200 if result["success"] else 409
+
+
+@app.route('/api/config/reload', methods=['POST'])
+def reload_config():
+    # The watcher picks up edits on its own; this applies them immediately
+    return json.dumps(camera_manager.reload_config())
 
 
 @app.route('/api/set-config', methods=['POST'])
 def set_config():
     global config
-    config = request.json("config")
+    body = request.get_json(force=True)
+    config = body.get("config", body)
     result = config_handler.set_multiple_configs(config)
     return json.dumps(result)
 
 
 if __name__ == '__main__':
-    app.run(port=5555, host="0.0.0.0")
+    parser = argparse.ArgumentParser(description="Remote camera control HTTP server.")
+    parser.add_argument("--config", help="Configuration file (default: config.yaml next to app.py)")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=5555, help="Port to listen on")
+    arguments = parser.parse_args()
+    # Exit normally on SIGTERM, so atexit handlers flush queued files and remove the live view ring
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    create_app(arguments.config)
+    app.run(port=arguments.port, host=arguments.host)
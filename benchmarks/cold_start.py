@@ -0,0 +1,148 @@
+"""
+Cold-start benchmark.
+
+Measures, in fresh interpreters:
+  * the time of each startup phase (imports, component construction, warm-up), and
+  * the time from launching ``app.py`` until the HTTP listener answers ``/api/status``.
+
+Run from the repository root:
+
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py --runs 5 --skip-server --json
+
+The processes run in a temporary working directory, so their images, previews and logs do not end up in the
+repository. A failed warm-up fails the run. Set ``general.lazy_init`` in config.yaml to compare the lazy and
+eager startup paths.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a fresh interpreter; prints one JSON object with the phase timings in milliseconds
+PHASE_SCRIPT = r"""
+import sys, json, time
+timings = {}
+started = time.perf_counter()
+
+def mark(name):
+    global started
+    now = time.perf_counter()
+    timings[name] = round((now - started) * 1000, 2)
+    started = now
+
+from src.modules.camera_manager import CameraManager
+from src.modules.capture_handler import CaptureHandler
+from src.modules.config_handler import ConfigHandler
+mark("import_modules")
+
+camera_manager = CameraManager()
+mark("camera_manager")
+capture_handler = CaptureHandler(camera_manager)
+mark("capture_handler")
+config_handler = ConfigHandler(camera_manager)
+mark("config_handler")
+
+def check(result):
+    if not result["success"]:
+        sys.exit(f"Warm-up failed: {result['message']}")
+
+check(camera_manager.warm_up())
+mark("warm_up_gphoto2")
+check(capture_handler.warm_up())
+mark("warm_up_stores")
+print(json.dumps(timings))
+"""
+
+
+def child_environment() -> dict:
+    """Environment of the measured processes, which import the repository from another working directory."""
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIRECTORY, os.environ.get("PYTHONPATH")])))
+
+
+def measure_phases(work_directory: str) -> dict:
+    """Runs the phase script in a fresh interpreter and returns its timings, including interpreter start-up."""
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", PHASE_SCRIPT], cwd=work_directory, env=child_environment(),
+                               capture_output=True, text=True, timeout=120)
+    total_ms = round((time.perf_counter() - started) * 1000, 2)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Phase script failed:\n{completed.stderr.strip()}")
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings["process_total"] = total_ms
+    return timings
+
+
+def measure_listener(port: int, timeout: float, work_directory: str) -> float:
+    """Starts app.py and returns the milliseconds until /api/status answers."""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT_DIRECTORY, "app.py"), "--port", str(port)],
+                               cwd=work_directory, env=child_environment(),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"app.py exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/status", timeout=0.5):
+                    return round((time.perf_counter() - started) * 1000, 2)
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"HTTP listener did not answer within {timeout} seconds")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def summarize(samples: list) -> dict:
+    return {"min": min(samples), "median": round(statistics.median(samples), 2), "max": max(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure library and HTTP server cold-start times.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh processes per measurement")
+    parser.add_argument("--port", type=int, default=5555, help="Port app.py listens on")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for the HTTP listener")
+    parser.add_argument("--skip-server", action="store_true", help="Only measure the library phases")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    arguments = parser.parse_args()
+
+    work_directory = tempfile.mkdtemp(prefix="rcp_cold_start_")
+    try:
+        phase_runs = [measure_phases(work_directory) for _ in range(arguments.runs)]
+        report = {"phases": {name: summarize([run[name] for run in phase_runs]) for name in phase_runs[0]}}
+
+        if not arguments.skip_server:
+            listener_runs = [measure_listener(arguments.port, arguments.timeout, work_directory)
+                             for _ in range(arguments.runs)]
+            report["http_listener"] = summarize(listener_runs)
+    except RuntimeError as e:
+        sys.exit(str(e))
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    if arguments.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Cold start over {arguments.runs} run(s), milliseconds (min / median / max)")
+    for name, values in report["phases"].items():
+        print(f"  {name:<18} {values['min']:>9.2f} {values['median']:>9.2f} {values['max']:>9.2f}")
+    if "http_listener" in report:
+        values = report["http_listener"]
+        print(f"  {'http_listener':<18} {values['min']:>9.2f} {values['median']:>9.2f} {values['max']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""
+HTTP API load test.
+
+Drives the endpoints of ``app.py`` from concurrent clients with a weighted request mix and reports, per endpoint,
+the latency percentiles (p50 / p95 / p99), throughput and error rate.
+
+By default the server runs in this process against the simulated camera in ``benchmarks/simulator``, so no
+hardware is needed; its files are written to a temporary directory. ``--url`` targets a running server instead.
+
+Run from the repository root:
+
+    python benchmarks/load_test.py --concurrency 8 --duration 30
+    python benchmarks/load_test.py --mix status=60,summary=20,capture=20 --latency-scale 0.5
+    python benchmarks/load_test.py --duration 60 --json --output load_test.json
+    python benchmarks/load_test.py --url http://camera-host:5555 --mix status=1,summary=1
+
+A capture is counted twice: ``capture`` is the time until the job is accepted and ``capture_job`` the time until
+the job has finished (followed with ``/api/jobs/<id>?wait=``). ``capture_job`` is left out of the total row, which
+only counts HTTP requests.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIMULATOR_DIRECTORY = os.path.join(ROOT_DIRECTORY, "benchmarks", "simulator")
+
+ISO_VALUES = ["100", "200", "400", "800"]
+
+# Name -> (HTTP method, path, body factory)
+ENDPOINTS = {
+    "status": ("GET", "/api/status", None),
+    "summary": ("GET", "/api/summary", None),
+    "capture": ("POST", "/api/capture", None),
+    "set_config": ("POST", "/api/set-config", lambda rng: {"config": {"iso": rng.choice(ISO_VALUES)}}),
+    "liveview_start": ("GET", "/api/liveview/start", None),
+    "liveview_status": ("GET", "/api/liveview/status", None),
+    "liveview_stop": ("GET", "/api/liveview/stop", None),
+}
+
+DEFAULT_MIX = "status=40,summary=20,set_config=15,capture=10,liveview_status=10,liveview_start=3,liveview_stop=2"
+# Timings derived from other requests (a capture followed until its job finishes), not requests of their own
+DERIVED_ENDPOINTS = ("capture_job",)
+
+
+def parse_mix(text: str) -> dict:
+    """Parses ``name=weight,...`` into a dictionary of endpoint weights."""
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}'. Available: {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("The request mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, math.ceil(fraction * len(samples)) - 1))
+    return samples[rank]
+
+
+def start_simulated_server(work_directory: str) -> tuple:
+    """
+    Imports ``app.py`` against the simulated camera and serves it on a free local port.
+
+    :param work_directory: Directory the server writes its images, previews and caches to.
+    :return: The server and its base URL.
+    """
+    sys.path.insert(0, ROOT_DIRECTORY)
+    # Spawned camera workers inherit sys.path, so they load the simulator too
+    sys.path.insert(0, SIMULATOR_DIRECTORY)
+    os.chdir(work_directory)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    import app as application
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, application.create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, name="load-test-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class LoadTest:
+    def __init__(self, base_url: str, mix: dict, concurrency: int, duration: float, requests: int,
+                 timeout: float, follow_jobs: bool, seed: int):
+        self.__base_url = base_url.rstrip("/")
+        self.__names = list(mix)
+        self.__weights = [mix[name] for name in self.__names]
+        self.__concurrency = concurrency
+        self.__duration = duration
+        self.__requests = requests
+        self.__timeout = timeout
+        self.__follow_jobs = follow_jobs
+        self.__seed = seed
+
+        self.__lock = threading.Lock()
+        self.__issued = 0
+        self.__latencies = defaultdict(list)
+        self.__errors = defaultdict(int)
+        self.__status_codes = defaultdict(lambda: defaultdict(int))
+        self.__error_messages = defaultdict(lambda: defaultdict(int))
+
+    def request(self, method: str, path: str, body=None) -> tuple:
+        """Sends one request and returns ``(status code, parsed JSON body or None)``."""
+        data = json.dumps(body).encode() if body is not None else (b"" if method == "POST" else None)
+        request = urllib.request.Request(self.__base_url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.__timeout) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+    def __record(self, name: str, started: float, status, error=None):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.__lock:
+            self.__latencies[name].append(elapsed_ms)
+            self.__status_codes[name][str(status)] += 1
+            if error:
+                self.__errors[name] += 1
+                self.__error_messages[name][error[:120]] += 1
+
+    def __next_request(self) -> bool:
+        with self.__lock:
+            if self.__requests and self.__issued >= self.__requests:
+                return False
+            self.__issued += 1
+            return True
+
+    def __client(self, index: int, deadline: float):
+        rng = random.Random(self.__seed + index)
+        while time.perf_counter() < deadline and self.__next_request():
+            name = rng.choices(self.__names, self.__weights)[0]
+            method, path, body_factory = ENDPOINTS[name]
+            started = time.perf_counter()
+            try:
+                status, payload = self.request(method, path, body_factory(rng) if body_factory else None)
+            except Exception as e:
+                self.__record(name, started, "exception", f"{type(e).__name__}: {e}")
+                continue
+            self.__record(name, started, status, f"HTTP {status}" if status >= 400 else None)
+
+            if name == "capture" and self.__follow_jobs and status == 202 and payload:
+                self.__follow_job(payload["job_id"], started)
+
+    def __follow_job(self, job_id: str, started: float):
+        try:
+            job = None
+            while job is None or job["status"] not in ("succeeded", "failed"):
+                _, job = self.request("GET", f"/api/jobs/{job_id}?wait=30")
+        except Exception as e:
+            self.__record("capture_job", started, "exception", f"{type(e).__name__}: {e}")
+            return
+        result = job.get("result") or {}
+        error = None if job["status"] == "succeeded" and result.get("success") else result.get("message") or "failed"
+        self.__record("capture_job", started, job["status"], error)
+
+    def run(self) -> dict:
+        """Runs the clients until the duration or request count is reached and returns the report."""
+        deadline = time.perf_counter() + (self.__duration if self.__duration else float("inf"))
+        clients = [threading.Thread(target=self.__client, args=(index, deadline), name=f"load-client-{index}")
+                   for index in range(self.__concurrency)]
+        started = time.perf_counter()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        wall_seconds = time.perf_counter() - started
+        return self.__report(wall_seconds)
+
+    def __report(self, wall_seconds: float) -> dict:
+        endpoints = {}
+        all_latencies, total_errors = [], 0
+        for name in sorted(self.__latencies):
+            samples = sorted(self.__latencies[name])
+            errors = self.__errors[name]
+            if name not in DERIVED_ENDPOINTS:
+                all_latencies.extend(samples)
+                total_errors += errors
+            endpoints[name] = {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": round(errors / len(samples), 4),
+                "throughput_rps": round(len(samples) / wall_seconds, 2),
+                "latency_ms": self.__latency_summary(samples),
+                "status_codes": dict(self.__status_codes[name]),
+                "error_messages": dict(self.__error_messages[name]),
+            }
+        all_latencies.sort()
+        total = {
+            "requests": len(all_latencies),
+            "errors": total_errors,
+            "error_rate": round(total_errors / len(all_latencies), 4) if all_latencies else 0.0,
+            "throughput_rps": round(len(all_latencies) / wall_seconds, 2),
+            "latency_ms": self.__latency_summary(all_latencies),
+        }
+        return {"wall_seconds": round(wall_seconds, 3), "total": total, "endpoints": endpoints}
+
+    @staticmethod
+    def __latency_summary(samples: list) -> dict:
+        if not samples:
+            return {}
+        return {"min": round(samples[0], 2), "p50": round(percentile(samples, 0.50), 2),
+                "p95": round(percentile(samples, 0.95), 2), "p99": round(percentile(samples, 0.99), 2),
+                "max": round(samples[-1], 2), "mean": round(sum(samples) / len(samples), 2)}
+
+
+def print_report(report: dict):
+    settings = report["settings"]
+    print(f"Load test: {settings['concurrency']} client(s), {report['wall_seconds']:.1f} s, "
+          f"{'simulated camera' if settings['simulated'] else settings['url']}")
+    print(f"  {'endpoint':<16} {'requests':>9} {'errors':>7} {'req/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    rows = list(report["endpoints"].items()) + [("total", report["total"])]
+    for name, values in rows:
+        latency = values["latency_ms"] or {"p50": 0, "p95": 0, "p99": 0, "max": 0}
+        print(f"  {name:<16} {values['requests']:>9} {values['error_rate']:>6.1%} {values['throughput_rps']:>8.1f} "
+              f"{latency['p50']:>9.2f} {latency['p95']:>9.2f} {latency['p99']:>9.2f} {latency['max']:>9.2f}")
+    for name, values in report["endpoints"].items():
+        for message, count in values["error_messages"].items():
+            print(f"  ! {name}: {message} (x{count})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the HTTP API and report latency percentiles.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run (0: until --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0: no limit)")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"Weighted request mix, name=weight,... Endpoints: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--url", help="Base URL of a running server. Default: in-process server, simulated camera")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier of the simulated camera latencies (0: no camera latency)")
+    parser.add_argument("--image-kb", type=int, default=2048, help="Size of a simulated capture in KB")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Fraction of simulated camera calls that fail")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds before a request times out")
+    parser.add_argument("--no-follow-jobs", action="store_true", help="Do not wait for capture jobs to finish")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the request mix")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--keep-files", action="store_true", help="Keep the simulated server's files")
+    arguments = parser.parse_args()
+    if not arguments.duration and not arguments.requests:
+        parser.error("Either --duration or --requests must be set")
+
+    mix = parse_mix(arguments.mix)
+    output_path = os.path.abspath(arguments.output) if arguments.output else None
+    server, work_directory = None, None
+    if arguments.url:
+        base_url = arguments.url
+    else:
+        os.environ["RCP_SIM_LATENCY_SCALE"] = str(arguments.latency_scale)
+        os.environ["RCP_SIM_IMAGE_KB"] = str(arguments.image_kb)
+        os.environ["RCP_SIM_FAILURE_RATE"] = str(arguments.failure_rate)
+        work_directory = tempfile.mkdtemp(prefix="rcp_load_test_")
+        server, base_url = start_simulated_server(work_directory)
+
+    try:
+        load_test = LoadTest(base_url, mix, arguments.concurrency, arguments.duration, arguments.requests,
+                             arguments.timeout, not arguments.no_follow_jobs, arguments.seed)
+        status, result = load_test.request("GET", "/api/connect")
+        if status >= 400 or not (result or {}).get("success"):
+            print(f"Warning: /api/connect failed (HTTP {status}): {(result or {}).get('message')}", file=sys.stderr)
+
+        report = load_test.run()
+        # Leave no live view publisher running behind
+        if "liveview_start" in mix:
+            load_test.request("GET", "/api/liveview/stop")
+    finally:
+        if server is not None:
+            server.shutdown()
+        if work_directory and not arguments.keep_files:
+            os.chdir(ROOT_DIRECTORY)
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+    report["settings"] = {"url": arguments.url, "simulated": not arguments.url, "concurrency": arguments.concurrency,
+                          "duration": arguments.duration, "requests": arguments.requests, "mix": mix,
+                          "latency_scale": arguments.latency_scale, "image_kb": arguments.image_kb,
+                          "failure_rate": arguments.failure_rate, "seed": arguments.seed,
+                          "files": work_directory if arguments.keep_files else None}
+    if output_path:
+        with open(output_path, "w") as file:
+            json.dump(report, file, indent=2)
+    if arguments.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,376 @@
+"""
+Simulated ``gphoto2`` module for benchmarks.
+
+Implements the part of the python-gphoto2 API used by ``src`` with a virtual camera, so that the HTTP server can
+be load-tested without hardware. Put this directory first on ``sys.path`` (``benchmarks/load_test.py`` does) and
+``lazy_import("gphoto2")`` resolves to it, in the server process as well as in spawned camera workers.
+
+Every camera call sleeps for a typical USB round trip and calls on one camera are serialized, like on a real body.
+Environment variables:
+    RCP_SIM_CAMERAS         Number of detected cameras (default 1)
+    RCP_SIM_LATENCY_SCALE   Multiplier of all simulated latencies; 0 disables them (default 1.0)
+    RCP_SIM_IMAGE_KB        Size of a captured image in KB (default 2048)
+    RCP_SIM_FAILURE_RATE    Fraction of camera calls that fail with GP_ERROR_IO_USB_CLAIM (default 0)
+    RCP_SIM_FOCUS_TARGET    Lens position, in "Near 1" steps from the start, at which previews are sharp (default 37)
+
+With Pillow installed, previews are decodable JPEGs of a test chart that blurs with the distance between the lens
+position (moved by ``manualfocusdrive``) and the focus target, so that focus routines can be exercised.
+"""
+import io
+import os
+import copy
+import time
+import random
+import threading
+from types import SimpleNamespace
+
+try:
+    from PIL import Image, ImageDraw, ImageFilter
+except ImportError:
+    Image = None
+
+GP_OK = 0
+GP_ERROR = -1
+GP_ERROR_BAD_PARAMETERS = -2
+GP_ERROR_NOT_SUPPORTED = -6
+GP_ERROR_IO_USB_CLAIM = -53
+GP_ERROR_CAMERA_BUSY = -110
+
+(GP_WIDGET_WINDOW, GP_WIDGET_SECTION, GP_WIDGET_TEXT, GP_WIDGET_RANGE, GP_WIDGET_TOGGLE, GP_WIDGET_RADIO,
+ GP_WIDGET_MENU, GP_WIDGET_BUTTON, GP_WIDGET_DATE) = range(9)
+
+GP_CAPTURE_IMAGE = 0
+GP_FILE_TYPE_PREVIEW = 0
+GP_FILE_TYPE_NORMAL = 1
+GP_EVENT_UNKNOWN, GP_EVENT_TIMEOUT, GP_EVENT_FILE_ADDED, GP_EVENT_FOLDER_ADDED, GP_EVENT_CAPTURE_COMPLETE = range(5)
+GP_STORAGEINFO_AC_READWRITE = 0
+GP_STORAGEINFO_AC_READONLY = 1
+
+LATENCY_SCALE = float(os.environ.get("RCP_SIM_LATENCY_SCALE", "1.0"))
+IMAGE_BYTES = int(float(os.environ.get("RCP_SIM_IMAGE_KB", "2048")) * 1024)
+FAILURE_RATE = float(os.environ.get("RCP_SIM_FAILURE_RATE", "0"))
+CAMERA_COUNT = int(os.environ.get("RCP_SIM_CAMERAS", "1"))
+FOCUS_TARGET = int(os.environ.get("RCP_SIM_FOCUS_TARGET", "37"))
+
+# Lens travel of one manualfocusdrive step, in "Near 1" units
+FOCUS_DRIVE_STEPS = {"1": 1, "2": 4, "3": 16}
+
+# Seconds per call, roughly those of a DSLR on USB 2.0
+LATENCY = {
+    "init": 0.25,
+    "exit": 0.02,
+    "get_config": 0.08,
+    "set_config": 0.12,
+    "single_config": 0.01,
+    "summary": 0.03,
+    "capture": 0.45,
+    "file_get_normal": 0.20,
+    "file_get_preview": 0.02,
+    "file_get_info": 0.005,
+    "capture_preview": 0.035,
+    "mirror": 0.35,            # Entering and leaving live view for a preview taken with the viewfinder down
+    "list": 0.01,
+    "storage_info": 0.01,
+}
+
+FOLDER = "/store_00020001/DCIM/100CANON"
+
+
+class GPhoto2Error(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"[{code}] Simulated gphoto2 error")
+        self.code = code
+        self.string = str(self)
+
+
+class Context:
+    pass
+
+
+class CameraWidget:
+    def __init__(self, name, widget_type, value=None, choices=None, children=None, readonly=False):
+        self.__name = name
+        self.__type = widget_type
+        self.__value = value
+        self.__choices = list(choices or [])
+        self.__children = list(children or [])
+        self.__readonly = readonly
+
+    def get_name(self):
+        return self.__name
+
+    def get_label(self):
+        return self.__name
+
+    def get_type(self):
+        return self.__type
+
+    def get_readonly(self):
+        return int(self.__readonly)
+
+    def count_children(self):
+        return len(self.__children)
+
+    def get_child(self, index):
+        return self.__children[index]
+
+    def get_child_by_name(self, name):
+        for child in self.__children:
+            if child.get_name() == name:
+                return child
+            try:
+                return child.get_child_by_name(name)
+            except GPhoto2Error:
+                pass
+        raise GPhoto2Error(GP_ERROR_BAD_PARAMETERS)
+
+    def count_choices(self):
+        return len(self.__choices)
+
+    def get_choice(self, index):
+        return self.__choices[index]
+
+    def get_range(self):
+        return 0.0, 100.0, 1.0
+
+    def get_value(self):
+        return self.__value
+
+    def set_value(self, value):
+        if self.__type in (GP_WIDGET_RADIO, GP_WIDGET_MENU) and value not in self.__choices:
+            raise GPhoto2Error(GP_ERROR_BAD_PARAMETERS)
+        self.__value = value
+
+
+def _section(name, *children):
+    return CameraWidget(name, GP_WIDGET_SECTION, children=children)
+
+
+def _radio(name, value, choices):
+    return CameraWidget(name, GP_WIDGET_RADIO, value, choices)
+
+
+def _build_tree(serial_number: str) -> CameraWidget:
+    return CameraWidget("main", GP_WIDGET_WINDOW, children=[
+        _section("actions",
+                 CameraWidget("viewfinder", GP_WIDGET_TOGGLE, 0),
+                 _radio("manualfocusdrive", "None",
+                        ["Near 1", "Near 2", "Near 3", "None", "Far 1", "Far 2", "Far 3"])),
+        _section("settings",
+                 CameraWidget("datetime", GP_WIDGET_DATE, int(time.time())),
+                 CameraWidget("capturetarget", GP_WIDGET_RADIO, "Memory card", ["Internal RAM", "Memory card"]),
+                 CameraWidget("capture", GP_WIDGET_TOGGLE, 0),
+                 CameraWidget("remotemode", GP_WIDGET_TEXT, "1"),
+                 CameraWidget("eventmode", GP_WIDGET_TEXT, "0")),
+        _section("imgsettings",
+                 _radio("iso", "100", ["Auto", "100", "200", "400", "800", "1600", "3200", "6400"]),
+                 _radio("whitebalance", "Auto", ["Auto", "Daylight", "Shadow", "Cloudy", "Tungsten", "Fluorescent"]),
+                 _radio("imageformat", "Large Fine JPEG", ["Large Fine JPEG", "RAW", "RAW + Large Fine JPEG"])),
+        _section("capturesettings",
+                 _radio("aperture", "5.6", ["2.8", "4", "5.6", "8", "11", "16"]),
+                 _radio("shutterspeed", "1/125",
+                        ["bulb", "1", "1/2", "1/4", "1/8", "1/15", "1/30", "1/60", "1/125", "1/250", "1/500", "1/1000"]),
+                 _radio("focusmode", "One Shot", ["One Shot", "AI Servo", "Manual"])),
+        _section("status",
+                 CameraWidget("serialnumber", GP_WIDGET_TEXT, serial_number, readonly=True),
+                 CameraWidget("batterylevel", GP_WIDGET_TEXT, "100%", readonly=True)),
+        _section("other",
+                 CameraWidget("d406", GP_WIDGET_TEXT, "Unknown value 0002")),
+    ])
+
+
+def _chart(blur: float) -> bytes:
+    """Returns a 320x240 JPEG of a high-contrast test chart, blurred by ``blur`` pixels."""
+    image = Image.new("L", (320, 240), 128)
+    draw = ImageDraw.Draw(image)
+    for index in range(0, 320, 16):
+        draw.rectangle((index, 60, index + 7, 180), fill=20 if index % 32 else 235)
+    for index in range(0, 240, 12):
+        draw.line((40, index, 280, index + 6), fill=230 if index % 24 else 30)
+    if blur:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=85)
+    return output.getvalue()
+
+
+def _jpeg(size: int, seed: int) -> bytes:
+    """Returns ``size`` bytes framed by JPEG start and end markers."""
+    body = random.Random(seed).randbytes(1024) * max(1, (size - 4) // 1024)
+    return b"\xff\xd8" + body + b"\xff\xd9"
+
+
+class CameraFile:
+    def __init__(self):
+        self.__data = b""
+
+    def set_data(self, data: bytes):
+        self.__data = data
+
+    def get_data_and_size(self):
+        return self.__data
+
+
+class CameraFilePath:
+    def __init__(self, folder: str = "", name: str = ""):
+        self.folder = folder
+        self.name = name
+
+
+class PortInfoList:
+    def load(self):
+        pass
+
+    def lookup_path(self, port):
+        return 0
+
+    def __getitem__(self, index):
+        return None
+
+
+class CameraAbilitiesList:
+    def load(self, context=None):
+        pass
+
+    def lookup_model(self, model):
+        return 0
+
+    def __getitem__(self, index):
+        return None
+
+
+class Camera:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__initialized = False
+        self.__port = None
+        self.__tree = _build_tree("SIM0001")
+        self.__files = [f"IMG_{index:04d}.JPG" for index in range(1, 21)]
+        self.__events = []
+        self.__preview = _jpeg(64 * 1024, 0)
+        self.__focus_position = 0
+        self.__charts = {}
+
+    @staticmethod
+    def autodetect(context=None):
+        return [("Simulated Camera", f"usb:001,{index + 2:03d}") for index in range(CAMERA_COUNT)]
+
+    def __call(self, operation: str):
+        """Waits for the camera like a USB transfer would and fails at the configured rate."""
+        with self.__lock:
+            if operation != "init" and not self.__initialized:
+                raise GPhoto2Error(GP_ERROR)
+            time.sleep(LATENCY[operation] * LATENCY_SCALE)
+            if FAILURE_RATE and operation not in ("init", "exit") and random.random() < FAILURE_RATE:
+                raise GPhoto2Error(GP_ERROR_IO_USB_CLAIM)
+
+    def set_port_info(self, info):
+        self.__port = info
+
+    def set_abilities(self, abilities):
+        pass
+
+    def init(self, context=None):
+        self.__call("init")
+        self.__initialized = True
+
+    def exit(self, context=None):
+        self.__call("exit")
+        self.__initialized = False
+
+    def get_summary(self, context=None):
+        self.__call("summary")
+        return SimpleNamespace(text="Manufacturer: Simulated\nModel: Simulated Camera\nSerial Number: SIM0001\n")
+
+    def get_config(self, context=None):
+        self.__call("get_config")
+        return copy.deepcopy(self.__tree)
+
+    def set_config(self, tree, context=None):
+        self.__call("set_config")
+        self.__tree = copy.deepcopy(tree)
+        self.__drive_focus()
+
+    def get_single_config(self, name, context=None):
+        self.__call("single_config")
+        return copy.deepcopy(self.__tree.get_child_by_name(name))
+
+    def set_single_config(self, name, widget, context=None):
+        self.__call("single_config")
+        self.__tree.get_child_by_name(name).set_value(widget.get_value())
+        self.__drive_focus()
+
+    def __drive_focus(self):
+        """Moves the lens for a written Near/Far value; like a Canon body, the widget then reads "None" again."""
+        widget = self.__tree.get_child_by_name("manualfocusdrive")
+        direction, _, size = str(widget.get_value()).partition(" ")
+        if direction in ("Near", "Far") and size in FOCUS_DRIVE_STEPS:
+            self.__focus_position += FOCUS_DRIVE_STEPS[size] * (1 if direction == "Near" else -1)
+        widget.set_value("None")
+
+    def __preview_frame(self) -> bytes:
+        if Image is None:
+            return self.__preview
+        blur = min(16.0, abs(self.__focus_position - FOCUS_TARGET) * 0.4)
+        if blur not in self.__charts:
+            self.__charts[blur] = _chart(blur)
+        return self.__charts[blur]
+
+    def capture(self, capture_type, context=None):
+        self.__call("capture")
+        # The body leaves live view for the exposure
+        self.__tree.get_child_by_name("viewfinder").set_value(0)
+        name = f"IMG_{len(self.__files) + 1:04d}.JPG"
+        self.__files.append(name)
+        self.__events.append((GP_EVENT_FILE_ADDED, CameraFilePath(FOLDER, name)))
+        return CameraFilePath(FOLDER, name)
+
+    def capture_preview(self, camera_file=None, context=None):
+        self.__call("capture_preview")
+        if not self.__tree.get_child_by_name("viewfinder").get_value():
+            time.sleep(LATENCY["mirror"] * LATENCY_SCALE)
+        camera_file = camera_file or CameraFile()
+        camera_file.set_data(self.__preview_frame())
+        return camera_file
+
+    def file_get(self, folder, name, file_type, camera_file=None, context=None):
+        if name not in self.__files:
+            raise GPhoto2Error(GP_ERROR_BAD_PARAMETERS)
+        if file_type == GP_FILE_TYPE_PREVIEW:
+            self.__call("file_get_preview")
+            data = _jpeg(16 * 1024, hash(name))
+        else:
+            self.__call("file_get_normal")
+            data = _jpeg(IMAGE_BYTES, hash(name))
+        camera_file = camera_file or CameraFile()
+        camera_file.set_data(data)
+        return camera_file
+
+    def file_get_info(self, folder, name, context=None):
+        self.__call("file_get_info")
+        if name not in self.__files:
+            raise GPhoto2Error(GP_ERROR_BAD_PARAMETERS)
+        return SimpleNamespace(file=SimpleNamespace(size=IMAGE_BYTES, mtime=1700000000 + self.__files.index(name),
+                                                    type="image/jpeg", width=6000, height=4000))
+
+    def folder_list_folders(self, folder, context=None):
+        self.__call("list")
+        tree = {"/": ["store_00020001"], "/store_00020001": ["DCIM"], "/store_00020001/DCIM": ["100CANON"]}
+        return [(name, None) for name in tree.get(folder.rstrip("/") or "/", [])]
+
+    def folder_list_files(self, folder, context=None):
+        self.__call("list")
+        return [(name, None) for name in self.__files] if folder.rstrip("/") == FOLDER else []
+
+    def wait_for_event(self, timeout, context=None):
+        with self.__lock:
+            if self.__events:
+                return self.__events.pop(0)
+        time.sleep(min(timeout, 10) / 1000 * LATENCY_SCALE)
+        return GP_EVENT_TIMEOUT, None
+
+    def get_storageinfo(self, context=None):
+        self.__call("storage_info")
+        return [SimpleNamespace(basedir="/store_00020001", label="SD", description="Simulated card",
+                                capacitykbytes=64 * 1024 * 1024, freekbytes=32 * 1024 * 1024,
+                                freeimages=5000, access=GP_STORAGEINFO_AC_READWRITE)]
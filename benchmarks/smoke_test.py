@@ -0,0 +1,143 @@
+"""
+Process-model smoke test.
+
+Starts ``app.py`` as a script, the documented way, against the simulated camera in ``benchmarks/simulator`` with
+the camera worker enabled, and checks that camera calls succeed. Spawned workers import ``app.py`` again as
+``__mp_main__``, so anything that starts a process at import time breaks this (and only this) start-up path.
+
+Run from the repository root:
+
+    python benchmarks/smoke_test.py
+    python benchmarks/smoke_test.py --lazy --supervisor
+
+The exit status is 0 when every check passed.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+
+import yaml
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIMULATOR_DIRECTORY = os.path.join(ROOT_DIRECTORY, "benchmarks", "simulator")
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def request(base_url: str, path: str, method: str = "GET", timeout: float = 30.0) -> tuple:
+    """Returns the HTTP status and the decoded JSON body (None if the body is not JSON)."""
+    http_request = urllib.request.Request(base_url + path, method=method, data=b"{}" if method == "POST" else None)
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            status, body = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, body = e.code, e.read()
+    try:
+        return status, json.loads(body)
+    except ValueError:
+        return status, None
+
+
+def write_config(directory: str, lazy: bool, supervisor: bool) -> str:
+    with open(os.path.join(ROOT_DIRECTORY, "config.yaml"), "r", encoding="utf-8") as file:
+        config = yaml.safe_load(file)
+    config.setdefault("worker", {})["enabled"] = True
+    config.setdefault("supervisor", {})["enabled"] = supervisor
+    config.setdefault("general", {})["lazy_init"] = lazy
+    config.setdefault("log_settings", {})["log_dir"] = os.path.join(directory, "logs")
+    path = os.path.join(directory, "config.yaml")
+    with open(path, "w", encoding="utf-8") as file:
+        yaml.safe_dump(config, file)
+    return path
+
+
+def run_checks(base_url: str, supervisor: bool) -> list:
+    """Returns (name, passed, detail) for each check."""
+    checks = []
+
+    status, body = request(base_url, "/api/connect")
+    checks.append(("connect", status == 200 and bool(body) and body.get("success"), body and body.get("message")))
+
+    status, body = request(base_url, "/api/set-config", method="POST")
+    checks.append(("set_config", status == 200, status))
+
+    status, body = request(base_url, "/api/capture", method="POST")
+    job_id = (body or {}).get("job_id")
+    if job_id:
+        status, body = request(base_url, f"/api/jobs/{job_id}?wait=30", timeout=40)
+    checks.append(("capture_job", bool(body) and body.get("status") == "succeeded",
+                   body and (body.get("error") or body.get("status"))))
+
+    if supervisor:
+        status, body = request(base_url, "/api/cameras")
+        cameras = (body or {}).get("cameras") or []
+        checks.append(("supervisor_cameras", status == 200 and len(cameras) > 0, f"{len(cameras)} camera(s)"))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start app.py as a script with the camera worker and check it.")
+    parser.add_argument("--lazy", action="store_true", help="Enable general.lazy_init")
+    parser.add_argument("--supervisor", action="store_true", help="Also enable the multi-camera supervisor")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for the HTTP listener")
+    arguments = parser.parse_args()
+
+    work_directory = tempfile.mkdtemp(prefix="rcp_smoke_test_")
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    environment = dict(os.environ, RCP_SIM_LATENCY_SCALE="0.1", RCP_SIM_IMAGE_KB="64",
+                       PYTHONPATH=os.pathsep.join(filter(None, [SIMULATOR_DIRECTORY, os.environ.get("PYTHONPATH")])))
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT_DIRECTORY, "app.py"), "--host", "127.0.0.1",
+                                "--port", str(port), "--config",
+                                write_config(work_directory, arguments.lazy, arguments.supervisor)],
+                               cwd=work_directory, env=environment,
+                               stdout=subprocess.DEVNULL, stderr=open(os.path.join(work_directory, "server.log"), "w"))
+    checks = []
+    try:
+        started = time.perf_counter()
+        while time.perf_counter() - started < arguments.timeout:
+            if process.poll() is not None:
+                break
+            try:
+                request(base_url, "/api/status", timeout=0.5)
+                checks = run_checks(base_url, arguments.supervisor)
+                break
+            except OSError:
+                time.sleep(0.1)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    with open(os.path.join(work_directory, "server.log"), "r", encoding="utf-8", errors="replace") as file:
+        log = file.read()
+    shutil.rmtree(work_directory, ignore_errors=True)
+
+    if not checks:
+        print(f"app.py did not answer within {arguments.timeout} seconds (exit code {process.returncode})")
+        print(log[-4000:])
+        sys.exit(1)
+    for name, passed, detail in checks:
+        print(f"  {'ok  ' if passed else 'FAIL'} {name:<20} {detail}")
+    if "bootstrapping phase" in log:
+        print("  FAIL a process was started while a child was bootstrapping")
+        sys.exit(1)
+    sys.exit(0 if all(passed for _, passed, _ in checks) else 1)
+
+
+if __name__ == '__main__':
+    main()
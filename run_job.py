@@ -0,0 +1,112 @@
+"""
+Headless job runner.
+
+Runs a declarative YAML job file (camera selection, settings profiles, capture loops, brackets and output naming)
+without the HTTP server, printing progress and a timing report. See ``example_usage/4_job_example.yaml``.
+
+    python run_job.py example_usage/4_job_example.yaml
+    python run_job.py my_job.yaml --dry-run
+    python run_job.py my_job.yaml --json --output report.json
+
+The exit status is 0 when every step succeeded, 1 when a step failed and 2 when the job is invalid.
+"""
+import os
+import sys
+import json
+import argparse
+
+from src.modules.camera_manager import CameraManager
+from src.modules.config_handler import ConfigHandler
+from src.modules.capture_handler import CaptureHandler
+from src.modules.sequence_handler import SequenceHandler
+from src.modules.focus_handler import FocusHandler
+from src.modules.job_runner import JobRunner
+
+
+def print_progress(event: dict):
+    if event["event"] == "step_started":
+        print(f"[{event['step']}/{event['steps']}] {event['label']} ...", flush=True)
+    elif event["event"] == "frame":
+        timings = "  ".join(f"{key[:-3]} {value:.0f} ms" for key, value in event["timings"].items())
+        print(f"    frame {event['frame'] + 1}/{event['frames']}  {event['camera_path']}  {timings}", flush=True)
+    elif event["event"] == "step_finished":
+        status = "ok" if event["success"] else f"FAILED: {event['message']}"
+        print(f"    {status} ({event['elapsed_ms'] / 1000:.2f} s)", flush=True)
+
+
+def print_report(result: dict):
+    data = result.get("data") or {}
+    if not data.get("steps"):
+        print(result["message"])
+        return
+    print()
+    print(f"Job {data['job']}: {data['frames']} frame(s) in {data['total_ms'] / 1000:.2f} s "
+          f"({data['frames_per_minute']} frames/min), files in {data['directory']}")
+    print(f"  {'step':<6} {'type':<10} {'label':<20} {'frames':>6} {'time s':>8} {'config':>8} {'wait':>8} "
+          f"{'capture':>8} {'download':>9}")
+    for step in data["steps"]:
+        timings = step.get("timings") or {}
+        columns = "".join(f" {timings.get(key, 0) / 1000:>8.2f}" for key in ("config_ms", "wait_ms", "capture_ms"))
+        elapsed = "skipped" if step.get("skipped") else f"{step['elapsed_ms'] / 1000:.2f}"
+        print(f"  {step['step']:<6} {step['type']:<10} {str(step['label'])[:20]:<20} {step.get('frames', 0):>6} "
+              f"{elapsed:>8}{columns} {timings.get('download_ms', 0) / 1000:>9.2f}")
+    totals = data["timings"]
+    print(f"  {'total':<38} {data['frames']:>6} {data['total_ms'] / 1000:>8.2f}"
+          + "".join(f" {totals[key] / 1000:>8.2f}" for key in ("config_ms", "wait_ms", "capture_ms"))
+          + f" {totals['download_ms'] / 1000:>9.2f}")
+    print(result["message"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a YAML camera job and report its timings.")
+    parser.add_argument("job", help="Path of the YAML job file")
+    parser.add_argument("--config", help="Configuration file (default: config.yaml next to this script)")
+    parser.add_argument("--camera-port", help="Camera port, overrides the job's camera selection")
+    parser.add_argument("--dry-run", action="store_true", help="Validate the job against the camera only")
+    parser.add_argument("--quiet", action="store_true", help="Do not print progress")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    parser.add_argument("--output", help="Also write the JSON result to this file")
+    arguments = parser.parse_args()
+
+    loaded = JobRunner.load_job(arguments.job)
+    if not loaded["success"]:
+        print(loaded["message"], file=sys.stderr)
+        sys.exit(2)
+    job = loaded["data"]
+    if arguments.camera_port:
+        job["camera"] = {"port": arguments.camera_port}
+
+    config_path = arguments.config or os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+    camera_manager = CameraManager(config_path=config_path)
+    config_handler = ConfigHandler(camera_manager)
+    capture_handler = CaptureHandler(camera_manager)
+    sequence_handler = SequenceHandler(camera_manager, config_handler, capture_handler)
+    focus_handler = FocusHandler(camera_manager, config_handler, capture_handler)
+    progress = None if arguments.quiet or arguments.json else print_progress
+    runner = JobRunner(camera_manager, config_handler, capture_handler, sequence_handler, focus_handler, progress)
+
+    validation = runner.validate(job)
+    if not validation["success"]:
+        print(validation["message"], file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        result = runner.run(job, dry_run=arguments.dry_run)
+    finally:
+        # Let the background writer finish every file before the process exits
+        if not arguments.dry_run:
+            capture_handler.get_storage_writer().flush()
+        camera_manager.disconnect_camera()
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(result, file, indent=2)
+    if arguments.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+    sys.exit(0 if result["success"] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import time
+from typing import Dict, Any, List, Tuple, Optional
+
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+
+# Operation name -> (component, method). Parameters of an operation are passed as keyword arguments.
+# The allowlist of every HTTP endpoint that runs camera operations (/api/batch, /api/cameras/call).
+BATCH_OPERATIONS: Dict[str, Tuple[str, str]] = {
+    "connect": ("camera_manager", "connect"),
+    "summary": ("camera_manager", "get_camera_summary"),
+    "set_config": ("config_handler", "set_multiple_configs"),
+    "write_settings": ("config_handler", "write_settings"),
+    "get_config": ("config_handler", "get_config_value"),
+    "read_settings": ("config_handler", "read_settings"),
+    "wait_ready": ("capture_handler", "wait_until_ready"),
+    "capture": ("capture_handler", "capture_image"),
+    "preview": ("capture_handler", "capture_preview"),
+    "download": ("capture_handler", "download_file"),
+    "get_capture": ("capture_handler", "get_capture"),
+    "thumbnail": ("thumbnail_handler", "get_thumbnail"),
+    "list_files": ("card_handler", "list_files"),
+    "storage_info": ("card_handler", "get_storage_info"),
+    "sequence": ("sequence_handler", "run_sequence"),
+    "autofocus": ("focus_handler", "autofocus"),
+}
+
+# Parameters naming a file or directory on this machine. Refused from HTTP clients; files are always saved to
+# the configured stores.
+PATH_PARAMETERS = frozenset({"save_path", "path", "directory", "name_template"})
+
+REFERENCE_PREFIX = "$"
+
+
+class BatchRunner:
+    def __init__(self, targets: Dict[str, Any], operations: Optional[Dict[str, Tuple[str, str]]] = None):
+        """
+        Runs an ordered list of camera operations in one go, passing results between steps.
+
+        Each operation is ``{"op": "capture", "id": "shot", "params": {...}, "continue_on_error": false}``.
+        A parameter value that is a string starting with ``$`` refers to the result of an earlier operation:
+        ``"$shot.data.camera_path"`` is replaced by that field of the result of the operation with ID "shot"
+        (list items are addressed by index, e.g. ``"$files.data.files.0.name"``). ``$$`` escapes a literal ``$``.
+        The whole batch is validated, including references, before the first operation runs.
+
+        :param targets: Component name -> object (or worker proxy), e.g. {"capture_handler": ...}.
+        :param operations: Allowed operations. Defaults to BATCH_OPERATIONS.
+        """
+        self.__targets = targets
+        self.__operations = operations or BATCH_OPERATIONS
+        self.__logger = Logger.get_logger("Batch Runner")
+
+    def get_operations(self) -> List[str]:
+        """Returns the names of the operations a batch may use."""
+        return sorted(self.__operations)
+
+    @staticmethod
+    def __references(value: Any) -> List[str]:
+        """Returns the operation IDs referenced anywhere in a parameter value."""
+        if isinstance(value, str) and value.startswith(REFERENCE_PREFIX) and not value.startswith("$$"):
+            return [value[1:].split(".", 1)[0]]
+        if isinstance(value, dict):
+            return [reference for item in value.values() for reference in BatchRunner.__references(item)]
+        if isinstance(value, list):
+            return [reference for item in value for reference in BatchRunner.__references(item)]
+        return []
+
+    def validate(self, operations: List[Dict[str, Any]]) -> Dict:
+        """
+        Check operation names, IDs and references without running anything.
+
+        :param operations: Batch operations.
+        :return: A dictionary with ``success`` and, on failure, the offending operation in the message.
+        """
+        if not isinstance(operations, list) or not operations:
+            return sdict(False, message="A batch needs a non-empty list of operations.")
+
+        seen_ids = set()
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                return sdict(False, message=f"Operation {index}: expected an object")
+            name = operation.get("op")
+            if name not in self.__operations:
+                return sdict(False, message=f"Operation {index}: unknown op '{name}'. "
+                                            f"Available: {', '.join(self.get_operations())}")
+            if self.__operations[name][0] not in self.__targets:
+                return sdict(False, message=f"Operation {index}: '{name}' is not available on this server")
+            if not isinstance(operation.get("params", {}), dict):
+                return sdict(False, message=f"Operation {index}: params must be an object")
+            refused = sorted(PATH_PARAMETERS.intersection(operation.get("params", {})))
+            if refused:
+                return sdict(False, message=f"Operation {index}: parameter(s) {', '.join(refused)} cannot be set")
+            for reference in self.__references(operation.get("params", {})):
+                if reference not in seen_ids:
+                    return sdict(False, message=f"Operation {index}: reference to '{reference}', which is not "
+                                                f"the ID of an earlier operation")
+            operation_id = operation.get("id")
+            if operation_id is not None:
+                if str(operation_id) in seen_ids:
+                    return sdict(False, message=f"Operation {index}: duplicate id '{operation_id}'")
+                seen_ids.add(str(operation_id))
+        return sdict(True, message="Batch is valid.")
+
+    @staticmethod
+    def __lookup(results: Dict[str, Any], reference: str) -> Any:
+        operation_id, _, path = reference.partition(".")
+        value = results[operation_id]
+        for part in path.split(".") if path else []:
+            if isinstance(value, dict) and part in value:
+                value = value[part]
+            elif isinstance(value, (list, tuple)) and part.lstrip("-").isdigit() and -len(value) <= int(part) < len(value):
+                value = value[int(part)]
+            else:
+                raise KeyError(f"${reference}: no field '{part}'")
+        return value
+
+    def __resolve(self, value: Any, results: Dict[str, Any]) -> Any:
+        if isinstance(value, str) and value.startswith(REFERENCE_PREFIX):
+            if value.startswith("$$"):
+                return value[1:]
+            return self.__lookup(results, value[1:])
+        if isinstance(value, dict):
+            return {key: self.__resolve(item, results) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.__resolve(item, results) for item in value]
+        return value
+
+    @staticmethod
+    def __succeeded(result: Any) -> bool:
+        if isinstance(result, dict) and "success" in result:
+            return bool(result["success"])
+        if isinstance(result, bool):
+            return result
+        return True
+
+    def run(self, operations: List[Dict[str, Any]]) -> Dict:
+        """
+        Validate and run a batch. Stops at the first failed operation unless it sets ``continue_on_error``.
+
+        :param operations: Batch operations.
+        :return: A dictionary with one entry per operation (result, success, elapsed time) and the total time.
+        """
+        method_name = "run"
+        validation = self.validate(operations)
+        if not validation["success"]:
+            return validation
+
+        started = time.perf_counter()
+        results_by_id: Dict[str, Any] = {}
+        entries: List[Dict[str, Any]] = []
+        error_message: Optional[str] = None
+
+        for index, operation in enumerate(operations):
+            name = operation["op"]
+            entry = {"index": index, "id": operation.get("id"), "op": name}
+            entries.append(entry)
+            if error_message:
+                entry.update(success=False, skipped=True)
+                continue
+
+            target, method = self.__operations[name]
+            operation_started = time.perf_counter()
+            try:
+                params = self.__resolve(operation.get("params", {}), results_by_id)
+                result = getattr(self.__targets[target], method)(**params)
+            except Exception as e:
+                result = sdict(False, message=f"{type(e).__name__}: {e}")
+            entry["elapsed_ms"] = round((time.perf_counter() - operation_started) * 1000, 1)
+            entry["success"] = self.__succeeded(result)
+            entry["result"] = result
+            if operation.get("id") is not None:
+                results_by_id[str(operation["id"])] = result
+
+            if not entry["success"] and not operation.get("continue_on_error", False):
+                message = result.get("message") if isinstance(result, dict) else None
+                error_message = f"Operation {index} ({name}) failed" + (f": {message}" if message else "")
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        data = {"operations": entries, "total_ms": total_ms}
+        if error_message:
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, data=data, message=error_message)
+        self.__logger.info(f"[{method_name}] Batch of {len(entries)} operation(s) finished in {total_ms} ms")
+        return sdict(True, data=data, message=f"Batch of {len(entries)} operation(s) completed.")
@@ -1,52 +1,141 @@
-import gphoto2 as gp
-from typing import Optional, List, Dict
-import yaml
-import os
+from __future__ import annotations
+
+from typing import Optional, List, Dict, Any, Callable
+import time
+import threading
 
 from src.utils.rcp_logger import Logger
 from src.utils.utils import *
 from src.utils.gphoto_errors import GPhotoErrorInterpreter
+from src.utils.config_service import ConfigService
+from src.utils.lazy_import import lazy_import
+from src.utils.flight_recorder import recorded
+from src.utils.single_flight import SingleFlight
+
+gp = lazy_import("gphoto2")
 
 class CameraManager:
     def __init__(self, config_path: Optional[str] = None):
+        # The logger, flight recorder and profiler of this process read their settings from the same file
+        if config_path:
+            ConfigService.set_default_path(config_path)
+
         # Initialize logger
         self.__logger = Logger.get_logger("Camera Manager")
         self.__logger.debug('Camera Manager logger has been initialized')
 
-        # Load configuration
-        self.__config = self.__load_config(config_path)
+        # Load configuration (shared, cached and hot-reloaded by the config service)
+        self.__config_service = self.__load_config(config_path)
         self.is_connected = False
         
-        # Initialize GPhoto2 context
-        self.__context = gp.Context()
-        self.__logger.debug('GPhoto2 context has been created')
+        # GPhoto2 context, created on first camera operation (loading libgphoto2 is the slowest part of startup)
+        self.__context = None
 
         # Camera-related attributes
         self.__camera: Optional[gp.Camera] = None
         self.__connected_camera_info: Optional[Dict[str, str]] = None
         self.__available_cameras: List[Dict[str, str]] = []
+        self.__port_info_list: Optional[gp.PortInfoList] = None
+        self.__abilities_list: Optional[gp.CameraAbilitiesList] = None
+
+        # Listeners notified about camera events (connection changes, new files, ...)
+        self.__event_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+        # Concurrent identical reads (e.g. several dashboards polling the summary) share one USB round trip
+        self.__reads = SingleFlight("camera_manager")
+
+        # Held for each operation by callers that serialize camera access (the camera worker runs one call at a
+        # time per camera under it), and by background work on the camera such as the live-view idle exit
+        self.__operation_lock = threading.RLock()
 
-    def __load_config(self, config_path: Optional[str] = None) -> Dict:
+    def __load_config(self, config_path: Optional[str] = None) -> ConfigService:
         """
-        Load configuration from YAML file.
+        Load configuration from YAML file through the shared config service.
         
         :param config_path: Path to the configuration file. If None, uses default path.
-        :return: Loaded configuration dictionary
+        :return: ConfigService of the configuration file
         """
-        default_config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.yaml')
-        config_file = config_path or default_config_path
+        config_service = ConfigService.get_instance(config_path)
+        if config_service.is_loaded():
+            self.__logger.info(f"Configuration loaded from {config_service.get_path()}")
+        else:
+            self.__logger.warning(f"Configuration could not be loaded from {config_service.get_path()}: "
+                                  f"{config_service.get_errors()}. Using default settings.")
+
+        # Watch the file for changes and push them to subscribers (general.config_watch_interval, 0 disables)
+        watch_interval = (config_service.get().get('general', {}) or {}).get('config_watch_interval', 0)
+        if watch_interval:
+            config_service.start_watching(watch_interval)
+        return config_service
+
+    def get_operation_lock(self) -> threading.RLock:
+        """Provides the lock that serializes operations on this camera session."""
+        return self.__operation_lock
 
+    def get_config_service(self) -> ConfigService:
+        """Provides access to the config service, e.g. to subscribe to configuration changes."""
+        return self.__config_service
+
+    def reload_config(self) -> Dict:
+        """
+        Re-read the configuration file now and push changed sections to subscribers.
+
+        :return: A dictionary with the changed sections, or the validation errors if the file was rejected.
+        """
+        result = self.__config_service.reload(force=True)
+        if result["success"]:
+            self.__logger.info(f"Configuration reloaded, changed sections: {result['data']['changed']}")
+        else:
+            self.__logger.error(f"Configuration reload rejected: {result['message']}")
+        return result
+
+    def __get_context(self):
+        if self.__context is None:
+            self.__context = gp.Context()
+            self.__logger.debug('GPhoto2 context has been created')
+        return self.__context
+
+    def warm_up(self) -> Dict:
+        """
+        Load libgphoto2 and create the GPhoto2 context now instead of on the first camera operation.
+
+        :return: A dictionary with the time spent in milliseconds.
+        """
+        started = time.perf_counter()
         try:
-            with open(config_file, 'r') as file:
-                config = yaml.safe_load(file)
-                self.__logger.info(f"Configuration loaded from {config_file}")
-                return config
-        except FileNotFoundError:
-            self.__logger.warning(f"Configuration file not found at {config_file}. Using default settings.")
-            return {}
-        except yaml.YAMLError as e:
-            self.__logger.error(f"Error parsing configuration file: {e}")
-            return {}
+            self.__get_context()
+        except ImportError as e:
+            self.__logger.error(f"[warm_up] Failed to load gphoto2: {e}")
+            return sdict(False, message=f"Failed to load gphoto2: {e}")
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        return sdict(True, data={"elapsed_ms": elapsed_ms}, message="GPhoto2 context ready.")
+
+    def add_event_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """
+        Register a callback that is invoked as ``listener(event_type, data)`` for every camera event.
+
+        :param listener: Callable receiving the event type and its data dictionary.
+        """
+        if listener not in self.__event_listeners:
+            self.__event_listeners.append(listener)
+
+    def remove_event_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """Unregister a callback added with add_event_listener."""
+        if listener in self.__event_listeners:
+            self.__event_listeners.remove(listener)
+
+    def publish_event(self, event_type: str, data: Optional[Dict[str, Any]] = None):
+        """
+        Notify all registered listeners about a camera event.
+
+        :param event_type: Event name, e.g. "connected", "disconnected" or "file_added".
+        :param data: Optional event payload.
+        """
+        for listener in list(self.__event_listeners):
+            try:
+                listener(event_type, data or {})
+            except Exception as e:
+                self.__logger.error(f"Event listener failed for '{event_type}': {e}")
 
     def __del__(self):
         """Destructor to clean up the CameraManager resources."""
@@ -59,7 +148,7 @@ class CameraManager:
         self.__logger.debug(f'[{method_name}] Starting camera detection')
 
         try:
-            camera_list = gp.Camera.autodetect(self.__context)
+            camera_list = gp.Camera.autodetect(self.__get_context())
             camera_count = len(camera_list)
             
             # Sanitized logging
@@ -70,8 +159,7 @@ class CameraManager:
                 camera_names = [name for name, _ in camera_list]
                 self.__logger.debug(f'[{method_name}] Camera names: {", ".join(camera_names)}')
                 
-                for name, path in camera_list:
-                    self.__available_cameras.append({"name": name, "port": path})
+                self.__available_cameras = [{"name": name, "port": path} for name, path in camera_list]
                 
                 return True
             else:
@@ -104,12 +192,14 @@ class CameraManager:
 
             self.__logger.debug(f"Selected camera: {selected_camera_info['name']} at port: {selected_camera_info['port']}")
 
-            # Initialize the camera
+            # Initialize the camera, bound to the selected port so that multi-camera setups open the right body
             self.__camera = gp.Camera()
-            self.__camera.init(self.__context)
+            self.__bind_camera(self.__camera, selected_camera_info)
+            self.__camera.init(self.__get_context())
             self.__connected_camera_info = selected_camera_info
             self.__logger.info(f'Connected to camera: {selected_camera_info["name"]} at port: {selected_camera_info["port"]}')
             self.is_connected = True
+            self.publish_event("connected", dict(selected_camera_info))
             return True
 
         except gp.GPhoto2Error as e:
@@ -123,11 +213,25 @@ class CameraManager:
             self.__connected_camera_info = None
             return False
 
+    def __bind_camera(self, camera: gp.Camera, camera_info: Dict[str, str]):
+        """Sets the port and model abilities of a camera object before init."""
+        if self.__port_info_list is None:
+            self.__port_info_list = gp.PortInfoList()
+            self.__port_info_list.load()
+            self.__abilities_list = gp.CameraAbilitiesList()
+            self.__abilities_list.load(self.__get_context())
+
+        port_index = self.__port_info_list.lookup_path(camera_info['port'])
+        camera.set_port_info(self.__port_info_list[port_index])
+        model_index = self.__abilities_list.lookup_model(camera_info['name'])
+        camera.set_abilities(self.__abilities_list[model_index])
+
+    @recorded("camera_manager")
     def disconnect_camera(self) -> Dict:
         """Disconnects the currently connected camera."""
         if self.__camera:
             try:
-                self.__camera.exit(self.__context)
+                self.__camera.exit(self.__get_context())
                 self.__logger.info("Camera disconnected.")
                 self.is_connected = False
                 return sdict(True, message="Camera disconnected.")
@@ -137,19 +241,26 @@ class CameraManager:
             finally:
                 self.__camera = None
                 self.__connected_camera_info = None
+                self.publish_event("disconnected")
         return sdict(False, message="No camera to disconnect.")
 
+    @recorded("camera_manager")
     def reset_camera(self) -> Dict:
-        """Resets the camera connection."""
+        """Resets the camera connection, reconnecting to the same port if a camera was connected."""
+        port = self.__connected_camera_info['port'] if self.__connected_camera_info else None
         if self.__camera:
             self.__logger.debug("Resetting camera: disconnecting existing connection")
             self.disconnect_camera()
         self.__logger.debug("Attempting to reconnect the camera")
-        success = self.__connect_camera()
+        success = self.__connect_camera(port=port)
         return sdict(success, message="Camera reset successfully." if success else "Failed to reset camera.")
 
+    @recorded("camera_manager")
     def get_camera_summary(self) -> Dict:
-        """Tests the camera connection by retrieving its summary."""
+        """Tests the camera connection by retrieving its summary. Concurrent calls share one camera read."""
+        return self.__reads.do("summary", self.__read_camera_summary)
+
+    def __read_camera_summary(self) -> Dict:
         self.__logger.debug('Getting camera summary')
 
         if not self.__connected_camera_info:
@@ -157,7 +268,7 @@ class CameraManager:
             return sdict(False, message="No camera connected.")
 
         try:
-            summary = self.__camera.get_summary(self.__context).text
+            summary = self.__camera.get_summary(self.__get_context()).text
 
             summary_data = {}
             for line in summary.split("\n"):
@@ -175,6 +286,7 @@ class CameraManager:
             self.__logger.error(f"Unknown error during connection test: {e}")
             return sdict(False, message=f"Unknown error: {e}")
 
+    @recorded("camera_manager")
     def send_signal(self) -> Dict:
         method_name = "send_signal"
         try:
@@ -201,18 +313,39 @@ class CameraManager:
                 return sdict(False, message=f"Configuration error: {config_error}")
 
         except gp.GPhoto2Error as e:
-            error_interpreter = GPhotoErrorInterpreter(e)
-            self.__logger.error(f'[{method_name}] GPhoto2 signal error: {error_interpreter.get_error_message()}')
-            return sdict(False, message=f"Camera signal error: {error_interpreter.get_error_message()}")
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f'[{method_name}] GPhoto2 signal error: {error_message}')
+            return sdict(False, message=f"Camera signal error: {error_message}")
         except Exception as e:
             self.__logger.error(f'[{method_name}] Unexpected signal error: {e}')
             return sdict(False, message="Unexpected error during signal sending")
 
-    def connect(self, camera_name: Optional[str] = None) -> Dict:
+    def detect_cameras(self) -> Dict:
+        """
+        Lists the cameras attached to the host without connecting to any of them.
+
+        :return: A dictionary whose data holds ``cameras``, a list of ``{"name", "port"}`` entries.
+        """
+        if not self.__detect_cameras():
+            return sdict(False, data={"cameras": []}, message="Camera detection failed or no cameras found")
+        return sdict(True, data={"cameras": [dict(camera) for camera in self.__available_cameras]},
+                     message=f"Detected {len(self.__available_cameras)} camera(s).")
+
+    def get_coalescing_stats(self) -> Dict:
+        """
+        Returns how many reads of this process were coalesced (hits) or went to a camera (misses), per component.
+
+        :return: A dictionary with the counters of every component
+        """
+        return sdict(True, data=SingleFlight.collect_stats(), message="Coalescing statistics.")
+
+    @recorded("camera_manager")
+    def connect(self, camera_name: Optional[str] = None, port: Optional[str] = None) -> Dict:
         """
         Attempts to detect and connect to a camera.
 
         :param camera_name: Optional. The name of the camera to connect to.
+        :param port: Optional. The port of the camera to connect to (e.g. "usb:001,005"). Takes precedence over the name.
         :return: A dictionary with the success status and details of the connected camera.
         """
         self.__logger.debug('Starting camera connection process')
@@ -225,16 +358,23 @@ class CameraManager:
 
         selected_camera_info = None
 
-        # Select a specific camera if name is provided
-        if camera_name:
+        # Select a specific camera if port or name is provided
+        if port:
+            self.__logger.debug(f"Looking for camera on port '{port}'")
+            selected_camera_info = next((cam for cam in self.__available_cameras if cam['port'] == port), None)
+            if not selected_camera_info:
+                error_message = f"No camera found on port '{port}'"
+                self.__logger.error(error_message)
+                return sdict(False, message=error_message)
+        elif camera_name:
             self.__logger.debug(f"Looking for camera named '{camera_name}'")
             selected_camera_info = next((cam for cam in self.__available_cameras if cam['name'] == camera_name), None)
             if not selected_camera_info:
                 warning_message = f"No camera found with name '{camera_name}', switching to auto mode"
                 self.__logger.warning(warning_message)
                 selected_camera_info = self.__available_cameras[0]
-        elif self.__config.get('camera', {}).get('name'):
-            camera_name = self.__config['camera']['name']
+        elif self.__config_service.get_section('camera').get('name'):
+            camera_name = self.__config_service.get_section('camera')['name']
             self.__logger.debug(f"Using camera name from config: {camera_name}")
             selected_camera_info = next((cam for cam in self.__available_cameras if cam['name'] == camera_name), None)
             if not selected_camera_info:
@@ -258,6 +398,10 @@ class CameraManager:
         """Provides access to the current camera instance."""
         return self.__camera
 
+    def get_connected_camera_info(self) -> Optional[Dict[str, str]]:
+        """Returns the name and port of the connected camera, or None if no camera is connected."""
+        return self.__connected_camera_info
+
     def get_config(self) -> Dict:
         """
         Retrieve the loaded configuration.
@@ -266,7 +410,8 @@ class CameraManager:
         :return: Dictionary containing the loaded configuration or default configuration
         """
         # If configuration is empty or None, return a default configuration
-        if not self.__config:
+        config = self.__config_service.get()
+        if not config:
             default_config = {
                 'camera': {
                     'name': 'Default Camera',
@@ -286,4 +431,4 @@ class CameraManager:
             self.__logger.warning("Using default configuration as no config was loaded.")
             return default_config
         
-        return self.__config
+        return config
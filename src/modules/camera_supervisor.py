@@ -0,0 +1,325 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, List
+
+from src.modules.camera_manager import CameraManager
+from src.modules.camera_worker import CameraWorker, WorkerProxy, WORKER_TARGETS
+from src.modules.batch_runner import BATCH_OPERATIONS, PATH_PARAMETERS
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+
+SHARD_BY_BUS = "bus"
+SHARD_BY_COUNT = "count"
+
+
+class CameraSupervisor:
+    def __init__(self, config: Dict, config_path: Optional[str] = None):
+        """
+        Shards the attached cameras across several camera worker processes and routes calls to them.
+
+        Cameras are grouped per USB bus (``supervisor.shard_by: bus``) or in groups of
+        ``supervisor.cameras_per_worker`` (``shard_by: count``); each group gets its own CameraWorker process,
+        so transfers and image handling of different bodies run on different cores. Calls are routed to the
+        worker owning the camera's port, and per-camera call metrics are kept for ``get_status``.
+
+        :param config: Configuration dictionary (see the ``supervisor`` and ``worker`` sections of config.yaml).
+        :param config_path: Configuration file passed on to the workers.
+        """
+        self.__logger = Logger.get_logger("Camera Supervisor")
+        self.__config = config
+        self.__config_path = config_path
+
+        supervisor_config = config.get('supervisor', {}) or {}
+        self.__shard_by = supervisor_config.get('shard_by', SHARD_BY_BUS)
+        self.__cameras_per_worker = max(1, supervisor_config.get('cameras_per_worker', 2))
+        self.__executor = ThreadPoolExecutor(max_workers=supervisor_config.get('parallel_calls', 8),
+                                             thread_name_prefix="camera-supervisor")
+
+        self.__lock = threading.Lock()
+        self.__workers: Dict[str, CameraWorker] = {}
+        self.__routes: Dict[str, CameraWorker] = {}
+        self.__cameras: Dict[str, Dict[str, Any]] = {}
+        self.__metrics: Dict[str, Dict[str, Any]] = {}
+        self.__event_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self.__running = False
+
+    @staticmethod
+    def __new_metrics() -> Dict[str, Any]:
+        return {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": None}
+
+    @staticmethod
+    def get_bus(port: str) -> str:
+        """
+        Returns the USB bus of a gphoto2 port ("usb:001,005" -> "001"), or the port itself for other port types.
+
+        :param port: gphoto2 port string.
+        """
+        if port.startswith("usb:") and "," in port:
+            return port[4:].split(",", 1)[0]
+        return port
+
+    @staticmethod
+    def shard_cameras(cameras: List[Dict[str, str]], shard_by: str = SHARD_BY_BUS,
+                      cameras_per_worker: int = 2) -> List[List[Dict[str, str]]]:
+        """
+        Groups cameras into worker shards.
+
+        :param cameras: ``{"name", "port"}`` entries, as returned by ``CameraManager.detect_cameras``.
+        :param shard_by: "bus" for one shard per USB bus, "count" for shards of ``cameras_per_worker`` cameras.
+        :param cameras_per_worker: Shard size when sharding by count.
+        :return: List of shards, each a list of cameras.
+        """
+        if shard_by == SHARD_BY_COUNT:
+            size = max(1, cameras_per_worker)
+            return [cameras[index:index + size] for index in range(0, len(cameras), size)]
+        if shard_by != SHARD_BY_BUS:
+            raise ValueError(f"Unknown shard mode: {shard_by}")
+
+        shards: Dict[str, List[Dict[str, str]]] = {}
+        for camera in cameras:
+            shards.setdefault(CameraSupervisor.get_bus(camera["port"]), []).append(camera)
+        return [shards[bus] for bus in sorted(shards)]
+
+    def discover(self) -> Dict:
+        """Detects the attached cameras without connecting to them."""
+        return CameraManager(self.__config_path).detect_cameras()
+
+    def is_running(self) -> bool:
+        """Returns True once the workers have been started."""
+        return self.__running
+
+    def add_event_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """Register a callback for camera events of all workers. The event data carries the camera's port."""
+        if listener not in self.__event_listeners:
+            self.__event_listeners.append(listener)
+        with self.__lock:
+            workers = list(self.__workers.values())
+        for worker in workers:
+            worker.add_event_listener(listener)
+
+    def start(self, cameras: Optional[List[Dict[str, str]]] = None) -> Dict:
+        """
+        Starts one worker per shard and connects every camera in its worker.
+
+        :param cameras: Cameras to host. Detected when omitted.
+        :return: A dictionary with the workers and the connection result of each camera.
+        """
+        method_name = "start"
+        with self.__lock:
+            already_running = self.__running
+            self.__running = True
+        if already_running:
+            return sdict(True, data=self.get_status()["data"], message="Supervisor already running.")
+
+        if cameras is None:
+            detected = self.discover()
+            if not detected["success"]:
+                self.__running = False
+                return sdict(False, message=detected["message"])
+            cameras = detected["data"]["cameras"]
+
+        shards = self.shard_cameras(cameras, self.__shard_by, self.__cameras_per_worker)
+        self.__logger.info(f"[{method_name}] Sharding {len(cameras)} camera(s) across {len(shards)} worker(s) "
+                           f"by {self.__shard_by}")
+
+        failed = {}
+        for index, shard in enumerate(shards):
+            name = f"camera-worker-{index}"
+            worker = CameraWorker(self.__config, self.__config_path, cameras=[camera["port"] for camera in shard],
+                                  name=name)
+            for listener in self.__event_listeners:
+                worker.add_event_listener(listener)
+            result = worker.start()
+            if not result["success"]:
+                self.__logger.error(f"[{method_name}] {name}: {result['message']}")
+                # Its cameras are not routed, but they are part of the rig and must show up as failed
+                for camera in shard:
+                    failed[camera["port"]] = sdict(False, message=f"Worker {name} failed to start: "
+                                                                  f"{result['message']}")
+                continue
+            with self.__lock:
+                self.__workers[name] = worker
+                for camera in shard:
+                    self.__routes[camera["port"]] = worker
+                    self.__cameras[camera["port"]] = {"name": camera["name"], "port": camera["port"], "worker": name}
+                    self.__metrics[camera["port"]] = self.__new_metrics()
+
+        connected = self.map(lambda port: self.call(port, "camera_manager", "connect", port=port))
+        connected.update(failed)
+        success = bool(connected) and all(result.get("success") for result in connected.values())
+        message = f"Started {len(self.__workers)} worker(s) for {len(self.__routes)} camera(s)."
+        if failed:
+            message += f" {len(failed)} camera(s) without a worker: {', '.join(failed)}."
+        return sdict(success, data={"workers": list(self.__workers), "cameras": connected}, message=message)
+
+    def stop(self) -> Dict:
+        """Disconnects the cameras and stops all workers."""
+        with self.__lock:
+            workers = list(self.__workers.values())
+            self.__workers.clear()
+            self.__routes.clear()
+            self.__cameras.clear()
+            self.__running = False
+        for worker in workers:
+            worker.stop()
+        return sdict(True, message=f"Stopped {len(workers)} worker(s).")
+
+    def list_cameras(self) -> List[Dict[str, Any]]:
+        """Returns the hosted cameras with the name of their worker."""
+        with self.__lock:
+            return [dict(camera) for camera in self.__cameras.values()]
+
+    def get_proxy(self, camera: str, target: str) -> WorkerProxy:
+        """
+        Returns an object that forwards calls to one component of one camera.
+
+        :param camera: Camera port.
+        :param target: One of WORKER_TARGETS.
+        """
+        with self.__lock:
+            worker = self.__routes.get(camera)
+        if worker is None:
+            raise KeyError(f"No worker hosts camera {camera}")
+        return worker.get_proxy(target, camera)
+
+    def call(self, camera: str, target: str, method: str, *args, _deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Call a method of one camera's component in the worker that owns it.
+
+        :param camera: Camera port.
+        :param target: One of WORKER_TARGETS.
+        :param method: Method (or attribute) name.
+        :param _deadline: Deadline in seconds. Defaults to ``worker.operation_timeouts``. Other keyword arguments,
+                          including ``timeout``, are passed on to the method.
+        :return: The method's return value, or an error dictionary.
+        """
+        if target not in WORKER_TARGETS:
+            return sdict(False, message=f"Unknown target: {target}")
+        with self.__lock:
+            worker = self.__routes.get(camera)
+        if worker is None:
+            return sdict(False, message=f"No worker hosts camera {camera}")
+
+        started = time.perf_counter()
+        result = worker.call_camera(camera, target, method, *args, _deadline=_deadline, **kwargs)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self.__lock:
+            metrics = self.__metrics.setdefault(camera, self.__new_metrics())
+            metrics["calls"] += 1
+            metrics["total_ms"] += elapsed_ms
+            metrics["max_ms"] = max(metrics["max_ms"], elapsed_ms)
+            metrics["last_ms"] = round(elapsed_ms, 3)
+            if isinstance(result, dict) and result.get("success") is False:
+                metrics["errors"] += 1
+        return result
+
+    def call_operation(self, camera: str, operation: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Run one of BATCH_OPERATIONS on a camera, for callers that must not reach arbitrary methods.
+
+        :param camera: Camera port.
+        :param operation: Operation name, see BATCH_OPERATIONS.
+        :param params: Keyword arguments of the operation. Local paths (PATH_PARAMETERS) are refused.
+        :return: The operation's return value, or an error dictionary.
+        """
+        if operation not in BATCH_OPERATIONS:
+            return sdict(False, message=f"Unknown operation '{operation}'. "
+                                        f"Available: {', '.join(sorted(BATCH_OPERATIONS))}")
+        params = params or {}
+        refused = sorted(PATH_PARAMETERS.intersection(params))
+        if refused:
+            return sdict(False, message=f"Parameter(s) {', '.join(refused)} cannot be set for '{operation}'.")
+        target, method = BATCH_OPERATIONS[operation]
+        return self.call(camera, target, method, **params)
+
+    def map(self, function: Callable[[str], Any], cameras: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Run ``function(port)`` for several cameras in parallel.
+
+        :param function: Called with each camera port.
+        :param cameras: Ports to run on. Defaults to all hosted cameras.
+        :return: Results keyed by port.
+        """
+        ports = cameras if cameras is not None else [camera["port"] for camera in self.list_cameras()]
+        futures = {port: self.__executor.submit(function, port) for port in ports}
+        results = {}
+        for port, future in futures.items():
+            try:
+                results[port] = future.result()
+            except Exception as e:
+                results[port] = sdict(False, message=f"{type(e).__name__}: {e}")
+        return results
+
+    def broadcast(self, target: str, method: str, *args, cameras: Optional[List[str]] = None,
+                  _deadline: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Call the same method on several cameras in parallel.
+
+        :param target: One of WORKER_TARGETS.
+        :param method: Method (or attribute) name.
+        :param cameras: Ports to call. Defaults to all hosted cameras.
+        :param _deadline: Deadline in seconds of each call.
+        :return: Results keyed by port.
+        """
+        return self.map(lambda port: self.call(port, target, method, *args, _deadline=_deadline, **kwargs), cameras)
+
+    def clone_config(self, source: str, cameras: Optional[List[str]] = None, dry_run: bool = False) -> Dict:
+        """
+        Match the settings of several cameras to one camera: export its snapshot and restore it on the others in
+        parallel. Each target only receives the settings that differ.
+
+        :param source: Port of the camera to copy.
+        :param cameras: Ports to update. Defaults to every other hosted camera.
+        :param dry_run: Only compute each camera's difference.
+        :return: A dictionary with the restore result of each camera, keyed by port.
+        """
+        method_name = "clone_config"
+        started = time.perf_counter()
+        exported = self.call(source, "config_handler", "export_snapshot")
+        if not exported["success"]:
+            return exported
+        snapshot = exported["data"]["snapshot"]
+
+        if cameras is None:
+            cameras = [camera["port"] for camera in self.list_cameras() if camera["port"] != source]
+        results = self.map(lambda port: self.call(port, "config_handler", "restore_snapshot", snapshot,
+                                                  dry_run=dry_run), [port for port in cameras if port != source])
+        failed = [port for port, result in results.items() if not result["success"]]
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.__logger.info(f"[{method_name}] Cloned {source} to {len(results) - len(failed)} of {len(results)} "
+                           f"camera(s) in {elapsed_ms} ms")
+        return sdict(not failed, data={"source": source, "settings": len(snapshot["settings"]), "results": results,
+                                       "elapsed_ms": elapsed_ms},
+                     message=f"Cloned {source} to {len(results) - len(failed)} of {len(results)} camera(s).")
+
+    def get_status(self) -> Dict:
+        """Returns the state of every worker and the call metrics of every camera."""
+        with self.__lock:
+            workers = dict(self.__workers)
+            cameras = {port: dict(camera) for port, camera in self.__cameras.items()}
+            metrics = {port: dict(values) for port, values in self.__metrics.items()}
+
+        for port, camera in cameras.items():
+            values = metrics.get(port) or {}
+            calls = values.get("calls", 0)
+            camera["metrics"] = {
+                "calls": calls,
+                "errors": values.get("errors", 0),
+                "avg_ms": round(values["total_ms"] / calls, 3) if calls else None,
+                "max_ms": round(values.get("max_ms", 0.0), 3),
+                "last_ms": values.get("last_ms"),
+            }
+
+        return sdict(True, data={
+            "running": self.__running,
+            "shard_by": self.__shard_by,
+            "workers": [worker.get_status()["data"] for worker in workers.values()],
+            "cameras": list(cameras.values()),
+            "totals": {
+                "cameras": len(cameras),
+                "calls": sum(camera["metrics"]["calls"] for camera in cameras.values()),
+                "errors": sum(camera["metrics"]["errors"] for camera in cameras.values()),
+            },
+        })
@@ -0,0 +1,546 @@
+import time
+import threading
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from typing import Optional, Dict, Any, Callable, List
+
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+from src.utils.flight_recorder import FlightRecorder
+from src.utils.profiler import Profiler
+from src.utils.single_flight import SingleFlight
+
+# Targets that can be called inside the worker process
+WORKER_TARGETS = ("camera_manager", "capture_handler", "config_handler", "card_handler", "thumbnail_handler",
+                  "sequence_handler", "focus_handler", "flight_recorder", "profiler")
+
+# Read-only calls whose concurrent identical requests share one round trip to the worker
+COALESCED_CALLS = {("camera_manager", "get_camera_summary"), ("config_handler", "get_config_value"),
+                   ("card_handler", "get_storage_info")}
+
+SHM_MARKER = "__shm__"
+
+
+def _to_shared_memory(value: Any, threshold: int) -> Any:
+    """Recursively moves large byte payloads of a result into shared memory blocks (worker side)."""
+    if isinstance(value, (bytes, bytearray, memoryview)) and len(value) >= threshold:
+        block = shared_memory.SharedMemory(create=True, size=len(value))
+        block.buf[:len(value)] = value
+        # The parent process unlinks the block once it has read it
+        resource_tracker.unregister(block._name, "shared_memory")
+        block.close()
+        return {SHM_MARKER: block.name, "size": len(value)}
+    if isinstance(value, dict):
+        return {key: _to_shared_memory(item, threshold) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_shared_memory(item, threshold) for item in value)
+    return value
+
+
+def _from_shared_memory(value: Any) -> Any:
+    """Recursively replaces shared memory markers with the bytes they point to and frees the blocks (parent side)."""
+    if isinstance(value, dict):
+        if SHM_MARKER in value:
+            block = shared_memory.SharedMemory(name=value[SHM_MARKER])
+            try:
+                return bytes(block.buf[:value["size"]])
+            finally:
+                block.close()
+                block.unlink()
+        return {key: _from_shared_memory(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_from_shared_memory(item) for item in value)
+    return value
+
+
+def _worker_main(connection, config_path: Optional[str], shm_threshold: int, cameras: Optional[List[str]] = None):
+    """
+    Entry point of the worker process: owns the gphoto2 sessions and serves calls from the parent.
+
+    Without ``cameras`` the process hosts a single session. With a list of camera ports it hosts one session
+    (CameraManager and handlers) per camera; each session serves its calls on its own thread, so bodies
+    sharing the process transfer in parallel (libgphoto2 releases the GIL during USB I/O).
+    """
+    import queue
+    from src.modules.camera_manager import CameraManager
+    from src.modules.capture_handler import CaptureHandler
+    from src.modules.config_handler import ConfigHandler
+    from src.modules.card_handler import CardHandler
+    from src.modules.thumbnail_handler import ThumbnailHandler
+    from src.modules.sequence_handler import SequenceHandler
+    from src.modules.focus_handler import FocusHandler
+
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            connection.send(message)
+
+    def build_session(camera: Optional[str]) -> Dict[str, Any]:
+        camera_manager = CameraManager(config_path)
+        capture_handler = CaptureHandler(camera_manager)
+        config_handler = ConfigHandler(camera_manager)
+        if camera is None:
+            camera_manager.add_event_listener(lambda event_type, data: send(("event", event_type, data)))
+        else:
+            # Tag events with the camera they come from
+            camera_manager.add_event_listener(
+                lambda event_type, data: send(("event", event_type, dict(data or {}, camera=camera))))
+        return {
+            "camera_manager": camera_manager,
+            "capture_handler": capture_handler,
+            "config_handler": config_handler,
+            "card_handler": CardHandler(camera_manager),
+            "thumbnail_handler": ThumbnailHandler(camera_manager),
+            "sequence_handler": SequenceHandler(camera_manager, config_handler, capture_handler),
+            "focus_handler": FocusHandler(camera_manager, config_handler, capture_handler),
+            "flight_recorder": FlightRecorder.get_instance(),
+            "profiler": Profiler.get_instance(),
+        }
+
+    def serve(targets: Dict[str, Any], requests: "queue.Queue"):
+        while True:
+            message = requests.get()
+            if message is None:
+                break
+            request_id, target, method, args, kwargs = message
+            try:
+                attribute = getattr(targets[target], method)
+                # Background threads of the session (live-view idle exit) take the same lock before using the camera
+                with targets["camera_manager"].get_operation_lock():
+                    result = attribute(*args, **kwargs) if callable(attribute) else attribute
+                send(("result", request_id, _to_shared_memory(result, shm_threshold)))
+            except Exception as e:
+                send(("error", request_id, f"{type(e).__name__}: {e}"))
+
+    sessions = {camera: build_session(camera) for camera in (cameras or [None])}
+    queues = {camera: queue.Queue() for camera in sessions}
+    threads = [threading.Thread(target=serve, args=(sessions[camera], queues[camera]), daemon=True,
+                                name=f"camera-session-{camera or 'default'}") for camera in sessions]
+    for thread in threads:
+        thread.start()
+    send(("ready",))
+
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            break
+        if message[0] == "stop":
+            break
+
+        _, request_id, target, method, args, kwargs = message[:6]
+        camera = message[6] if len(message) > 6 else None
+        if camera not in queues:
+            send(("error", request_id, f"Camera {camera} is not hosted by this worker"))
+            continue
+        queues[camera].put((request_id, target, method, args, kwargs))
+
+    for requests in queues.values():
+        requests.put(None)
+    for thread in threads:
+        thread.join(timeout=5)
+    for session in sessions.values():
+        session["camera_manager"].disconnect_camera()
+
+
+class WorkerProxy:
+    """Forwards method calls and attribute reads for one target object to the worker process."""
+
+    def __init__(self, worker: "CameraWorker", target: str, camera: Optional[str] = None):
+        self.__worker = worker
+        self.__target = target
+        self.__camera = camera
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name == "is_connected":
+            # Tracked in this process, so status checks never wait behind a running camera operation
+            return self.__worker.is_connected(self.__camera)
+        return lambda *args, **kwargs: self.__worker.call_camera(self.__camera, self.__target, name, *args, **kwargs)
+
+
+class CameraWorker:
+    def __init__(self, config: Dict, config_path: Optional[str] = None, cameras: Optional[List[str]] = None,
+                 name: str = "camera-worker"):
+        """
+        Runs a camera's gphoto2 session in a supervised child process.
+
+        With ``cameras`` the process hosts one session per camera port instead (see CameraSupervisor);
+        calls are routed with ``call_camera`` and run in parallel across cameras, one at a time per camera.
+
+        Every call gets a deadline from ``worker.operation_timeouts`` (sequences add a budget per frame, see
+        ``get_deadline``). If it is exceeded the worker is
+        killed, respawned and reconnected to the same camera, so a hung libgphoto2 call cannot wedge
+        the caller. Byte payloads above ``worker.shm_threshold`` are returned through shared memory.
+
+        :param config: Configuration dictionary (see the ``worker`` section of config.yaml).
+        :param config_path: Configuration file passed on to the CameraManager in the worker.
+        :param cameras: Ports of the cameras hosted by this worker, or None for a single session.
+        :param name: Process name, used in logs.
+        """
+        self.__logger = Logger.get_logger("Camera Worker")
+        self.__config_path = config_path
+        self.__cameras = list(cameras) if cameras else None
+        self.__name = name
+
+        worker_config = config.get('worker', {}) or {}
+        self.__start_timeout = worker_config.get('start_timeout', 15)
+        self.__watchdog_interval = worker_config.get('watchdog_interval', 1.0)
+        self.__shm_threshold = worker_config.get('shm_threshold', 65536)
+        self.__operation_timeouts = dict({"default": 30}, **(worker_config.get('operation_timeouts', {}) or {}))
+        self.__focus_config = config.get('focus', {}) or {}
+        # With general.lazy_init the process is spawned by the first call instead of by the application at startup
+        self.__lazy_start = bool((config.get('general', {}) or {}).get('lazy_init', False))
+
+        self.__context = multiprocessing.get_context("spawn")
+        self.__process = None
+        self.__connection = None
+        self.__generation = 0
+
+        self.__call_locks: Dict[Optional[str], threading.Lock] = {}    # One operation at a time per camera
+        self.__restart_lock = threading.Lock()
+        self.__state_lock = threading.Lock()
+        self.__pending: Dict[int, Dict[str, Any]] = {}
+        self.__next_request_id = 0
+
+        # Per camera (None for a single session): arguments to reconnect with after a respawn
+        self.__connect_arguments: Dict[Optional[str], Dict[str, Any]] = {}
+        # Per camera: connection state, from connect/disconnect results and the worker's camera events
+        self.__connected: Dict[Optional[str], bool] = {}
+        self.__event_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self.__reads = SingleFlight("camera_worker")
+        self.__restart_count = 0
+        self.__running = False
+        self.__watchdog_thread: Optional[threading.Thread] = None
+
+    def start(self) -> Dict:
+        """Starts the worker process and the watchdog."""
+        with self.__state_lock:
+            if self.__running:
+                return sdict(True, message="Worker already running.")
+            self.__running = True
+
+        if not self.__spawn():
+            self.__running = False
+            return sdict(False, message="Camera worker failed to start.")
+
+        self.__watchdog_thread = threading.Thread(target=self.__watchdog_loop, name=f"{self.__name}-watchdog", daemon=True)
+        self.__watchdog_thread.start()
+        return sdict(True, message="Camera worker started.")
+
+    def stop(self) -> Dict:
+        """Stops the watchdog and the worker process."""
+        self.__running = False
+        if self.__connection:
+            try:
+                self.__connection.send(("stop",))
+            except (OSError, ValueError):
+                pass
+        if self.__process:
+            self.__process.join(timeout=5)
+        self.__kill()
+        return sdict(True, message="Camera worker stopped.")
+
+    def get_proxy(self, target: str, camera: Optional[str] = None) -> WorkerProxy:
+        """
+        Returns an object that forwards calls to one of the worker's components.
+
+        :param target: One of WORKER_TARGETS.
+        :param camera: Camera port, for workers hosting several cameras.
+        """
+        if target not in WORKER_TARGETS:
+            raise ValueError(f"Unknown worker target: {target}")
+        return WorkerProxy(self, target, camera)
+
+    def get_cameras(self) -> Optional[List[str]]:
+        """Returns the ports of the cameras hosted by this worker, or None for a single session."""
+        return list(self.__cameras) if self.__cameras else None
+
+    def add_event_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """Register a callback for camera events forwarded from the worker process."""
+        if listener not in self.__event_listeners:
+            self.__event_listeners.append(listener)
+
+    def is_connected(self, camera: Optional[str] = None) -> bool:
+        """
+        Returns True if the worker's session of a camera is connected. Answered without a call to the worker.
+
+        :param camera: Camera port, or None for a single-session worker.
+        """
+        return self.__connected.get(camera, False)
+
+    def get_status(self) -> Dict:
+        """Returns the worker process state."""
+        return sdict(True, data={
+            "name": self.__name,
+            "cameras": self.get_cameras(),
+            "pid": self.__process.pid if self.__process else None,
+            "alive": bool(self.__process and self.__process.is_alive()),
+            "restarts": self.__restart_count,
+        })
+
+    def get_deadline(self, method: str, args: tuple = (), kwargs: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Returns the deadline of a call in seconds, from ``worker.operation_timeouts``.
+
+        A sequence gets its ``run_sequence`` time plus, per frame, its interval and ``sequence_frame`` seconds
+        to capture and download it, so long or slow sequences are not killed halfway (before their settings
+        are restored). Autofocus gets its ``autofocus`` time plus ``focus_step`` seconds and the settle time for
+        twice its step budget (search steps and the moves back to the best position). A ``timeout`` argument
+        of the method itself (e.g. ``wait_until_ready``) extends the deadline past it.
+
+        :param method: Method name.
+        :param args: Positional arguments of the call.
+        :param kwargs: Keyword arguments of the call.
+        """
+        kwargs = kwargs or {}
+        timeouts = self.__operation_timeouts
+        timeout = timeouts.get(method, timeouts["default"])
+        if method == "run_sequence":
+            steps = kwargs.get("steps", args[0] if args else None)
+            frames = len(steps) if isinstance(steps, (list, tuple)) else 1
+            try:
+                interval = max(0.0, float(kwargs.get("interval", args[3] if len(args) > 3 else 0) or 0))
+            except (TypeError, ValueError):
+                interval = 0.0
+            timeout += frames * (interval + timeouts.get("sequence_frame", timeouts.get("capture_image", 60)))
+        elif method == "autofocus":
+            max_steps = kwargs.get("max_steps", args[0] if args else None)
+            settle_ms = kwargs.get("settle_ms", args[4] if len(args) > 4 else None)
+            try:
+                max_steps = int(self.__focus_config.get('max_steps', 40) if max_steps is None else max_steps)
+                settle = float(self.__focus_config.get('settle_ms', 50) if settle_ms is None else settle_ms) / 1000
+            except (TypeError, ValueError):
+                return timeout
+            timeout += 2 * max(0, max_steps) * (timeouts.get("focus_step", 5) + max(0.0, settle))
+        if isinstance(kwargs.get("timeout"), (int, float)) and kwargs["timeout"] > 0:
+            # The method's own wait (e.g. wait_until_ready) must end before the worker is declared hung
+            timeout = max(timeout, kwargs["timeout"] + timeouts["default"])
+        return timeout
+
+    def call(self, target: str, method: str, *args, _deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Call a method of a component in the worker process.
+
+        :param target: One of WORKER_TARGETS.
+        :param method: Method (or attribute) name.
+        :param _deadline: Deadline in seconds. Defaults to ``get_deadline``. Other keyword arguments, including
+                          ``timeout``, are passed on to the method.
+        :return: The method's return value, or an error dictionary if the call failed or timed out.
+        """
+        return self.call_camera(None, target, method, *args, _deadline=_deadline, **kwargs)
+
+    def call_camera(self, camera: Optional[str], target: str, method: str, *args, _deadline: Optional[float] = None,
+                    **kwargs) -> Any:
+        """
+        Call a method of one camera's component in the worker process.
+
+        :param camera: Camera port, or None for a single-session worker.
+        :param target: One of WORKER_TARGETS.
+        :param method: Method (or attribute) name.
+        :param _deadline: Deadline in seconds. Defaults to ``get_deadline``. Other keyword arguments, including
+                          ``timeout``, are passed on to the method.
+        :return: The method's return value, or an error dictionary if the call failed or timed out.
+        """
+        timeout = self.get_deadline(method, args, kwargs) if _deadline is None else _deadline
+
+        if self.__lazy_start and not self.__running:
+            self.start()
+
+        if (target, method) in COALESCED_CALLS and not kwargs and self.__hashable(args):
+            # Callers queue behind the per-camera lock anyway; identical reads can share the one that runs
+            return self.__reads.do((camera, target, method, args),
+                                   lambda: self.__recorded_call(camera, target, method, timeout, args, kwargs))
+        return self.__recorded_call(camera, target, method, timeout, args, kwargs)
+
+    @staticmethod
+    def __hashable(args: tuple) -> bool:
+        """Arguments decoded from JSON may contain lists or dicts, which cannot key a coalesced read."""
+        try:
+            hash(args)
+            return True
+        except TypeError:
+            return False
+
+    def __recorded_call(self, camera: Optional[str], target: str, method: str, timeout: float, args: tuple,
+                        kwargs: Dict[str, Any]) -> Any:
+        # Recorded on this side too: if the worker hangs and is killed, its own recorder is lost with it
+        recorder = FlightRecorder.get_instance()
+        sequence = recorder.begin(f"worker.{target}", method, (camera,) + args if camera else args, kwargs)
+        result = self.__call(camera, target, method, timeout, args, kwargs)
+        if isinstance(result, dict) and "success" in result:
+            recorder.end(sequence, bool(result["success"]), result.get("message"))
+        else:
+            recorder.end(sequence, True)
+        return result
+
+    def __call(self, camera: Optional[str], target: str, method: str, timeout: float, args: tuple,
+               kwargs: Dict[str, Any]) -> Any:
+        with self.__state_lock:
+            call_lock = self.__call_locks.setdefault(camera, threading.Lock())
+
+        with call_lock:
+            if not self.__process or not self.__process.is_alive():
+                return sdict(False, message="Camera worker is not running.")
+
+            with self.__state_lock:
+                self.__next_request_id += 1
+                request_id = self.__next_request_id
+                slot = {"event": threading.Event(), "response": None}
+                self.__pending[request_id] = slot
+                generation = self.__generation
+
+            try:
+                self.__connection.send(("call", request_id, target, method, args, kwargs, camera))
+                completed = slot["event"].wait(timeout)
+            except (OSError, ValueError) as e:
+                completed, slot["response"] = True, ("error", f"Worker connection lost: {e}")
+            finally:
+                with self.__state_lock:
+                    self.__pending.pop(request_id, None)
+
+            if not completed:
+                self.__logger.error(f"[{target}.{method}] Deadline of {timeout}s exceeded, restarting worker")
+                self.__restart(f"{target}.{method} exceeded its {timeout}s deadline", generation)
+                return sdict(False, message=f"{method} timed out after {timeout} seconds; camera worker restarted.")
+
+        kind, payload = slot["response"]
+        if kind == "error":
+            self.__logger.error(f"[{target}.{method}] {payload}")
+            return sdict(False, message=payload)
+
+        if target == "camera_manager" and method == "connect" and isinstance(payload, dict) and payload.get("success"):
+            # Remember the camera so that a respawned worker reconnects to the same body
+            self.__connect_arguments[camera] = {"port": payload["data"].get("port")}
+            self.__connected[camera] = True
+        elif target == "camera_manager" and method == "disconnect_camera":
+            self.__connect_arguments.pop(camera, None)
+            self.__connected[camera] = False
+        return payload
+
+    def __spawn(self) -> bool:
+        parent_connection, child_connection = self.__context.Pipe()
+        process = self.__context.Process(target=_worker_main, name=self.__name, daemon=True,
+                                         args=(child_connection, self.__config_path, self.__shm_threshold,
+                                               self.__cameras))
+        process.start()
+        child_connection.close()
+
+        if not parent_connection.poll(self.__start_timeout):
+            self.__logger.error("Camera worker did not become ready in time")
+            process.kill()
+            return False
+        try:
+            parent_connection.recv()
+        except EOFError:
+            self.__logger.error("Camera worker exited during startup")
+            return False
+
+        with self.__state_lock:
+            self.__generation += 1
+            self.__process = process
+            self.__connection = parent_connection
+            generation = self.__generation
+
+        threading.Thread(target=self.__reader_loop, args=(parent_connection, generation),
+                         name=f"{self.__name}-reader", daemon=True).start()
+        self.__logger.info(f"Camera worker {self.__name} started (pid {process.pid})")
+        return True
+
+    def __reader_loop(self, connection, generation: int):
+        """Routes results to waiting callers and forwards events to listeners."""
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                break
+
+            if message[0] == "event":
+                if message[1] in ("connected", "disconnected"):
+                    self.__connected[(message[2] or {}).get("camera") if self.__cameras else None] = \
+                        message[1] == "connected"
+                for listener in list(self.__event_listeners):
+                    try:
+                        listener(message[1], message[2])
+                    except Exception as e:
+                        self.__logger.error(f"Event listener failed for '{message[1]}': {e}")
+                continue
+
+            kind, request_id, payload = message
+            if kind == "result":
+                payload = _from_shared_memory(payload)
+            with self.__state_lock:
+                slot = self.__pending.get(request_id)
+            if slot:
+                slot["response"] = (kind, payload)
+                slot["event"].set()
+            elif kind == "result":
+                self.__logger.warning(f"Discarded late result for request {request_id}")
+
+        # Fail any caller still waiting on this process
+        with self.__state_lock:
+            if generation == self.__generation:
+                self.__connected.clear()
+                for slot in self.__pending.values():
+                    slot["response"] = ("error", "Camera worker exited unexpectedly.")
+                    slot["event"].set()
+
+    def __kill(self):
+        process, connection = self.__process, self.__connection
+        if process and process.is_alive():
+            process.terminate()
+            process.join(timeout=2)
+            if process.is_alive():
+                process.kill()
+                process.join(timeout=2)
+        if connection:
+            connection.close()
+
+    def __restart(self, reason: str, generation: Optional[int] = None):
+        """
+        Kills the current worker, spawns a new one and reconnects the previous cameras.
+
+        :param reason: Logged and stored in the flight recorder dump.
+        :param generation: Process generation the caller saw; if it has already been replaced, nothing is done.
+        """
+        with self.__restart_lock:
+            if generation is not None and generation != self.__generation:
+                return
+            self.__logger.warning(f"Restarting camera worker {self.__name}: {reason}")
+            self.__restart_count += 1
+            dump_path = FlightRecorder.get_instance().dump(reason=f"watchdog: {reason}")
+            if dump_path:
+                self.__logger.warning(f"Flight recorder dumped to {dump_path}")
+            self.__kill()
+            self.__connected.clear()
+            if not self.__running or not self.__spawn():
+                return
+
+            timeout = self.__operation_timeouts.get("connect", self.__operation_timeouts["default"])
+            for camera, connect_arguments in list(self.__connect_arguments.items()):
+                with self.__state_lock:
+                    self.__next_request_id += 1
+                    request_id = self.__next_request_id
+                    slot = {"event": threading.Event(), "response": None}
+                    self.__pending[request_id] = slot
+                self.__connection.send(("call", request_id, "camera_manager", "connect", (), connect_arguments, camera))
+                completed = slot["event"].wait(timeout)
+                kind, payload = slot["response"] if completed else ("error", None)
+                if kind != "result" or not payload.get("success"):
+                    self.__logger.error(f"Camera worker restarted but failed to reconnect the camera {camera or ''}")
+                else:
+                    self.__connected[camera] = True
+                with self.__state_lock:
+                    self.__pending.pop(request_id, None)
+
+    def __watchdog_loop(self):
+        """Respawns the worker if it dies outside of a call."""
+        while self.__running:
+            time.sleep(self.__watchdog_interval)
+            if not self.__running:
+                break
+            process, generation = self.__process, self.__generation
+            if process and not process.is_alive():
+                self.__restart(f"worker process exited with code {process.exitcode}", generation)
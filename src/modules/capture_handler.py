@@ -1,12 +1,24 @@
+from __future__ import annotations
+
 import time
 import os
-import gphoto2 as gp
-from typing import Optional
+import sqlite3
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, Callable, List, Tuple
 
 from src.modules.camera_manager import CameraManager
+from src.modules.capture_store import CaptureStore
+from src.modules.storage_writer import StorageWriter
 from src.utils.rcp_logger import Logger
 from src.utils.utils import *
 from src.utils.gphoto_errors import GPhotoErrorInterpreter
+from src.utils.retry_policy import RetryEngine
+from src.utils.frame_stats import FrameAnalyzer
+from src.utils.lazy_import import lazy_import
+from src.utils.flight_recorder import recorded
+
+gp = lazy_import("gphoto2")
 
 class CaptureHandler:
     def __init__(self, camera_manager: CameraManager):
@@ -21,46 +33,259 @@ class CaptureHandler:
         # Retrieve configuration directly from CameraManager
         try:
             self.__config = camera_manager.get_config()
-            
-            # Set capture settings from configuration
-            self.__save_directory = self.__config.get('capture', {}).get('save_directory', './images')
-            self.__preview_directory = self.__config.get('capture', {}).get('preview_directory', './previews')
-            self.__retry_attempts = self.__config.get('capture', {}).get('retry_attempts', 3)
-            self.__retry_delay = self.__config.get('capture', {}).get('retry_delay', 1)
-
-            # Ensure save directories exist
-            try:
-                os.makedirs(self.__save_directory, exist_ok=True)
-                os.makedirs(self.__preview_directory, exist_ok=True)
-            except OSError as e:
-                self.__logger.error(f"Failed to create save directories: {e}")
-                # Fallback to current directory if directory creation fails
-                self.__save_directory = '.'
-                self.__preview_directory = '.'
-
         except Exception as e:
             # Fallback to default settings if configuration retrieval fails
             self.__logger.error(f"Failed to load configuration: {e}")
-            
-            # Default settings
-            self.__save_directory = './images'
-            self.__preview_directory = './previews'
-            self.__retry_attempts = 3
-            self.__retry_delay = 1
-
-            # Try to create directories, but don't fail if it doesn't work
-            try:
-                os.makedirs(self.__save_directory, exist_ok=True)
-                os.makedirs(self.__preview_directory, exist_ok=True)
-            except OSError:
-                self.__save_directory = '.'
-                self.__preview_directory = '.'
+            self.__config = {}
+
+        # Save directories are created together with the stores, on first use or warm_up
+        self.__save_directory = self.__config.get('capture', {}).get('save_directory', './images')
+        self.__preview_directory = self.__config.get('capture', {}).get('preview_directory', './previews')
+
+        # Error-classified retries for capture, preview and download
+        self.__retry_engine = RetryEngine.from_config(self.__config, reconnect=self.__reconnect, logger=self.__logger)
+
+        # Optional NumPy preview analysis, created on first use
+        self.__frame_analyzer: Optional[FrameAnalyzer] = None
+
+        # Callbacks receiving every preview frame (e.g. the shared-memory live-view publisher)
+        self.__preview_listeners: List[Callable[[bytes], None]] = []
+
+        # Live-view session: the viewfinder stays up across previews until it has been idle for a while, and is
+        # lowered before every full capture. Camera calls that change its state hold the live-view lock.
+        liveview_config = self.__config.get('liveview', {}) or {}
+        self.__liveview_lock = threading.RLock()
+        self.__liveview_auto = liveview_config.get('session', False)
+        self.__liveview_idle_timeout = liveview_config.get('idle_timeout', 10.0)
+        self.__viewfinder_widget = liveview_config.get('viewfinder_widget', 'viewfinder')
+        self.__liveview_session = False
+        self.__viewfinder_up = False
+        self.__viewfinder_supported = True
+        self.__liveview_last_used = 0.0
+        self.__liveview_watcher: Optional[threading.Thread] = None
+        self.__liveview_counts = {"entries": 0, "exits": {"idle": 0, "capture": 0, "stopped": 0}}
+        # Preview latencies in milliseconds: with the viewfinder already up, and with a live-view toggle
+        self.__session_latencies: deque = deque(maxlen=256)
+        self.__cold_latencies: deque = deque(maxlen=256)
+        camera_manager.add_event_listener(self.__on_camera_event)
 
-    def capture_image(self, save_path: Optional[str] = None) -> dict:
+        # Indexed, sharded stores for full captures and previews
+        self.__store_lock = threading.Lock()
+        self.__capture_store: Optional[CaptureStore] = None
+        self.__preview_store: Optional[CaptureStore] = None
+
+        # Write-behind file writer with quotas and retention, created together with the stores
+        self.__storage_writer: Optional[StorageWriter] = None
+
+        # Apply edits of config.yaml (retry settings, directories, timeouts) without reconnecting
+        camera_manager.get_config_service().subscribe(self.__on_config_change,
+                                                      sections=["camera", "capture", "retry", "storage", "liveview"])
+
+    def __on_config_change(self, section: str, new_section: Any, config: Dict[str, Any]):
+        self.__config = config
+        if section == "liveview":
+            liveview_config = new_section or {}
+            with self.__liveview_lock:
+                self.__liveview_auto = liveview_config.get('session', False)
+                self.__liveview_idle_timeout = liveview_config.get('idle_timeout', 10.0)
+                self.__viewfinder_widget = liveview_config.get('viewfinder_widget', 'viewfinder')
+            return
+        if section in ("capture", "retry"):
+            self.__retry_engine = RetryEngine.from_config(config, reconnect=self.__reconnect, logger=self.__logger)
+        if section == "storage":
+            # The writer is rebuilt with the new settings; quotas and retention are registered again on reopen
+            with self.__store_lock:
+                stores = [self.__capture_store, self.__preview_store]
+                writer, self.__storage_writer = self.__storage_writer, None
+                self.__capture_store = self.__preview_store = None
+            self.__close_stores(stores, writer, rebuilt=True)
+            return
+        if section != "capture":
+            return
+
+        save_directory = (new_section or {}).get('save_directory', './images')
+        preview_directory = (new_section or {}).get('preview_directory', './previews')
+        with self.__store_lock:
+            if (save_directory, preview_directory) == (self.__save_directory, self.__preview_directory):
+                return
+            # New stores open on next use
+            stores = [self.__capture_store, self.__preview_store]
+            writer = self.__storage_writer
+            old_directories = (self.__save_directory, self.__preview_directory)
+            self.__save_directory, self.__preview_directory = save_directory, preview_directory
+            self.__capture_store = self.__preview_store = None
+            self.__logger.info(f"Save directories changed to {save_directory} and {preview_directory}")
+        if writer is not None:
+            for directory in old_directories:
+                writer.unregister(directory)
+        self.__close_stores(stores, writer, rebuilt=False)
+
+    def __close_stores(self, stores: List[Optional[CaptureStore]], writer: Optional[StorageWriter], rebuilt: bool):
         """
-        Capture an image with configurable save path and retry mechanism.
+        Closes stores that were replaced, once the files queued for them are written.
+
+        :param stores: The replaced capture and preview stores (None if they were never opened).
+        :param writer: The storage writer they were used with.
+        :param rebuilt: True if the writer was replaced as well and must be stopped.
+        """
+        if writer is not None:
+            # Queued files are written first; their callbacks still use the old stores
+            if rebuilt:
+                writer.close()
+            else:
+                writer.flush(timeout=30)
+        for store in stores:
+            if store is not None:
+                store.close()
+
+    def __on_camera_event(self, event_type: str, data: Dict[str, Any]):
+        # A new camera session starts with the viewfinder down
+        if event_type in ("connected", "disconnected"):
+            with self.__liveview_lock:
+                self.__viewfinder_up = False
+                self.__viewfinder_supported = True
+
+    def __reconnect(self) -> bool:
+        """Reconnects the camera after an I/O loss. Used by the retry engine."""
+        return self.__camera_manager.reset_camera()["success"]
+
+    def __camera_metadata(self) -> Dict[str, Optional[str]]:
+        """Returns the name and port of the connected camera for the capture index."""
+        camera_info = self.__camera_manager.get_connected_camera_info() or {}
+        return {"camera": camera_info.get("name"), "port": camera_info.get("port")}
+
+    def __open_stores(self):
+        """Creates the save directories and opens the capture and preview stores. Hold the store lock."""
+        try:
+            os.makedirs(self.__save_directory, exist_ok=True)
+            os.makedirs(self.__preview_directory, exist_ok=True)
+        except OSError as e:
+            self.__logger.error(f"Failed to create save directories: {e}")
+            # Fallback to current directory if directory creation fails
+            self.__save_directory = '.'
+            self.__preview_directory = '.'
+        self.__preview_store = CaptureStore(self.__preview_directory, prefix="preview")
+        self.__capture_store = CaptureStore(self.__save_directory, prefix="capture")
+
+        if self.__storage_writer is None:
+            self.__storage_writer = StorageWriter.from_config(self.__config)
+        storage_config = self.__config.get('storage', {}) or {}
+        self.__storage_writer.register(self.__save_directory, self.__capture_store,
+                                       quota_mb=storage_config.get('capture_quota_mb', 0),
+                                       max_age_hours=storage_config.get('capture_max_age_hours', 0))
+        self.__storage_writer.register(self.__preview_directory, self.__preview_store,
+                                       quota_mb=storage_config.get('preview_quota_mb', 0),
+                                       max_age_hours=storage_config.get('preview_max_age_hours', 0))
+
+    def __stores(self, kind: str) -> Tuple[CaptureStore, StorageWriter]:
+        """Returns the store of a kind and the writer it is registered with, opening both on first use."""
+        with self.__store_lock:
+            if self.__capture_store is None:
+                self.__open_stores()
+            store = self.__preview_store if kind == "preview" else self.__capture_store
+            return store, self.__storage_writer
+
+    def get_store(self, kind: str = "capture") -> CaptureStore:
+        """
+        Provides access to the capture or preview store, opening both on first use.
+
+        :param kind: Either "capture" or "preview".
+        :return: CaptureStore instance
+        """
+        return self.__stores(kind)[0]
+
+    def get_storage_writer(self) -> StorageWriter:
+        """Provides access to the storage writer, opening the stores on first use."""
+        return self.__stores("capture")[1]
+
+    def __save(self, kind: str, data: bytes, extension: str = ".jpg", path: Optional[str] = None,
+               **metadata) -> Dict[str, Any]:
+        """
+        Queue a file for the storage writer and index it.
+
+        The file is queued before it is indexed, so retention never sees an index entry whose file is neither
+        on disk nor pending. With write-behind, the entry is removed again if the file cannot be written;
+        ``wait_for_file`` reports the failure. Without it, the write error is raised and nothing is indexed.
+
+        :raises OSError: If the directory of a custom path cannot be created, or a synchronous write fails.
+        """
+        store, writer = self.__stores(kind)
+        allocation = store.allocate(extension)
+        if path:
+            allocation["path"] = path
+            # A custom path may point into a directory that does not exist yet
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+
+        if not writer.is_write_behind():
+            writer.submit(allocation["path"], data)
+            return store.index(allocation["capture_id"], allocation["path"], data=data,
+                               created_at=allocation["created_at"], **metadata)
+
+        indexed = threading.Event()
+
+        def on_written(written_path: str, error: Optional[Exception]):
+            if error is not None:
+                indexed.wait(5)
+                store.remove(written_path)
+                self.__camera_manager.publish_event("error", {"operation": "write", "message": str(error),
+                                                              "save_path": written_path})
 
-        :param save_path: Optional custom save path. If not provided, uses config or default.
+        writer.submit(allocation["path"], data, callback=on_written)
+        try:
+            return store.index(allocation["capture_id"], allocation["path"], data=data,
+                               created_at=allocation["created_at"], **metadata)
+        finally:
+            indexed.set()
+
+    def wait_for_file(self, path: str, timeout: Optional[float] = 10.0) -> bool:
+        """
+        Wait until a file returned by a capture has been written to disk.
+
+        :param path: ``save_path`` of the capture.
+        :param timeout: Maximum seconds to wait.
+        :return: True if the file is on disk, False if it is still queued or could not be written.
+        """
+        writer = self.__storage_writer
+        if writer is None:
+            return os.path.isfile(path)
+        return writer.wait_for(path, timeout) and os.path.isfile(path)
+
+    def get_storage_stats(self) -> dict:
+        """
+        Returns write, rejection and eviction counters, the usage of each save directory and the free disk space.
+
+        :return: Dictionary with the storage writer statistics
+        """
+        writer = self.get_storage_writer()
+        stats = writer.get_stats()
+        stats["space"] = writer.check_space(self.__save_directory)["data"]
+        return sdict(True, data=stats, message="Storage statistics.")
+
+    def warm_up(self) -> dict:
+        """
+        Create the save directories and open the stores now instead of on the first capture.
+
+        :return: A dictionary with the time spent in milliseconds.
+        """
+        started = time.perf_counter()
+        try:
+            self.get_store()
+        except (OSError, sqlite3.Error) as e:
+            self.__logger.error(f"[warm_up] Failed to open capture stores: {e}")
+            return sdict(False, message=f"Failed to open capture stores: {e}")
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        return sdict(True, data={"elapsed_ms": elapsed_ms}, message="Capture stores ready.")
+
+    @recorded("capture_handler")
+    def capture_image(self, save_path: Optional[str] = None, download: bool = True,
+                      settings: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        Capture an image with configurable save path and error-classified retries.
+
+        :param save_path: Optional custom save path. If not provided, the capture store generates a unique one.
+        :param download: Download the image from the camera into the capture store.
+        :param settings: Optional camera settings to record in the capture index.
         :return: Dictionary with capture result
         """
         method_name = "capture_image"
@@ -72,50 +297,82 @@ class CaptureHandler:
             self.__logger.error(f'[{method_name}] {error_message}')
             return sdict(False, message=error_message)
 
-        # Intelligent save path generation
-        if not save_path:
-            timestamp = time.strftime('%Y%m%d_%H%M%S')
-            filename = f"capture_{timestamp}.jpg"
-            save_path = os.path.join(self.__save_directory, filename)
-            self.__logger.debug(f'[{method_name}] Generated save path: {save_path}')
+        if download:
+            # Refuse before firing the shutter rather than after a transfer that cannot be saved
+            space = self.get_storage_writer().check_space(self.__save_directory)
+            if not space["success"]:
+                self.__logger.error(f'[{method_name}] {space["message"]}')
+                self.__camera_manager.publish_event("error", {"operation": method_name, "message": space["message"]})
+                return sdict(False, data=space["data"], message=space["message"])
 
-        # Retry mechanism with detailed logging
-        for attempt in range(self.__retry_attempts):
-            try:
-                self.__logger.info(f'[{method_name}] Capture attempt {attempt + 1}/{self.__retry_attempts}')
-                
-                file_path = self.__camera_manager.get_camera().capture(gp.GP_CAPTURE_IMAGE)
-                self.__logger.debug(f'[{method_name}] Camera captured image at: {file_path.folder}/{file_path.name}')
+        try:
+            with self.__liveview_lock:
+                # The mirror has to come down for the exposure; the next preview of the session raises it again
+                self.__exit_liveview(method_name, "capture")
+                file_path = self.__retry_engine.run(
+                    method_name, lambda: self.__camera_manager.get_camera().capture(gp.GP_CAPTURE_IMAGE)
+                )
+        except gp.GPhoto2Error as e:
+            error_message = f"Failed to capture image: {GPhotoErrorInterpreter.interpret_error(e)}"
+            self.__logger.error(f'[{method_name}] {error_message}')
+            self.__camera_manager.publish_event("error", {"operation": method_name, "message": error_message})
+            return sdict(False, message=error_message)
 
-                return sdict(True, message="Success")
+        camera_path = f"{file_path.folder}/{file_path.name}"
+        self.__logger.debug(f'[{method_name}] Camera captured image at: {camera_path}')
+        self.__camera_manager.publish_event("file_added", {"folder": file_path.folder, "name": file_path.name})
 
-                """
-                download_result = self._download_image(file_path, save_path)
-                
-                if download_result["success"]:
-                    self.__logger.info(f'[{method_name}] Image capture successful: {save_path}')
-                    return download_result
-                """
+        if not download:
+            return sdict(True, data={"camera_path": camera_path}, message="Success")
 
-                self.__logger.warning(f'[{method_name}] Download failed, retrying in {self.__retry_delay} seconds')
-                time.sleep(self.__retry_delay)
+        download_result = self._download_image(file_path, save_path, settings=settings)
+        if download_result["success"]:
+            self.__logger.info(f'[{method_name}] Image capture successful: {download_result["data"]["save_path"]}')
+        return download_result
 
-            except gp.GPhoto2Error as e:
-                error_message = GPhotoErrorInterpreter.interpret_error(e)
-                self.__logger.warning(f'[{method_name}] {error_message}')
-                time.sleep(self.__retry_delay)
+    def add_preview_listener(self, listener: Callable[[bytes], None]):
+        """
+        Register a callback that receives the JPEG bytes of every preview frame captured.
+
+        :param listener: Callable receiving the frame data.
+        """
+        if listener not in self.__preview_listeners:
+            self.__preview_listeners.append(listener)
 
-        # Final failure logging
-        error_message = f"Failed to capture image after {self.__retry_attempts} attempts"
-        self.__logger.error(f'[{method_name}] {error_message}')
-        return sdict(False, message=error_message)
+    def remove_preview_listener(self, listener: Callable[[bytes], None]):
+        """Unregister a callback added with add_preview_listener."""
+        if listener in self.__preview_listeners:
+            self.__preview_listeners.remove(listener)
 
-    def capture_preview(self, save_path: Optional[str] = None) -> dict:
+    def analyze_frames(self, frames: List[bytes]) -> dict:
+        """
+        Compute luminance histogram, clipping and sharpness statistics for preview frames (requires NumPy and Pillow).
+
+        :param frames: JPEG bytes of each frame.
+        :return: Dictionary with one statistics entry per frame
+        """
+        method_name = "analyze_frames"
+        try:
+            if self.__frame_analyzer is None:
+                analysis_config = self.__config.get('preview_analysis', {})
+                self.__frame_analyzer = FrameAnalyzer(batch_size=analysis_config.get('batch_size', 8),
+                                                      max_width=analysis_config.get('max_width', 640))
+            stats = self.__frame_analyzer.analyze_batch(frames)
+            return sdict(True, data={"stats": stats}, message=f"{len(stats)} frame(s) analyzed.")
+        except (ImportError, ValueError, OSError) as e:
+            error_message = f"Preview analysis failed: {e}"
+            self.__logger.error(f'[{method_name}] {error_message}')
+            return sdict(False, message=error_message)
+
+    @recorded("capture_handler")
+    def capture_preview(self, save_path: Optional[str] = None, save: bool = True, analyze: bool = False) -> dict:
         """
         Capture a preview image with configurable save path.
 
-        :param save_path: Optional custom save path. If not provided, uses config or default.
-        :return: Dictionary with preview capture result
+        :param save_path: Optional custom save path. If not provided, the preview store generates a unique one.
+        :param save: Save the preview to the preview store. If False, the JPEG bytes are returned as ``data["frame"]``.
+        :param analyze: Return image statistics (histogram, clipping, sharpness) as ``data["stats"]``.
+        :return: Dictionary with preview capture result, including the camera latency as ``data["latency_ms"]``
         """
         method_name = "capture_preview"
         self.__logger.debug(f'[{method_name}] Starting preview capture')
@@ -125,21 +382,44 @@ class CaptureHandler:
             self.__logger.error(f'[{method_name}] {error_message}')
             return sdict(False, message=error_message)
 
-        # Use provided save_path or generate one based on configuration
-        if not save_path:
-            filename = f"preview_{time.strftime('%Y%m%d_%H%M%S')}.jpg"
-            save_path = os.path.join(self.__preview_directory, filename)
-            self.__logger.debug(f'[{method_name}] Generated preview save path: {save_path}')
-
         try:
             # Capture the preview and store it in a CameraFile object
             camera_file = gp.CameraFile()
-            self.__camera_manager.get_camera().capture_preview(camera_file)
-            self.__logger.info(f'[{method_name}] Preview image captured')
+            started = time.perf_counter()
+            with self.__liveview_lock:
+                in_session = self.__liveview_wanted()
+                toggled = not (in_session and self.__viewfinder_up)
+                if in_session:
+                    self.__enter_liveview(method_name)
+                    in_session = self.__viewfinder_up
+                self.__retry_engine.run(method_name,
+                                        lambda: self.__camera_manager.get_camera().capture_preview(camera_file))
+                if in_session:
+                    self.__liveview_last_used = time.monotonic()
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            (self.__cold_latencies if toggled else self.__session_latencies).append(latency_ms)
+            self.__logger.info(f'[{method_name}] Preview image captured in {latency_ms} ms')
+
+            data = memoryview(camera_file.get_data_and_size()).tobytes()
+            for listener in list(self.__preview_listeners):
+                try:
+                    listener(data)
+                except Exception as e:
+                    self.__logger.error(f'[{method_name}] Preview listener failed: {e}')
 
-            camera_file.save(save_path)
-            self.__logger.info(f'[{method_name}] Preview image saved locally at: {save_path}')
-            return sdict(True, data={"save_path": save_path}, message="Preview captured and saved successfully.")
+            result_data = {"latency_ms": latency_ms, "liveview_session": in_session}
+            if analyze:
+                analysis = self.analyze_frames([data])
+                result_data["stats"] = analysis["data"]["stats"][0] if analysis["success"] else None
+
+            if not save:
+                result_data["frame"] = data
+                return sdict(True, data=result_data, message="Preview captured.")
+
+            record = self.__save("preview", data, extension=".jpg", path=save_path, **self.__camera_metadata())
+            self.__logger.info(f'[{method_name}] Preview image saved locally at: {record["path"]}')
+            result_data.update(save_path=record["path"], capture_id=record["capture_id"])
+            return sdict(True, data=result_data, message="Preview captured and saved successfully.")
 
         except gp.GPhoto2Error as e:
             error_message = GPhotoErrorInterpreter.interpret_error(e)
@@ -150,6 +430,206 @@ class CaptureHandler:
             self.__logger.error(f'[{method_name}] {error_message}')
             return sdict(False, message=error_message)
 
+    def __liveview_wanted(self) -> bool:
+        return (self.__liveview_session or self.__liveview_auto) and self.__viewfinder_supported
+
+    def __set_viewfinder(self, method_name: str, value: int):
+        """Raise (1) or lower (0) the viewfinder, with a single-widget write where the camera supports it."""
+        name = self.__viewfinder_widget
+        camera = self.__camera_manager.get_camera()
+
+        def write():
+            try:
+                widget = camera.get_single_config(name)
+                widget.set_value(value)
+                camera.set_single_config(name, widget)
+            except (AttributeError, gp.GPhoto2Error) as e:
+                if isinstance(e, gp.GPhoto2Error) and e.code != gp.GP_ERROR_NOT_SUPPORTED:
+                    raise
+                tree = camera.get_config()
+                tree.get_child_by_name(name).set_value(value)
+                camera.set_config(tree)
+
+        self.__retry_engine.run(method_name, write)
+
+    def __enter_liveview(self, method_name: str):
+        """Raise the viewfinder if it is not up yet. Hold the live-view lock."""
+        if self.__viewfinder_up:
+            return
+        try:
+            self.__set_viewfinder(method_name, 1)
+        except gp.GPhoto2Error as e:
+            if e.code != gp.GP_ERROR_BAD_PARAMETERS:
+                raise
+            # No such widget on this body: previews keep toggling live view themselves
+            self.__viewfinder_supported = False
+            self.__logger.warning(f"[{method_name}] Camera has no '{self.__viewfinder_widget}' widget; "
+                                  f"live-view sessions are not available")
+            return
+        self.__viewfinder_up = True
+        self.__liveview_last_used = time.monotonic()
+        self.__liveview_counts["entries"] += 1
+        self.__camera_manager.publish_event("liveview", {"state": "entered"})
+        if self.__liveview_watcher is None or not self.__liveview_watcher.is_alive():
+            self.__liveview_watcher = threading.Thread(target=self.__watch_liveview, name="liveview-idle",
+                                                       daemon=True)
+            self.__liveview_watcher.start()
+
+    def __exit_liveview(self, method_name: str, reason: str):
+        """Lower the viewfinder if it is up. Hold the live-view lock."""
+        if not self.__viewfinder_up:
+            return
+        self.__viewfinder_up = False
+        try:
+            self.__set_viewfinder(method_name, 0)
+        except gp.GPhoto2Error as e:
+            # A capture lowers the mirror on its own; the state is only lost for statistics
+            self.__logger.warning(f"[{method_name}] Failed to leave live view: "
+                                  f"{GPhotoErrorInterpreter.interpret_error(e)}")
+        self.__liveview_counts["exits"][reason] += 1
+        self.__camera_manager.publish_event("liveview", {"state": "exited", "reason": reason})
+
+    def __watch_liveview(self):
+        """
+        Lowers the viewfinder once no preview has used it for the idle timeout.
+
+        The camera is only written under the session's operation lock, so the exit never runs concurrently with
+        an operation of another handler; while one is running, the exit waits for the next check.
+        """
+        operation_lock = self.__camera_manager.get_operation_lock()
+        while True:
+            time.sleep(min(1.0, max(0.05, (self.__liveview_idle_timeout or 4) / 4)))
+            if not operation_lock.acquire(blocking=False):
+                continue
+            try:
+                with self.__liveview_lock:
+                    if not self.__viewfinder_up:
+                        return
+                    idle = time.monotonic() - self.__liveview_last_used
+                    if self.__liveview_idle_timeout and idle >= self.__liveview_idle_timeout:
+                        if self.__camera_manager.get_camera():
+                            self.__exit_liveview("liveview_idle", "idle")
+                        else:
+                            self.__viewfinder_up = False
+                        return
+            finally:
+                operation_lock.release()
+
+    @recorded("capture_handler")
+    def start_liveview_session(self, idle_timeout: Optional[float] = None) -> dict:
+        """
+        Raise the viewfinder and keep it up across previews until the session is stopped or idle.
+
+        Previews of a session skip the live-view toggle of each capture_preview call. Full captures lower the
+        viewfinder first; the next preview raises it again.
+
+        :param idle_timeout: Seconds without previews after which the viewfinder is lowered. 0 never times out.
+        :return: Dictionary with the live-view statistics
+        """
+        method_name = "start_liveview_session"
+        if not self.__camera_manager.get_camera():
+            return sdict(False, message="No camera connected.")
+        try:
+            with self.__liveview_lock:
+                if idle_timeout is not None:
+                    self.__liveview_idle_timeout = idle_timeout
+                self.__viewfinder_supported = True
+                self.__enter_liveview(method_name)
+                if not self.__viewfinder_supported:
+                    return sdict(False, message=f"Camera has no '{self.__viewfinder_widget}' widget.")
+                self.__liveview_session = True
+        except gp.GPhoto2Error as e:
+            error_message = f"Failed to enter live view: {GPhotoErrorInterpreter.interpret_error(e)}"
+            self.__logger.error(f'[{method_name}] {error_message}')
+            return sdict(False, message=error_message)
+        return sdict(True, data=self.get_liveview_stats(), message="Live-view session started.")
+
+    @recorded("capture_handler")
+    def stop_liveview_session(self) -> dict:
+        """
+        End the live-view session and lower the viewfinder.
+
+        :return: Dictionary with the live-view statistics
+        """
+        with self.__liveview_lock:
+            self.__liveview_session = False
+            if self.__camera_manager.get_camera():
+                self.__exit_liveview("stop_liveview_session", "stopped")
+            else:
+                self.__viewfinder_up = False
+        return sdict(True, data=self.get_liveview_stats(), message="Live-view session stopped.")
+
+    @staticmethod
+    def __latency_summary(samples: deque) -> Dict[str, Any]:
+        if not samples:
+            return {"count": 0}
+        ordered = sorted(samples)
+        return {"count": len(ordered), "last": samples[-1], "avg": round(sum(ordered) / len(ordered), 2),
+                "p50": ordered[len(ordered) // 2], "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]}
+
+    def get_liveview_stats(self) -> Dict[str, Any]:
+        """Returns the live-view session state and the preview latencies with and without the viewfinder up."""
+        with self.__liveview_lock:
+            idle = round(time.monotonic() - self.__liveview_last_used, 1) if self.__viewfinder_up else None
+            return {"session": self.__liveview_session, "auto": self.__liveview_auto,
+                    "viewfinder_up": self.__viewfinder_up, "supported": self.__viewfinder_supported,
+                    "idle_timeout": self.__liveview_idle_timeout, "idle_seconds": idle,
+                    "entries": self.__liveview_counts["entries"], "exits": dict(self.__liveview_counts["exits"]),
+                    "latency_ms": {"session": self.__latency_summary(self.__session_latencies),
+                                   "toggled": self.__latency_summary(self.__cold_latencies)}}
+
+    def list_captures(self, kind: str = "capture", start: Optional[float] = None, end: Optional[float] = None,
+                      camera: Optional[str] = None, limit: int = 100, after_id: Optional[int] = None,
+                      newest_first: bool = False) -> dict:
+        """
+        List indexed captures or previews by time range and/or camera.
+
+        :param kind: Either "capture" or "preview".
+        :param start: Inclusive lower bound as a UNIX timestamp.
+        :param end: Exclusive upper bound as a UNIX timestamp.
+        :param camera: Only return captures from this camera.
+        :param limit: Maximum number of records to return.
+        :param after_id: Continue after this capture ID (keyset pagination).
+        :param newest_first: Order by descending capture time.
+        :return: Dictionary with the matching index records
+        """
+        method_name = "list_captures"
+        try:
+            captures = self.get_store(kind).query(start=start, end=end, camera=camera, limit=limit,
+                                                  after_id=after_id, newest_first=newest_first)
+            next_after_id = captures[-1]["capture_id"] if len(captures) == limit else None
+            return sdict(True, data={"captures": captures, "next_after_id": next_after_id},
+                         message=f"{len(captures)} capture(s) found.")
+        except sqlite3.Error as e:
+            error_message = f"Capture index error: {e}"
+            self.__logger.error(f'[{method_name}] {error_message}')
+            return sdict(False, message=error_message)
+
+    def get_capture(self, capture_id: int, kind: str = "capture") -> dict:
+        """
+        Look up a single indexed capture or preview.
+
+        :param capture_id: Capture ID returned by capture_image or capture_preview.
+        :param kind: Either "capture" or "preview".
+        :return: Dictionary with the index record
+        """
+        method_name = "get_capture"
+        try:
+            store = self.get_store(kind)
+            record = store.get(capture_id)
+            if record:
+                # Reads keep a capture at the back of the LRU eviction order
+                store.touch(capture_id)
+        except sqlite3.Error as e:
+            error_message = f"Capture index error: {e}"
+            self.__logger.error(f'[{method_name}] {error_message}')
+            return sdict(False, message=error_message)
+
+        if not record:
+            return sdict(False, message=f"Capture {capture_id} not found.")
+        return sdict(True, data=record, message="Capture found.")
+
+    @recorded("capture_handler")
     def wait_until_ready(self, timeout: Optional[int] = None) -> bool:
         """
         Wait until the camera is ready, with a configurable timeout.
@@ -165,33 +645,100 @@ class CaptureHandler:
         while time.time() - start_time < timeout:
             try:
                 self.__camera_manager.get_camera().get_config()  # Test connection
+                self.__camera_manager.publish_event("ready")
                 return True
             except gp.GPhoto2Error as e:
                 error_message = GPhotoErrorInterpreter.interpret_error(e)
                 self.__logger.warning(f"Camera not ready, retrying... {error_message}")
                 time.sleep(0.5)
         self.__logger.error("Camera not ready after waiting.")
+        self.__camera_manager.publish_event("error", {"operation": "wait_until_ready",
+                                                      "message": "Camera not ready after waiting."})
         return False
 
-    def _download_image(self, file_path: gp.CameraFilePath, save_path: str) -> dict:
+    @recorded("capture_handler")
+    def fetch_file(self, folder: str, name: str) -> dict:
         """
-        Download an image from the camera to a local path.
+        Transfer a file from the camera into memory without storing it.
 
-        :param file_path: Camera file path
-        :param save_path: Local save path
-        :return: Dictionary with download result
+        :param folder: Folder of the file on the camera.
+        :param name: Name of the file on the camera.
+        :return: Dictionary with the file contents as ``data["file"]``
         """
-        self.__logger.debug(f"Downloading image from {file_path.folder}/{file_path.name} to {save_path}")
-
+        method_name = "fetch_file"
         try:
             camera_file = gp.CameraFile()
-            self.__camera_manager.get_camera().file_get(
-                file_path.folder, file_path.name, gp.GP_FILE_TYPE_NORMAL, camera_file
-            )
-            camera_file.save(save_path)
-            self.__logger.info(f"Image downloaded successfully to: {save_path}")
-            return sdict(True, data={"save_path": save_path}, message=f"Image downloaded successfully to {save_path}.")
+            self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().file_get(
+                folder, name, gp.GP_FILE_TYPE_NORMAL, camera_file
+            ))
+            return sdict(True, data={"file": memoryview(camera_file.get_data_and_size()).tobytes()},
+                         message="File transferred.")
         except gp.GPhoto2Error as e:
             error_message = GPhotoErrorInterpreter.interpret_error(e)
-            self.__logger.error(error_message)
-            return sdict(False, message=error_message)
\ No newline at end of file
+            self.__logger.error(f'[{method_name}] {error_message}')
+            self.__camera_manager.publish_event("error", {"operation": method_name, "message": error_message,
+                                                          "camera_path": f"{folder.rstrip('/')}/{name}"})
+            return sdict(False, message=error_message)
+
+    @recorded("capture_handler")
+    def store_file(self, data: bytes, folder: str, name: str, save_path: Optional[str] = None,
+                   settings: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        Store a file fetched from the camera in the capture store. Safe to call from a background thread.
+
+        :param data: File contents.
+        :param folder: Folder of the file on the camera.
+        :param name: Name of the file on the camera.
+        :param save_path: Optional local save path. If not provided, the capture store generates a unique one.
+        :param settings: Optional camera settings to record in the capture index.
+        :return: Dictionary with the stored file's path and capture ID
+        """
+        method_name = "store_file"
+        camera_path = f"{folder.rstrip('/')}/{name}"
+        try:
+            extension = os.path.splitext(name)[1].lower() or ".jpg"
+            record = self.__save("capture", data, extension=extension, path=save_path, camera_path=camera_path,
+                                 settings=settings, **self.__camera_metadata())
+            self.__logger.info(f"Image downloaded successfully to: {record['path']}")
+            self.__camera_manager.publish_event("download_complete", {"capture_id": record["capture_id"],
+                                                                      "save_path": record["path"],
+                                                                      "camera_path": camera_path})
+            return sdict(True, data={"save_path": record["path"], "capture_id": record["capture_id"],
+                                     "camera_path": camera_path},
+                         message=f"Image downloaded successfully to {record['path']}.")
+        except (OSError, sqlite3.Error) as e:
+            error_message = f"Failed to store downloaded image: {e}"
+            self.__logger.error(f'[{method_name}] {error_message}')
+            self.__camera_manager.publish_event("error", {"operation": method_name, "message": error_message,
+                                                          "camera_path": camera_path})
+            return sdict(False, message=error_message)
+
+    @recorded("capture_handler")
+    def download_file(self, folder: str, name: str, save_path: Optional[str] = None,
+                      settings: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        Download a file from the camera into the capture store.
+
+        :param folder: Folder of the file on the camera.
+        :param name: Name of the file on the camera.
+        :param save_path: Optional local save path. If not provided, the capture store generates a unique one.
+        :param settings: Optional camera settings to record in the capture index.
+        :return: Dictionary with download result
+        """
+        self.__logger.debug(f"Downloading image from {folder}/{name} to {save_path or self.__save_directory}")
+        fetched = self.fetch_file(folder, name)
+        if not fetched["success"]:
+            return fetched
+        return self.store_file(fetched["data"]["file"], folder, name, save_path=save_path, settings=settings)
+
+    def _download_image(self, file_path: gp.CameraFilePath, save_path: Optional[str] = None,
+                        settings: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        Download an image from the camera into the capture store.
+
+        :param file_path: Camera file path
+        :param save_path: Optional local save path. If not provided, the capture store generates a unique one.
+        :param settings: Optional camera settings to record in the capture index.
+        :return: Dictionary with download result
+        """
+        return self.download_file(file_path.folder, file_path.name, save_path=save_path, settings=settings)
@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Dict, List, Any
+
+from src.utils.rcp_logger import Logger
+
+
+class CaptureStore:
+    """
+    Stores captured files in an hour-sharded directory tree and indexes their metadata in SQLite.
+
+    Files are laid out as ``<root>/<YYYY>/<MM>/<DD>/<HH>/<prefix>_<YYYYmmdd_HHMMSS>_<id><ext>`` so that
+    no single directory grows beyond one hour of captures. Capture IDs are monotonic integers derived
+    from the microsecond clock and seeded from the index, so they stay unique across restarts.
+    """
+
+    INDEX_FILE_NAME = "index.sqlite3"
+
+    def __init__(self, root_directory: str, prefix: str = "capture"):
+        """
+        Open (or create) a capture store.
+
+        :param root_directory: Directory under which the shards and the index are kept.
+        :param prefix: File name prefix for captures stored here.
+        """
+        self.__logger = Logger.get_logger("Capture Store")
+        self.__root_directory = root_directory
+        self.__prefix = prefix
+        self.__lock = threading.Lock()
+
+        os.makedirs(self.__root_directory, exist_ok=True)
+        index_path = os.path.join(self.__root_directory, self.INDEX_FILE_NAME)
+
+        # The connection is shared between threads and guarded by self.__lock
+        self.__connection = sqlite3.connect(index_path, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.executescript("""
+            CREATE TABLE IF NOT EXISTS captures (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                camera TEXT,
+                port TEXT,
+                camera_path TEXT,
+                created_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                settings TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_captures_created ON captures (created_at);
+            CREATE INDEX IF NOT EXISTS idx_captures_camera_created ON captures (camera, created_at);
+            CREATE INDEX IF NOT EXISTS idx_captures_path ON captures (path);
+        """)
+        columns = {row[1] for row in self.__connection.execute("PRAGMA table_info(captures)")}
+        if "accessed_at" not in columns:
+            # Added for LRU retention; NULL means never read since it was stored
+            self.__connection.execute("ALTER TABLE captures ADD COLUMN accessed_at REAL")
+        self.__connection.commit()
+
+        row = self.__connection.execute("SELECT MAX(id) FROM captures").fetchone()
+        self.__last_id = row[0] or 0
+        self.__logger.debug(f"Capture store opened at {self.__root_directory} (last id: {self.__last_id})")
+
+    def get_root_directory(self) -> str:
+        """Returns the root directory of the store."""
+        return self.__root_directory
+
+    def __next_id(self) -> int:
+        """Returns a new monotonic capture ID. Must be called with self.__lock held."""
+        self.__last_id = max(time.time_ns() // 1000, self.__last_id + 1)
+        return self.__last_id
+
+    def allocate(self, extension: str = ".jpg") -> Dict[str, Any]:
+        """
+        Reserve a unique capture ID and a collision-free path in the current shard.
+
+        :param extension: File extension including the leading dot.
+        :return: Dictionary with ``capture_id``, ``path`` and ``created_at``.
+        """
+        with self.__lock:
+            capture_id = self.__next_id()
+
+        created_at = capture_id / 1_000_000
+        local_time = time.localtime(created_at)
+        shard_directory = os.path.join(self.__root_directory, time.strftime('%Y/%m/%d/%H', local_time))
+        os.makedirs(shard_directory, exist_ok=True)
+
+        filename = f"{self.__prefix}_{time.strftime('%Y%m%d_%H%M%S', local_time)}_{capture_id}{extension}"
+        return {"capture_id": capture_id, "path": os.path.join(shard_directory, filename), "created_at": created_at}
+
+    def save(self, data: bytes, extension: str = ".jpg", path: Optional[str] = None,
+             camera: Optional[str] = None, port: Optional[str] = None, camera_path: Optional[str] = None,
+             settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Write a capture to disk and add it to the index.
+
+        :param data: File contents.
+        :param extension: File extension used when the path is generated by the store.
+        :param path: Optional explicit destination. The file is still indexed under a new capture ID.
+        :param camera: Name of the camera that produced the file.
+        :param port: Port of the camera that produced the file.
+        :param camera_path: Folder and name of the file on the camera, if any.
+        :param settings: Camera settings in effect for the capture.
+        :return: The index record of the stored capture.
+        """
+        allocation = self.allocate(extension)
+        if path:
+            allocation["path"] = path
+
+        with open(allocation["path"], 'wb') as file:
+            file.write(data)
+
+        return self.index(allocation["capture_id"], allocation["path"], data=data, camera=camera, port=port,
+                          camera_path=camera_path, settings=settings, created_at=allocation["created_at"])
+
+    def index(self, capture_id: int, path: str, data: Optional[bytes] = None, camera: Optional[str] = None,
+              port: Optional[str] = None, camera_path: Optional[str] = None,
+              settings: Optional[Dict[str, Any]] = None, created_at: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Add an already allocated capture to the index.
+
+        :param capture_id: ID returned by ``allocate``.
+        :param path: Local path of the capture.
+        :param data: File contents. If omitted the file is read back from ``path`` for hashing.
+        :param camera: Name of the camera that produced the file.
+        :param port: Port of the camera that produced the file.
+        :param camera_path: Folder and name of the file on the camera, if any.
+        :param settings: Camera settings in effect for the capture.
+        :param created_at: Capture time as a UNIX timestamp. Defaults to the time encoded in the ID.
+        :return: The index record of the capture.
+        """
+        if data is None:
+            with open(path, 'rb') as file:
+                data = file.read()
+
+        record = {
+            "capture_id": capture_id,
+            "path": path,
+            "camera": camera,
+            "port": port,
+            "camera_path": camera_path,
+            "created_at": created_at if created_at is not None else capture_id / 1_000_000,
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "settings": settings or {},
+        }
+
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT INTO captures (id, path, camera, port, camera_path, created_at, size, sha256, settings) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (capture_id, path, camera, port, camera_path, record["created_at"], record["size"],
+                 record["sha256"], json.dumps(record["settings"]))
+            )
+            self.__connection.commit()
+
+        self.__logger.debug(f"Indexed capture {capture_id} at {path}")
+        return record
+
+    def get(self, capture_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Look up a single capture by ID.
+
+        :param capture_id: Capture ID.
+        :return: The index record or None if it does not exist.
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT id, path, camera, port, camera_path, created_at, size, sha256, settings "
+                "FROM captures WHERE id = ?", (capture_id,)
+            ).fetchone()
+        return self.__row_to_record(row) if row else None
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None, camera: Optional[str] = None,
+              limit: int = 100, after_id: Optional[int] = None, newest_first: bool = False) -> List[Dict[str, Any]]:
+        """
+        List captures by time range and/or camera.
+
+        Pagination is keyset based: pass the last ``capture_id`` of a page as ``after_id`` to get the next one.
+
+        :param start: Inclusive lower bound as a UNIX timestamp.
+        :param end: Exclusive upper bound as a UNIX timestamp.
+        :param camera: Only return captures from this camera.
+        :param limit: Maximum number of records to return.
+        :param after_id: Continue after this capture ID (in the requested order).
+        :param newest_first: Order by descending capture time.
+        :return: List of index records.
+        """
+        clauses, parameters = [], []
+        if start is not None:
+            clauses.append("created_at >= ?")
+            parameters.append(start)
+        if end is not None:
+            clauses.append("created_at < ?")
+            parameters.append(end)
+        if camera is not None:
+            clauses.append("camera = ?")
+            parameters.append(camera)
+        if after_id is not None:
+            clauses.append("id < ?" if newest_first else "id > ?")
+            parameters.append(after_id)
+
+        sql = "SELECT id, path, camera, port, camera_path, created_at, size, sha256, settings FROM captures"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY id {'DESC' if newest_first else 'ASC'} LIMIT ?"
+        parameters.append(limit)
+
+        with self.__lock:
+            rows = self.__connection.execute(sql, parameters).fetchall()
+        return [self.__row_to_record(row) for row in rows]
+
+    def count(self, start: Optional[float] = None, end: Optional[float] = None, camera: Optional[str] = None) -> int:
+        """
+        Count captures by time range and/or camera.
+
+        :param start: Inclusive lower bound as a UNIX timestamp.
+        :param end: Exclusive upper bound as a UNIX timestamp.
+        :param camera: Only count captures from this camera.
+        :return: Number of matching captures.
+        """
+        clauses, parameters = [], []
+        if start is not None:
+            clauses.append("created_at >= ?")
+            parameters.append(start)
+        if end is not None:
+            clauses.append("created_at < ?")
+            parameters.append(end)
+        if camera is not None:
+            clauses.append("camera = ?")
+            parameters.append(camera)
+
+        sql = "SELECT COUNT(*) FROM captures"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+
+        with self.__lock:
+            return self.__connection.execute(sql, parameters).fetchone()[0]
+
+    def touch(self, capture_id: int):
+        """
+        Mark a capture as recently used, so LRU retention evicts it later.
+
+        :param capture_id: Capture ID.
+        """
+        with self.__lock:
+            self.__connection.execute("UPDATE captures SET accessed_at = ? WHERE id = ?", (time.time(), capture_id))
+            self.__connection.commit()
+
+    def total_size(self, under: Optional[str] = None) -> int:
+        """
+        Returns the number of bytes of the indexed captures.
+
+        :param under: Only count files inside this directory (captures can be saved to any path).
+        """
+        with self.__lock:
+            if under is None:
+                return self.__connection.execute("SELECT COALESCE(SUM(size), 0) FROM captures").fetchone()[0]
+            rows = self.__connection.execute("SELECT path, size FROM captures").fetchall()
+        under = os.path.abspath(under) + os.sep
+        return sum(size for path, size in rows if os.path.abspath(path).startswith(under))
+
+    def least_recently_used(self, limit: int = 100, before: Optional[float] = None,
+                            offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        List captures in eviction order: least recently read (or stored, if never read) first.
+
+        :param limit: Maximum number of records to return.
+        :param before: Only return captures stored before this UNIX timestamp.
+        :param offset: Number of records to skip, e.g. the ones a caller decided to keep.
+        :return: List of index records.
+        """
+        sql = "SELECT id, path, camera, port, camera_path, created_at, size, sha256, settings FROM captures"
+        parameters: List[Any] = []
+        if before is not None:
+            sql += " WHERE created_at < ?"
+            parameters.append(before)
+        sql += " ORDER BY COALESCE(accessed_at, created_at) ASC LIMIT ? OFFSET ?"
+        parameters.extend([limit, offset])
+
+        with self.__lock:
+            rows = self.__connection.execute(sql, parameters).fetchall()
+        return [self.__row_to_record(row) for row in rows]
+
+    def remove(self, path: str) -> bool:
+        """
+        Drop the index entry of a file that no longer exists on disk.
+
+        :param path: Local path of the capture.
+        :return: True if an entry was removed.
+        """
+        with self.__lock:
+            cursor = self.__connection.execute("DELETE FROM captures WHERE path = ?", (path,))
+            self.__connection.commit()
+        return cursor.rowcount > 0
+
+    def close(self):
+        """Closes the index connection."""
+        with self.__lock:
+            self.__connection.close()
+
+    @staticmethod
+    def __row_to_record(row) -> Dict[str, Any]:
+        return {
+            "capture_id": row[0],
+            "path": row[1],
+            "camera": row[2],
+            "port": row[3],
+            "camera_path": row[4],
+            "created_at": row[5],
+            "size": row[6],
+            "sha256": row[7],
+            "settings": json.loads(row[8]) if row[8] else {},
+        }
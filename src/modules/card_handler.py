@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Optional, Dict, List, Any
+
+from src.modules.camera_manager import CameraManager
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+from src.utils.gphoto_errors import GPhotoErrorInterpreter
+from src.utils.lazy_import import lazy_import
+from src.utils.single_flight import SingleFlight
+
+gp = lazy_import("gphoto2")
+
+
+class CardHandler:
+    def __init__(self, camera_manager: CameraManager):
+        """
+        Initialize CardHandler, which keeps a cached index of the files on the camera's storage.
+
+        The index is built by a single recursive walk on first use and is then kept up to date from
+        "file_added" events, so listings do not rescan the card. While a camera is connected, a background
+        thread drains the camera's events every ``capture.card_poll_interval`` seconds; it is their only reader,
+        and it polls only between camera operations (under the session's operation lock).
+
+        :param camera_manager: CameraManager instance
+        """
+        self.__camera_manager = camera_manager
+        self.__logger = Logger.get_logger("Card Handler")
+
+        self.__lock = threading.RLock()
+        self.__paths: List[str] = []                      # Sorted "folder/name" paths of all indexed files
+        self.__file_info: Dict[str, Dict[str, Any]] = {}  # Cached size/mtime per path
+        self.__indexed = False
+
+        # Concurrent storage queries share one camera round trip
+        self.__reads = SingleFlight("card_handler")
+
+        capture_config = camera_manager.get_config().get('capture', {}) or {}
+        self.__poll_interval = float(capture_config.get('card_poll_interval', 2.0) or 0)
+        self.__poller: Optional[threading.Thread] = None
+        self.__poller_stop = threading.Event()
+
+        self.__camera_manager.add_event_listener(self.__on_camera_event)
+        if self.__camera_manager.get_camera():
+            self.__start_polling()
+
+    @staticmethod
+    def __join(folder: str, name: str) -> str:
+        return f"{folder.rstrip('/')}/{name}"
+
+    @staticmethod
+    def __split(path: str) -> Dict[str, str]:
+        folder, _, name = path.rpartition('/')
+        return {"folder": folder or '/', "name": name}
+
+    def __on_camera_event(self, event_type: str, data: Dict[str, Any]):
+        """Keeps the index in sync with connection changes and new files."""
+        if event_type in ("connected", "disconnected"):
+            self.invalidate()
+            if event_type == "connected":
+                self.__start_polling()
+            else:
+                self.__poller_stop.set()
+        elif event_type == "file_added":
+            self.__add_file(data["folder"], data["name"])
+        elif event_type == "folder_added":
+            # A new folder may already hold files; rescan on the next listing
+            self.invalidate()
+
+    def __add_file(self, folder: str, name: str):
+        with self.__lock:
+            if not self.__indexed:
+                return
+            path = self.__join(folder, name)
+            position = bisect.bisect_left(self.__paths, path)
+            if position == len(self.__paths) or self.__paths[position] != path:
+                self.__paths.insert(position, path)
+                self.__logger.debug(f"Indexed new card file: {path}")
+
+    def __scan(self, camera: gp.Camera, folder: str, paths: List[str]):
+        """Recursively collects all file paths below a folder."""
+        for name, _ in camera.folder_list_files(folder):
+            paths.append(self.__join(folder, name))
+        for name, _ in camera.folder_list_folders(folder):
+            self.__scan(camera, self.__join(folder, name), paths)
+
+    def __ensure_index(self, camera: gp.Camera):
+        with self.__lock:
+            if self.__indexed:
+                return
+            paths: List[str] = []
+            self.__scan(camera, '/', paths)
+            paths.sort()
+            self.__paths = paths
+            self.__indexed = True
+            self.__logger.info(f"Card index built with {len(paths)} file(s)")
+
+    def __start_polling(self):
+        if self.__poll_interval <= 0:
+            return
+        with self.__lock:
+            if self.__poller and self.__poller.is_alive():
+                return
+            self.__poller_stop.clear()
+            self.__poller = threading.Thread(target=self.__poll_loop, name="card-event-poller", daemon=True)
+            self.__poller.start()
+
+    def __poll_loop(self):
+        """Drains the camera's events between operations until the camera is disconnected."""
+        operation_lock = self.__camera_manager.get_operation_lock()
+        while not self.__poller_stop.wait(self.__poll_interval):
+            if not self.__camera_manager.get_camera():
+                return
+            # A running operation owns the camera; poll at the next interval instead of waiting behind it
+            if not operation_lock.acquire(blocking=False):
+                continue
+            try:
+                self.poll_events()
+            finally:
+                operation_lock.release()
+
+    def invalidate(self):
+        """Drops the cached index so that the next listing rescans the card."""
+        with self.__lock:
+            self.__paths = []
+            self.__file_info = {}
+            self.__indexed = False
+
+    def poll_events(self, timeout: int = 0) -> Dict:
+        """
+        Drain pending camera events and publish new files and folders to the event listeners.
+
+        Called by the background poller; call it directly only when the poller is disabled.
+
+        :param timeout: Milliseconds to wait for the first event.
+        :return: A dictionary with the number of files and folders added.
+        """
+        method_name = "poll_events"
+        camera = self.__camera_manager.get_camera()
+        if not camera:
+            return sdict(False, message="No connected camera available.")
+
+        added_files, added_folders = 0, 0
+        try:
+            while True:
+                event_type, event_data = camera.wait_for_event(timeout)
+                if event_type == gp.GP_EVENT_TIMEOUT:
+                    break
+                if event_type == gp.GP_EVENT_FILE_ADDED:
+                    added_files += 1
+                    self.__camera_manager.publish_event("file_added", {"folder": event_data.folder, "name": event_data.name})
+                elif event_type == gp.GP_EVENT_FOLDER_ADDED:
+                    added_folders += 1
+                    self.__camera_manager.publish_event("folder_added", {"folder": event_data.folder, "name": event_data.name})
+                # Only the first call may block; drain the rest without waiting
+                timeout = 0
+        except gp.GPhoto2Error as e:
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, message=error_message)
+
+        return sdict(True, data={"files_added": added_files, "folders_added": added_folders},
+                     message="Camera events processed.")
+
+    def get_storage_info(self) -> Dict:
+        """
+        Returns capacity and free space of each storage (card) of the camera. Concurrent calls share one camera read.
+
+        :return: A dictionary with one entry per storage
+        """
+        return self.__reads.do("storage", self.__read_storage_info)
+
+    def __read_storage_info(self) -> Dict:
+        method_name = "get_storage_info"
+        camera = self.__camera_manager.get_camera()
+        if not camera:
+            return sdict(False, message="No connected camera available.")
+
+        try:
+            storages = []
+            for info in camera.get_storageinfo():
+                storages.append({
+                    "base_directory": info.basedir,
+                    "label": info.label,
+                    "description": info.description,
+                    "capacity_kb": info.capacitykbytes,
+                    "free_kb": info.freekbytes,
+                    "free_images": info.freeimages,
+                    "read_only": info.access == gp.GP_STORAGEINFO_AC_READONLY,
+                })
+        except gp.GPhoto2Error as e:
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, message=error_message)
+
+        return sdict(True, data={"storages": storages}, message=f"{len(storages)} storage(s) found.")
+
+    def list_files(self, folder: str = '/', offset: int = 0, limit: int = 100, with_info: bool = False) -> Dict:
+        """
+        List files on the camera storage from the cached index, one page at a time.
+
+        :param folder: Only list files below this folder.
+        :param offset: Index of the first file to return.
+        :param limit: Maximum number of files to return.
+        :param with_info: Include size and mtime for the returned files (fetched in one batch).
+        :return: A dictionary with the files of the page and the total number of matching files.
+        """
+        method_name = "list_files"
+        camera = self.__camera_manager.get_camera()
+        if not camera:
+            self.__logger.error(f"[{method_name}] No connected camera available")
+            return sdict(False, message="No connected camera available.")
+
+        try:
+            self.__ensure_index(camera)
+            with self.__lock:
+                if folder in ('', '/'):
+                    lower, upper = 0, len(self.__paths)
+                else:
+                    prefix = folder.rstrip('/') + '/'
+                    lower = bisect.bisect_left(self.__paths, prefix)
+                    upper = bisect.bisect_left(self.__paths, prefix[:-1] + chr(ord('/') + 1))
+                page = self.__paths[lower + offset:min(lower + offset + limit, upper)]
+                total = upper - lower
+
+            files = [dict(self.__split(path), path=path) for path in page]
+            if with_info:
+                info = self.get_file_info(page)
+                if not info["success"]:
+                    return info
+                for file in files:
+                    file.update(info["data"]["files"].get(file["path"], {}))
+
+            return sdict(True, data={"files": files, "total": total, "offset": offset, "limit": limit},
+                         message=f"{len(files)} file(s) listed.")
+
+        except gp.GPhoto2Error as e:
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, message=error_message)
+
+    def get_file_info(self, paths: List[str]) -> Dict:
+        """
+        Get size and modification time for a batch of card files, using the cache where possible.
+
+        :param paths: List of "folder/name" paths on the camera.
+        :return: A dictionary mapping each path to its size, mtime and mime type.
+        """
+        method_name = "get_file_info"
+        camera = self.__camera_manager.get_camera()
+        if not camera:
+            self.__logger.error(f"[{method_name}] No connected camera available")
+            return sdict(False, message="No connected camera available.")
+
+        with self.__lock:
+            results = {path: self.__file_info[path] for path in paths if path in self.__file_info}
+        missing = [path for path in paths if path not in results]
+
+        try:
+            for path in missing:
+                location = self.__split(path)
+                info = camera.file_get_info(location["folder"], location["name"])
+                results[path] = {"size": info.file.size, "mtime": info.file.mtime, "type": info.file.type}
+        except gp.GPhoto2Error as e:
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, message=error_message)
+
+        with self.__lock:
+            self.__file_info.update({path: results[path] for path in missing})
+
+        self.__logger.debug(f"[{method_name}] {len(paths) - len(missing)} cached, {len(missing)} fetched")
+        return sdict(True, data={"files": results}, message="File info retrieved.")
@@ -1,12 +1,34 @@
-import gphoto2 as gp
-from typing import Dict, Any
+import os
+import json
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Iterator, Tuple, List, Union
+
+import yaml
 
 from src.modules.camera_manager import CameraManager
 from src.utils.rcp_logger import Logger
 from src.utils.utils import *
 from src.utils.gphoto_errors import GPhotoErrorInterpreter
+from src.utils.retry_policy import RetryEngine
+from src.utils.lazy_import import lazy_import
+from src.utils.flight_recorder import recorded
+from src.utils.single_flight import SingleFlight
+
+gp = lazy_import("gphoto2")
 
 class ConfigHandler:
+    # Above this many settings one full tree transfer is cheaper than separate single-widget round trips
+    SINGLE_ACCESS_MAX_SETTINGS = 4
+
+    # Snapshots hold the state of settings, not one-shot triggers like autofocus drive or release, raw vendor
+    # properties, or session state the camera or libgphoto2 owns: restoring an old snapshot must not set the
+    # clock back, and the clock would otherwise differ on every restore.
+    SNAPSHOT_EXCLUDED_PREFIXES = ("/main/actions/", "/main/other/")
+    SNAPSHOT_EXCLUDED_WIDGETS = frozenset({"datetime", "datetimeutc", "capture", "remotemode", "eventmode"})
+    SNAPSHOT_FORMAT = 1
+
     def __init__(self, camera_manager: CameraManager):
         """
         Initialize ConfigHandler using configuration from CameraManager.
@@ -20,14 +42,137 @@ class ConfigHandler:
         self.__settings = camera_manager.get_config()
         self.__logger.debug("Configuration retrieved from CameraManager")
 
+        # Error-classified retries for config reads and writes
+        self.__retry_engine = RetryEngine.from_config(
+            self.__settings, reconnect=lambda: self.__camera_manager.reset_camera()["success"], logger=self.__logger
+        )
+
+        # Per-camera widget descriptions (type, read-only flag, choices) and a reusable config tree for sequences
+        self.__lock = threading.RLock()
+        self.__widget_info: Optional[Dict[str, Dict[str, Any]]] = None
+        self.__cached_tree = None
+        self.__camera_manager.add_event_listener(self.__on_camera_event)
+        camera_manager.get_config_service().subscribe(self.__on_config_change, sections=["capture", "retry"])
+
+        # Whether get_single_config/set_single_config work, per camera port (libgphoto2 >= 2.5.10)
+        self.__single_access: Dict[str, bool] = {}
+        self.__access_counts = {"single": 0, "tree": 0}
+        self.__last_access: Optional[str] = None
+
+        # Concurrent reads of the same setting share one camera round trip
+        self.__reads = SingleFlight("config_handler")
+
+        # With general.lazy_init the configured settings are applied on the next connection (or apply_settings)
+        # instead of during construction
+        self.__settings_pending = bool(self.__settings) and self.__settings.get('general', {}).get('lazy_init', False)
+
         # Only attempt to set configs if a camera is connected and settings are loaded
-        if self.__camera_manager.get_camera() and self.__settings:
-            camera_settings = self.__settings.get('camera', {})
-            # Remove nested dictionaries or lists
-            camera_settings = {k: v for k, v in camera_settings.items() 
-                               if not isinstance(v, (dict, list))}
-            self.set_multiple_configs(camera_settings)
+        if not self.__settings_pending and self.__camera_manager.get_camera() and self.__settings:
+            self.apply_settings()
+
+    def warm_up(self) -> Dict:
+        """
+        Apply the settings deferred by general.lazy_init, if a camera is connected.
+
+        :return: A dictionary indicating whether settings were applied.
+        """
+        if self.__settings_pending and self.__camera_manager.get_camera():
+            return self.apply_settings()
+        return sdict(True, message="No deferred settings to apply.")
+
+    @recorded("config_handler")
+    def apply_settings(self) -> Dict:
+        """
+        Push the settings of the configuration file's camera section to the connected camera.
+
+        :return: A dictionary with the result of each setting.
+        """
+        if not self.__camera_manager.get_camera():
+            return sdict(False, message="No connected camera available.")
+        self.__settings_pending = False
+        camera_settings = self.__settings.get('camera', {})
+        # Remove nested dictionaries or lists
+        camera_settings = {k: v for k, v in camera_settings.items() 
+                           if not isinstance(v, (dict, list))}
+        return sdict(True, data=self.set_multiple_configs(camera_settings), message="Configured settings applied.")
+
+    def __camera_port(self) -> Optional[str]:
+        return (self.__camera_manager.get_connected_camera_info() or {}).get('port')
+
+    def __record_access(self, path: str, setting_name: str):
+        with self.__lock:
+            self.__access_counts[path] += 1
+            self.__last_access = path
+        self.__logger.debug(f"{setting_name} accessed via {path} path")
+
+    def __mark_single_unsupported(self, reason: Any):
+        port = self.__camera_port()
+        with self.__lock:
+            self.__single_access[port] = False
+        self.__logger.info(f"Single-widget config access not available for camera at {port} ({reason}), using full tree")
+
+    def supports_single_access(self) -> bool:
+        """Returns False once single-widget access has failed as unsupported for the connected camera."""
+        with self.__lock:
+            return self.__single_access.get(self.__camera_port(), True)
+
+    def get_access_stats(self) -> Dict[str, Any]:
+        """Returns how many config accesses used the single-widget and the full-tree path."""
+        with self.__lock:
+            return dict(self.__access_counts, last=self.__last_access,
+                        single_supported=self.__single_access.get(self.__camera_port()))
+
+    def __get_widget(self, method_name: str, setting_name: str):
+        """
+        Fetch one widget, using get_single_config when the camera supports it.
+
+        :return: (widget, tree) where tree is None if the widget was fetched on its own.
+        :raises gp.GPhoto2Error: If the widget cannot be fetched (GP_ERROR_BAD_PARAMETERS if it does not exist).
+        """
+        if self.supports_single_access():
+            try:
+                widget = self.__retry_engine.run(
+                    method_name, lambda: self.__camera_manager.get_camera().get_single_config(setting_name)
+                )
+                with self.__lock:
+                    self.__single_access[self.__camera_port()] = True
+                self.__record_access("single", setting_name)
+                return widget, None
+            except AttributeError as e:
+                self.__mark_single_unsupported(e)
+            except gp.GPhoto2Error as e:
+                if e.code != gp.GP_ERROR_NOT_SUPPORTED:
+                    raise
+                self.__mark_single_unsupported(GPhotoErrorInterpreter.interpret_error(e))
+
+        tree = self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().get_config())
+        self.__record_access("tree", setting_name)
+        return tree.get_child_by_name(setting_name), tree
+
+    def __commit_widget(self, method_name: str, setting_name: str, widget, tree):
+        """Write back a widget obtained from __get_widget, falling back to a full tree write if needed."""
+        if tree is not None:
+            self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().set_config(tree))
+            return
+        try:
+            self.__retry_engine.run(
+                method_name, lambda: self.__camera_manager.get_camera().set_single_config(setting_name, widget)
+            )
+        except (AttributeError, gp.GPhoto2Error) as e:
+            if isinstance(e, gp.GPhoto2Error) and e.code != gp.GP_ERROR_NOT_SUPPORTED:
+                raise
+            self.__mark_single_unsupported(e)
+            tree = self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().get_config())
+            tree.get_child_by_name(setting_name).set_value(widget.get_value())
+            self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().set_config(tree))
+            self.__record_access("tree", setting_name)
 
+    def __publish_changes(self, settings: Dict[str, Any]):
+        """Notify event listeners of settings written to the camera."""
+        self.__camera_manager.publish_event("config_changed",
+                                            {"settings": {name: str(value) for name, value in settings.items()}})
+
+    @recorded("config_handler")
     def set_single_config(self, setting_name: str, setting_value: Any) -> Dict:
         """
         Set a single configuration setting on the camera.
@@ -43,12 +188,12 @@ class ConfigHandler:
                 self.__logger.error(f"[{method_name}] No connected camera available")
                 return sdict(False, message="No connected camera available.")
 
-            config = camera.get_config()
-            
             # Attempt to find the setting
             try:
-                setting = config.get_child_by_name(setting_name)
+                setting, config = self.__get_widget(method_name, setting_name)
             except gp.GPhoto2Error as e:
+                if e.code != gp.GP_ERROR_BAD_PARAMETERS:
+                    raise
                 error_message = GPhotoErrorInterpreter.interpret_error(e)
                 self.__logger.warning(f"[{method_name}] Setting {setting_name} not found: {error_message}")
                 return sdict(False, message=f"Setting {setting_name} not found: {error_message}")
@@ -64,14 +209,17 @@ class ConfigHandler:
                     setting_value = valid_choices[0]
 
             setting.set_value(str(setting_value))
-            camera.set_config(config)
+            self.__commit_widget(method_name, setting_name, setting, config)
             
             self.__logger.info(f"[{method_name}] Successfully set {setting_name} to {setting_value}")
+            self.__publish_changes({setting_name: setting_value})
             return sdict(True, message=f"Successfully set {setting_name}")
 
         except gp.GPhoto2Error as e:
             error_message = GPhotoErrorInterpreter.interpret_error(e)
             self.__logger.error(f"[{method_name}] Error setting {setting_name}: {error_message}")
+            self.__camera_manager.publish_event("error", {"operation": method_name, "message": error_message,
+                                                          "setting": setting_name})
             return sdict(False, message=f"Error setting {setting_name}: {error_message}")
         except Exception as e:
             self.__logger.error(f"[{method_name}] Unexpected error setting {setting_name}: {e}")
@@ -101,13 +249,17 @@ class ConfigHandler:
         self.__logger.info(f"[{method_name}] Configuration settings processed")
         return results
 
+    @recorded("config_handler")
     def get_config_value(self, setting_name: str) -> Dict:
         """
-        Get the current value of a specific configuration setting.
+        Get the current value of a specific configuration setting. Concurrent reads of the same setting are coalesced.
 
         :param setting_name: The name of the setting to retrieve.
         :return: A dictionary with the success status and the current value if successful.
         """
+        return self.__reads.do(("config", setting_name), lambda: self.__read_config_value(setting_name))
+
+    def __read_config_value(self, setting_name: str) -> Dict:
         method_name = "get_config_value"
         try:
             camera = self.__camera_manager.get_camera()
@@ -115,11 +267,11 @@ class ConfigHandler:
                 self.__logger.error(f"[{method_name}] No connected camera available")
                 return sdict(False, message="No connected camera available.")
 
-            config = camera.get_config()
-            
             try:
-                setting = config.get_child_by_name(setting_name)
+                setting, _ = self.__get_widget(method_name, setting_name)
             except gp.GPhoto2Error as e:
+                if e.code != gp.GP_ERROR_BAD_PARAMETERS:
+                    raise
                 error_message = GPhotoErrorInterpreter.interpret_error(e)
                 self.__logger.warning(f"[{method_name}] Setting {setting_name} not found: {error_message}")
                 return sdict(False, message=f"Setting {setting_name} not found: {error_message}")
@@ -152,3 +304,392 @@ class ConfigHandler:
             results[setting_name] = result
 
         return results
+
+    def __on_config_change(self, section: str, new_section: Any, config: Dict[str, Any]):
+        # Retry settings edited in config.yaml apply to the next config read or write
+        self.__settings = config
+        self.__retry_engine = RetryEngine.from_config(
+            config, reconnect=lambda: self.__camera_manager.reset_camera()["success"], logger=self.__logger
+        )
+
+    def __on_camera_event(self, event_type: str, data: Dict[str, Any]):
+        # Capabilities and cached trees belong to one camera session
+        if event_type in ("connected", "disconnected"):
+            with self.__lock:
+                self.__widget_info = None
+                self.__cached_tree = None
+        if event_type == "connected" and self.__settings_pending:
+            self.apply_settings()
+
+    @staticmethod
+    def _walk_widgets(widget) -> Iterator[Tuple[str, Any]]:
+        """Yields (path, widget) for every leaf widget of a config tree."""
+        stack = [("", widget)]
+        while stack:
+            parent_path, current = stack.pop()
+            path = f"{parent_path}/{current.get_name()}"
+            if current.get_type() in (gp.GP_WIDGET_WINDOW, gp.GP_WIDGET_SECTION):
+                for index in reversed(range(current.count_children())):
+                    stack.append((path, current.get_child(index)))
+            else:
+                yield path, current
+
+    @staticmethod
+    def _describe_widget(widget) -> Dict[str, Any]:
+        """Returns the type, read-only flag and allowed values of a leaf widget."""
+        widget_type = widget.get_type()
+        info = {"type": widget_type, "readonly": bool(widget.get_readonly())}
+        if widget_type in (gp.GP_WIDGET_RADIO, gp.GP_WIDGET_MENU):
+            info["choices"] = [widget.get_choice(i) for i in range(widget.count_choices())]
+        elif widget_type == gp.GP_WIDGET_RANGE:
+            info["range"] = list(widget.get_range())
+        return info
+
+    @recorded("config_handler")
+    def get_widget_info(self, refresh: bool = False) -> Dict:
+        """
+        Describe every widget of the connected camera (type, read-only flag, choices or range).
+
+        The description is read in one tree pass and cached until the camera reconnects.
+
+        :param refresh: Re-read the description from the camera.
+        :return: A dictionary mapping widget names to their description.
+        """
+        method_name = "get_widget_info"
+        with self.__lock:
+            if self.__widget_info is not None and not refresh:
+                return sdict(True, data={"widgets": self.__widget_info}, message="Widget info retrieved (cached).")
+
+        if not self.__camera_manager.get_camera():
+            self.__logger.error(f"[{method_name}] No connected camera available")
+            return sdict(False, message="No connected camera available.")
+
+        try:
+            tree = self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().get_config())
+        except gp.GPhoto2Error as e:
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, message=error_message)
+
+        widget_info = {}
+        for path, widget in self._walk_widgets(tree):
+            widget_info[widget.get_name()] = dict(self._describe_widget(widget), path=path)
+
+        with self.__lock:
+            self.__widget_info = widget_info
+        self.__logger.debug(f"[{method_name}] Described {len(widget_info)} widget(s)")
+        return sdict(True, data={"widgets": widget_info}, message="Widget info retrieved.")
+
+    def get_choices(self, setting_name: str) -> Dict:
+        """
+        Get the allowed values of a radio/menu setting from the cached widget description.
+
+        :param setting_name: The name of the setting.
+        :return: A dictionary with the list of choices.
+        """
+        info = self.get_widget_info()
+        if not info["success"]:
+            return info
+        widget = info["data"]["widgets"].get(setting_name)
+        if widget is None:
+            return sdict(False, message=f"Setting {setting_name} not found.")
+        return sdict(True, data={"choices": widget.get("choices", [])}, message=f"Choices of {setting_name} retrieved.")
+
+    def validate_settings(self, settings: Dict[str, Any]) -> Dict:
+        """
+        Check settings against the cached widget description without touching the camera.
+
+        :param settings: Setting names and values.
+        :return: A dictionary listing the problems found, if any.
+        """
+        info = self.get_widget_info()
+        if not info["success"]:
+            return info
+
+        errors = {}
+        for setting_name, setting_value in settings.items():
+            widget = info["data"]["widgets"].get(setting_name)
+            if widget is None:
+                errors[setting_name] = "not found"
+            elif widget["readonly"]:
+                errors[setting_name] = "read-only"
+            elif "choices" in widget and str(setting_value) not in widget["choices"]:
+                errors[setting_name] = f"invalid value {setting_value!r}, valid choices are {widget['choices']}"
+
+        if errors:
+            return sdict(False, data={"errors": errors}, message=f"Invalid settings: {', '.join(errors)}")
+        return sdict(True, message="Settings are valid.")
+
+    @recorded("config_handler")
+    def read_settings(self, setting_names: List[str]) -> Dict:
+        """
+        Read several settings with a single config tree fetch.
+
+        :param setting_names: Names of the settings to read.
+        :return: A dictionary with the current values under ``data["values"]``.
+        """
+        method_name = "read_settings"
+        if not self.__camera_manager.get_camera():
+            self.__logger.error(f"[{method_name}] No connected camera available")
+            return sdict(False, message="No connected camera available.")
+
+        try:
+            if self.supports_single_access() and len(setting_names) <= self.SINGLE_ACCESS_MAX_SETTINGS:
+                values = {name: self.__get_widget(method_name, name)[0].get_value() for name in setting_names}
+            else:
+                tree = self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().get_config())
+                self.__record_access("tree", ",".join(setting_names))
+                values = {name: tree.get_child_by_name(name).get_value() for name in setting_names}
+            return sdict(True, data={"values": values}, message=f"Read {len(values)} setting(s).")
+        except gp.GPhoto2Error as e:
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, message=f"Error reading settings: {error_message}")
+
+    @recorded("config_handler")
+    def write_settings(self, settings: Dict[str, Any], reuse_tree: bool = False) -> Dict:
+        """
+        Write several settings with a single config tree fetch and a single commit.
+
+        Values are not corrected; validate them first with validate_settings.
+
+        :param settings: Setting names and values.
+        :param reuse_tree: Keep the fetched tree and reuse it on the next call (for back-to-back sequence steps).
+        :return: A dictionary indicating the success status.
+        """
+        method_name = "write_settings"
+        if not self.__camera_manager.get_camera():
+            self.__logger.error(f"[{method_name}] No connected camera available")
+            return sdict(False, message="No connected camera available.")
+
+        try:
+            if self.supports_single_access() and len(settings) <= self.SINGLE_ACCESS_MAX_SETTINGS:
+                for setting_name, setting_value in settings.items():
+                    widget, tree = self.__get_widget(method_name, setting_name)
+                    widget.set_value(str(setting_value))
+                    self.__commit_widget(method_name, setting_name, widget, tree)
+                self.__logger.info(f"[{method_name}] Wrote {len(settings)} setting(s)")
+                self.__publish_changes(settings)
+                return sdict(True, message=f"Wrote {len(settings)} setting(s).")
+
+            with self.__lock:
+                tree = self.__cached_tree if reuse_tree else None
+            if tree is None:
+                tree = self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().get_config())
+            self.__record_access("tree", ",".join(settings))
+
+            for setting_name, setting_value in settings.items():
+                tree.get_child_by_name(setting_name).set_value(str(setting_value))
+            self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().set_config(tree))
+
+            with self.__lock:
+                self.__cached_tree = tree if reuse_tree else None
+            self.__logger.info(f"[{method_name}] Wrote {len(settings)} setting(s)")
+            self.__publish_changes(settings)
+            return sdict(True, message=f"Wrote {len(settings)} setting(s).")
+
+        except gp.GPhoto2Error as e:
+            with self.__lock:
+                self.__cached_tree = None
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f"[{method_name}] {error_message}")
+            self.__camera_manager.publish_event("error", {"operation": method_name, "message": error_message,
+                                                          "settings": sorted(settings)})
+            return sdict(False, message=f"Error writing settings: {error_message}")
+
+    def release_tree(self):
+        """Drops the config tree kept by write_settings(reuse_tree=True)."""
+        with self.__lock:
+            self.__cached_tree = None
+
+    @staticmethod
+    def _snapshot_widgets(tree) -> Iterator[Tuple[str, Any]]:
+        """Yields (path, widget) for every writable value widget of a tree that belongs in a snapshot."""
+        value_types = (gp.GP_WIDGET_TEXT, gp.GP_WIDGET_RANGE, gp.GP_WIDGET_TOGGLE, gp.GP_WIDGET_RADIO,
+                       gp.GP_WIDGET_MENU, gp.GP_WIDGET_DATE)
+        for path, widget in ConfigHandler._walk_widgets(tree):
+            if path.startswith(ConfigHandler.SNAPSHOT_EXCLUDED_PREFIXES) or widget.get_readonly() \
+                    or path.rsplit("/", 1)[-1] in ConfigHandler.SNAPSHOT_EXCLUDED_WIDGETS:
+                continue
+            if widget.get_type() in value_types:
+                yield path, widget
+
+    @staticmethod
+    def _same_value(current: Any, wanted: Any) -> bool:
+        if isinstance(current, float) or isinstance(wanted, float):
+            try:
+                return abs(float(current) - float(wanted)) < 1e-6
+            except (TypeError, ValueError):
+                return False
+        return str(current) == str(wanted)
+
+    @staticmethod
+    def _coerce_value(widget, value: Any) -> Any:
+        """Converts a snapshot value to the type set_value expects for the widget."""
+        widget_type = widget.get_type()
+        if widget_type == gp.GP_WIDGET_RANGE:
+            return float(value)
+        if widget_type in (gp.GP_WIDGET_TOGGLE, gp.GP_WIDGET_DATE):
+            return int(value)
+        return str(value)
+
+    @staticmethod
+    def load_snapshot(path: str) -> Dict[str, Any]:
+        """
+        Read a snapshot file written by export_snapshot.
+
+        :param path: A .yaml/.yml or .json file.
+        :return: The snapshot.
+        """
+        with open(path, 'r') as file:
+            if path.endswith(('.yaml', '.yml')):
+                return yaml.safe_load(file)
+            return json.load(file)
+
+    @recorded("config_handler")
+    def export_snapshot(self, path: Optional[str] = None) -> Dict:
+        """
+        Capture the state of every writable setting of the connected camera in one tree pass.
+
+        Read-only widgets, actions, vendor properties and session state (clock, remote and event mode) are left
+        out. Settings are keyed by their widget path, so a snapshot can be restored on another body of the same
+        model.
+
+        :param path: Optional file to write the snapshot to; YAML if it ends in .yaml/.yml, JSON otherwise.
+        :return: A dictionary with the snapshot under ``data["snapshot"]`` and the file path, if any.
+        """
+        method_name = "export_snapshot"
+        if not self.__camera_manager.get_camera():
+            self.__logger.error(f"[{method_name}] No connected camera available")
+            return sdict(False, message="No connected camera available.")
+
+        try:
+            tree = self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().get_config())
+            self.__record_access("tree", "snapshot")
+            settings = {path: widget.get_value() for path, widget in self._snapshot_widgets(tree)}
+        except gp.GPhoto2Error as e:
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, message=f"Error reading camera state: {error_message}")
+
+        snapshot = {
+            "format": self.SNAPSHOT_FORMAT,
+            "camera": dict(self.__camera_manager.get_connected_camera_info() or {}),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "settings": settings,
+        }
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                with open(path, 'w') as file:
+                    if path.endswith(('.yaml', '.yml')):
+                        yaml.safe_dump(snapshot, file, sort_keys=False, allow_unicode=True)
+                    else:
+                        json.dump(snapshot, file, indent=1)
+            except OSError as e:
+                self.__logger.error(f"[{method_name}] Failed to write {path}: {e}")
+                return sdict(False, data={"snapshot": snapshot}, message=f"Failed to write snapshot: {e}")
+
+        self.__logger.info(f"[{method_name}] Captured {len(settings)} setting(s)" + (f" to {path}" if path else ""))
+        return sdict(True, data={"snapshot": snapshot, "path": path},
+                     message=f"Captured {len(settings)} setting(s).")
+
+    @recorded("config_handler")
+    def restore_snapshot(self, snapshot: Union[Dict[str, Any], str], dry_run: bool = False) -> Dict:
+        """
+        Bring the connected camera to the state of a snapshot, writing only the settings that differ.
+
+        The tree is fetched once, differing widgets are changed and the tree is committed once; libgphoto2 only
+        sends the widgets marked as changed. Settings the camera does not have, values it does not accept
+        (e.g. a snapshot of another model) and read-only widgets are skipped and reported.
+
+        :param snapshot: A snapshot from export_snapshot, or the path of a snapshot file.
+        :param dry_run: Only compute the difference.
+        :return: A dictionary with the ``changed``, ``skipped`` and unchanged settings.
+        """
+        method_name = "restore_snapshot"
+        if isinstance(snapshot, str):
+            try:
+                snapshot = self.load_snapshot(snapshot)
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                return sdict(False, message=f"Failed to read snapshot: {e}")
+        if not isinstance(snapshot, dict) or not isinstance(snapshot.get("settings"), dict):
+            return sdict(False, message="Invalid snapshot: no settings.")
+        if not self.__camera_manager.get_camera():
+            self.__logger.error(f"[{method_name}] No connected camera available")
+            return sdict(False, message="No connected camera available.")
+
+        wanted = snapshot["settings"]
+        changed, skipped, changed_names = {}, {}, {}
+        unchanged = 0
+        try:
+            tree = self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().get_config())
+            self.__record_access("tree", "snapshot")
+            widgets = dict(self._snapshot_widgets(tree))
+            for path, value in wanted.items():
+                widget = widgets.get(path)
+                if widget is None:
+                    skipped[path] = "not available or read-only"
+                    continue
+                current = widget.get_value()
+                if self._same_value(current, value):
+                    unchanged += 1
+                    continue
+                if widget.get_type() in (gp.GP_WIDGET_RADIO, gp.GP_WIDGET_MENU) and \
+                        str(value) not in [widget.get_choice(i) for i in range(widget.count_choices())]:
+                    skipped[path] = f"invalid value {value!r}"
+                    continue
+                try:
+                    widget.set_value(self._coerce_value(widget, value))
+                except (gp.GPhoto2Error, TypeError, ValueError) as e:
+                    skipped[path] = f"rejected value {value!r}: {e}"
+                    continue
+                changed[path] = {"from": current, "to": value}
+                changed_names[widget.get_name()] = value
+
+            if changed and not dry_run:
+                self.__retry_engine.run(method_name, lambda: self.__camera_manager.get_camera().set_config(tree))
+        except gp.GPhoto2Error as e:
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f"[{method_name}] {error_message}")
+            self.__camera_manager.publish_event("error", {"operation": method_name, "message": error_message})
+            return sdict(False, data={"changed": changed, "skipped": skipped},
+                         message=f"Error restoring snapshot: {error_message}")
+
+        with self.__lock:
+            self.__cached_tree = None
+        data = {"changed": changed, "skipped": skipped, "unchanged": unchanged, "dry_run": dry_run}
+        if dry_run:
+            return sdict(True, data=data, message=f"{len(changed)} setting(s) differ.")
+        if changed:
+            self.__publish_changes(changed_names)
+        self.__logger.info(f"[{method_name}] Changed {len(changed)}, skipped {len(skipped)}, "
+                           f"unchanged {unchanged} setting(s)")
+        return sdict(True, data=data, message=f"Snapshot restored: {len(changed)} setting(s) changed.")
+
+    def clone_to(self, targets: List["ConfigHandler"], dry_run: bool = False) -> Dict:
+        """
+        Copy the state of this handler's camera to the cameras of other handlers, in parallel.
+
+        :param targets: Handlers (or worker proxies) of the cameras to update.
+        :param dry_run: Only compute each camera's difference.
+        :return: A dictionary with the restore result of each target, in order.
+        """
+        exported = self.export_snapshot()
+        if not exported["success"]:
+            return exported
+        snapshot = exported["data"]["snapshot"]
+        if not targets:
+            return sdict(True, data={"results": []}, message="No cameras to clone to.")
+
+        def restore(target) -> Dict:
+            try:
+                return target.restore_snapshot(snapshot, dry_run=dry_run)
+            except Exception as e:
+                return sdict(False, message=f"{type(e).__name__}: {e}")
+
+        with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix="config-clone") as executor:
+            results = list(executor.map(restore, targets))
+        failed = sum(not result["success"] for result in results)
+        return sdict(not failed, data={"results": results, "source": snapshot["camera"]},
+                     message=f"Cloned to {len(results) - failed} of {len(results)} camera(s).")
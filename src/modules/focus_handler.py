@@ -0,0 +1,195 @@
+import time
+from typing import Dict, Any, List, Optional
+
+from src.modules.camera_manager import CameraManager
+from src.modules.config_handler import ConfigHandler
+from src.modules.capture_handler import CaptureHandler
+from src.utils.flight_recorder import recorded
+from src.utils.frame_stats import FrameAnalyzer
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+
+
+class FocusHandler:
+    DIRECTIONS = ("Near", "Far")
+    # Moves without any contrast gain after which the search turns around (e.g. when starting far out of focus)
+    FLAT_STEPS = 2
+
+    def __init__(self, camera_manager: CameraManager, config_handler: ConfigHandler, capture_handler: CaptureHandler):
+        """
+        Initialize FocusHandler, which focuses the lens on the host by contrast detection.
+
+        The lens is moved with the manual focus drive widget and a preview is scored after every move. A coarse
+        hill climb finds the region of the contrast peak, a fine one settles on it, and the lens is driven back to
+        the best position seen once the score has clearly dropped. Previews are taken with the viewfinder held up
+        (a live-view session), so each step costs one config write and one live-view frame.
+
+        :param camera_manager: CameraManager instance
+        :param config_handler: ConfigHandler instance
+        :param capture_handler: CaptureHandler instance
+        """
+        self.__camera_manager = camera_manager
+        self.__config_handler = config_handler
+        self.__capture_handler = capture_handler
+        self.__logger = Logger.get_logger("Focus Handler")
+        # Created on first use, as NumPy and Pillow are optional
+        self.__frame_analyzer: Optional[FrameAnalyzer] = None
+        self.__analyzer_width: Optional[int] = None
+
+    def __get_analyzer(self, max_width: Optional[int]) -> FrameAnalyzer:
+        if self.__frame_analyzer is None or self.__analyzer_width != max_width:
+            self.__frame_analyzer = FrameAnalyzer(batch_size=1, max_width=max_width)
+            self.__analyzer_width = max_width
+        return self.__frame_analyzer
+
+    @recorded("focus_handler")
+    def autofocus(self, max_steps: Optional[int] = None, coarse_step: Optional[int] = None,
+                  fine_step: Optional[int] = None, roi: Optional[float] = None,
+                  settle_ms: Optional[float] = None) -> Dict:
+        """
+        Focus by driving the lens through coarse and then fine steps until the preview contrast peaks.
+
+        Settings left out fall back to the ``focus`` section of the configuration.
+
+        :param max_steps: Budget of search steps (lens moves followed by a preview). Moves back to the best
+                          position found do not count against it.
+        :param coarse_step: Drive size of the coarse search (e.g. 3 for "Near 3"/"Far 3"). 0 skips it.
+        :param fine_step: Drive size of the fine search (e.g. 1 for "Near 1"/"Far 1").
+        :param roi: Side of the centred region scored, as a fraction of the frame.
+        :param settle_ms: Wait after each lens move before taking the preview (milliseconds).
+        :return: A dictionary with the best score, whether the peak was reached and per-step timings.
+        """
+        method_name = "autofocus"
+        focus_config = self.__camera_manager.get_config().get('focus', {}) or {}
+        widget = focus_config.get('widget', 'manualfocusdrive')
+        max_steps = focus_config.get('max_steps', 40) if max_steps is None else max_steps
+        coarse_step = focus_config.get('coarse_step', 3) if coarse_step is None else coarse_step
+        fine_step = focus_config.get('fine_step', 1) if fine_step is None else fine_step
+        roi = focus_config.get('roi', 0.5) if roi is None else roi
+        settle_ms = focus_config.get('settle_ms', 50) if settle_ms is None else settle_ms
+        min_drop = focus_config.get('min_drop', 0.05)
+
+        if not self.__camera_manager.get_camera():
+            self.__logger.error(f"[{method_name}] No connected camera available")
+            return sdict(False, message="No connected camera available.")
+        if not 0 < roi <= 1:
+            return sdict(False, message=f"Invalid region of interest {roi}, expected 0 < roi <= 1")
+        try:
+            analyzer = self.__get_analyzer(focus_config.get('max_width', 320))
+        except ImportError as e:
+            self.__logger.error(f"[{method_name}] {e}")
+            return sdict(False, message=str(e))
+
+        choices = self.__config_handler.get_choices(widget)
+        if not choices["success"]:
+            return choices
+        phases = [("coarse", coarse_step)] if coarse_step else []
+        phases.append(("fine", fine_step))
+        missing = [f"{direction} {size}" for _, size in phases for direction in self.DIRECTIONS
+                   if f"{direction} {size}" not in choices["data"]["choices"]]
+        if missing:
+            return sdict(False, message=f"{widget} does not offer {', '.join(missing)}. "
+                                        f"Choices: {choices['data']['choices']}")
+
+        steps: List[Dict[str, Any]] = []
+        started = time.perf_counter()
+        budget = {"left": max_steps}
+
+        def measure(phase: str, drive: Optional[str], count: int = 1) -> float:
+            """Drives the lens ``count`` times (if ``drive`` is set), then takes and scores a preview."""
+            step = {"index": len(steps), "phase": phase, "drive": drive, "moves": count if drive else 0}
+            step_started = time.perf_counter()
+            if drive:
+                for _ in range(count):
+                    driven = self.__config_handler.set_single_config(widget, drive)
+                    if not driven["success"]:
+                        raise RuntimeError(driven["message"])
+                step["drive_ms"] = round((time.perf_counter() - step_started) * 1000, 1)
+                if settle_ms:
+                    time.sleep(settle_ms / 1000)
+
+            preview_started = time.perf_counter()
+            preview = self.__capture_handler.capture_preview(save=False)
+            if not preview["success"]:
+                raise RuntimeError(preview["message"])
+            step["preview_ms"] = round((time.perf_counter() - preview_started) * 1000, 1)
+
+            score_started = time.perf_counter()
+            score = analyzer.focus_scores(analyzer.decode_batch([preview["data"]["frame"]]), roi=roi)[0]
+            step["score_ms"] = round((time.perf_counter() - score_started) * 1000, 1)
+            step["score"] = score
+            step["total_ms"] = round((time.perf_counter() - step_started) * 1000, 1)
+            steps.append(step)
+            return score
+
+        def climb(phase: str, size: int, direction: int, current: float) -> Dict[str, Any]:
+            """
+            Hill climb with drives of one size, starting in ``direction`` (0: Near, 1: Far). If the first moves
+            lose contrast, or gain none for FLAT_STEPS moves, it returns to the start and searches the other way
+            once. It ends at the best position when the score has dropped by min_drop below the best.
+            """
+            position = best_position = 0
+            best = current
+            reversed_once = False
+            while True:
+                if budget["left"] <= 0:
+                    peak = False
+                    break
+                budget["left"] -= 1
+                position += 1 if direction else -1
+                score = measure(phase, f"{self.DIRECTIONS[direction]} {size}")
+                if score > best:
+                    best, best_position = score, position
+                    continue
+                dropped = score < best * (1 - min_drop)
+                if best_position == 0 and not reversed_once and (dropped or abs(position) >= self.FLAT_STEPS):
+                    # No contrast to gain this way: the peak lies on the other side of the start
+                    direction, reversed_once = 1 - direction, True
+                    measure(f"{phase}_return", f"{self.DIRECTIONS[direction]} {size}", abs(position))
+                    position = 0
+                    continue
+                if dropped:
+                    peak = True
+                    break
+
+            # Back to the best position; the preview after the last move gives the score the lens really settled at
+            distance = position - best_position
+            if distance:
+                back = 0 if distance > 0 else 1
+                current = measure(f"{phase}_return", f"{self.DIRECTIONS[back]} {size}", abs(distance))
+                direction = back
+            else:
+                current = best
+            return {"peak": peak, "best": best, "score": current, "direction": direction}
+
+        liveview = self.__capture_handler.get_liveview_stats()
+        started_session = False
+        if not liveview["session"]:
+            started_session = self.__capture_handler.start_liveview_session()["success"]
+        try:
+            current = measure("start", None)
+            initial_score = current
+            result = {"peak": False, "direction": 1}
+            for phase, size in phases:
+                result = climb(phase, size, result["direction"], current)
+                current = result["score"]
+        except RuntimeError as e:
+            error_message = f"Focus sweep failed at step {len(steps)}: {e}"
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, data={"steps": steps, "total_ms": round((time.perf_counter() - started) * 1000, 1)},
+                         message=error_message)
+        finally:
+            if started_session:
+                self.__capture_handler.stop_liveview_session()
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        data = {"peak": result["peak"], "score": current, "best_score": max(step["score"] for step in steps),
+                "initial_score": initial_score, "steps_used": max_steps - budget["left"], "max_steps": max_steps,
+                "moves": sum(step["moves"] for step in steps), "steps": steps, "total_ms": total_ms}
+        if not result["peak"]:
+            message = f"No focus peak within {max_steps} step(s); the lens was left at the best position seen."
+            self.__logger.warning(f"[{method_name}] {message}")
+            return sdict(False, data=data, message=message)
+        self.__logger.info(f"[{method_name}] Focused in {data['steps_used']} step(s), {total_ms} ms "
+                           f"(score {initial_score} -> {current})")
+        return sdict(True, data=data, message="Focus peak found.")
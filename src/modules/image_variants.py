@@ -0,0 +1,215 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional, Dict, Any, List, Callable
+
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+
+# Optional dependency: resized variants need Pillow (pip install Pillow); full-size images are served without it
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+FULL_SIZE = "full"
+
+
+def _render_variant(source_path: str, target_path: str, width: int, quality: int) -> int:
+    """
+    Resize a JPEG to ``width`` pixels and write it atomically to ``target_path`` (runs in a pool process).
+
+    :return: Size of the written file in bytes.
+    """
+    with Image.open(source_path) as image:
+        # Let the JPEG decoder downscale by a power of two first; decoding a full sensor frame is the slow part
+        image.draft("RGB", (width, width))
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image.thumbnail((width, image.height), Image.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        temporary_path = f"{target_path}.{os.getpid()}.tmp"
+        image.save(temporary_path, "JPEG", quality=quality, optimize=True, progressive=True)
+    os.replace(temporary_path, target_path)
+    return os.path.getsize(target_path)
+
+
+class ImageVariantService:
+    def __init__(self, cache_directory: str = "./variants", sizes: Optional[List[int]] = None, quality: int = 85,
+                 cache_mb: float = 1024, workers: Optional[int] = 2, render_timeout: float = 30.0):
+        """
+        Produces resized renditions of stored captures on first request and caches them on disk.
+
+        Variants are content-addressed by the SHA-256 of the source file (from the capture index), width and
+        quality, so a cached file never goes stale and its ETag can be derived without reading it. Rendering
+        runs in a process pool; concurrent requests for the same variant share one render.
+
+        :param cache_directory: Directory of the rendered variants.
+        :param sizes: Allowed widths in pixels. "full" (the original file) is always allowed.
+        :param quality: JPEG quality of the variants.
+        :param cache_mb: Size limit of the cache directory; the least recently served variants are removed.
+        :param workers: Number of render processes. None uses one per core.
+        :param render_timeout: Seconds to wait for a render.
+        """
+        self.__logger = Logger.get_logger("Image Variants")
+        self.__cache_directory = cache_directory
+        self.__sizes = sorted(set(sizes or [320, 1280]))
+        self.__quality = quality
+        self.__max_cache_bytes = int(cache_mb * 1024 * 1024)
+        self.__workers = workers
+        self.__render_timeout = render_timeout
+
+        self.__lock = threading.Lock()
+        # Cache accounting and trimming scan the directory; they have their own lock so renders are not held up
+        self.__eviction_lock = threading.Lock()
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__in_flight: Dict[str, Future] = {}
+        self.__cache_bytes: Optional[int] = None     # Measured on first render
+        self.__stats = {"hits": 0, "renders": 0, "failures": 0, "evicted": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ImageVariantService":
+        """
+        Create the service from the ``variants`` section of config.yaml.
+
+        :param config: Full configuration dictionary.
+        """
+        settings = config.get('variants', {}) or {}
+        return cls(cache_directory=settings.get('cache_directory', './variants'), sizes=settings.get('sizes'),
+                   quality=settings.get('quality', 85), cache_mb=settings.get('cache_mb', 1024),
+                   workers=settings.get('workers', 2), render_timeout=settings.get('render_timeout', 30))
+
+    @staticmethod
+    def is_available() -> bool:
+        """Returns True if Pillow is installed, i.e. resized variants can be rendered."""
+        return Image is not None
+
+    def get_sizes(self) -> List[Any]:
+        """Returns the allowed sizes: the configured widths and "full"."""
+        return list(self.__sizes) + [FULL_SIZE]
+
+    def __get_executor(self) -> ProcessPoolExecutor:
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ProcessPoolExecutor(max_workers=self.__workers,
+                                                      mp_context=multiprocessing.get_context("spawn"))
+            return self.__executor
+
+    def __variant_path(self, sha256: str, width: int) -> str:
+        return os.path.join(self.__cache_directory, sha256[:2], f"{sha256}_{width}_q{self.__quality}.jpg")
+
+    def get_variant(self, source_path: str, sha256: str, size: Any = FULL_SIZE,
+                    wait_for_source: Optional[Callable[[], Any]] = None) -> Dict:
+        """
+        Returns the file of a capture's variant, rendering it first if it is not cached yet.
+
+        :param source_path: Path of the original capture.
+        :param sha256: SHA-256 of the original capture, as stored in the capture index.
+        :param size: A configured width, or "full" for the original file.
+        :param wait_for_source: Called before rendering, e.g. to wait for the storage writer to flush the original.
+        :return: A dictionary with ``path``, ``etag``, ``width`` and ``cached``.
+        """
+        method_name = "get_variant"
+        if str(size) == FULL_SIZE:
+            return sdict(True, data={"path": source_path, "etag": sha256, "width": FULL_SIZE, "cached": True},
+                         message="Original file.")
+
+        try:
+            width = int(size)
+        except (TypeError, ValueError):
+            width = None
+        if width not in self.__sizes:
+            return sdict(False, message=f"Unknown size '{size}'. Available sizes: {self.get_sizes()}")
+        if not self.is_available():
+            return sdict(False, message="Resized images require Pillow (pip install Pillow).")
+
+        target_path = self.__variant_path(sha256, width)
+        etag = f"{sha256}-{width}-q{self.__quality}"
+        if os.path.exists(target_path):
+            self.__stats["hits"] += 1
+            try:
+                # Served variants are kept longest when the cache is trimmed
+                os.utime(target_path)
+            except OSError:
+                pass
+            return sdict(True, data={"path": target_path, "etag": etag, "width": width, "cached": True},
+                         message="Variant served from cache.")
+
+        if wait_for_source is not None:
+            wait_for_source()
+        executor = self.__get_executor()
+        with self.__lock:
+            future = self.__in_flight.get(target_path)
+            owner = future is None
+            if owner:
+                future = executor.submit(_render_variant, source_path, target_path, width, self.__quality)
+                self.__in_flight[target_path] = future
+
+        try:
+            written = future.result(timeout=self.__render_timeout)
+        except Exception as e:
+            self.__stats["failures"] += 1
+            error_message = f"Failed to render {width}px variant of {source_path}: {e}"
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, message=error_message)
+        finally:
+            if owner:
+                with self.__lock:
+                    self.__in_flight.pop(target_path, None)
+
+        if owner:
+            self.__stats["renders"] += 1
+            self.__account(target_path, written)
+        return sdict(True, data={"path": target_path, "etag": etag, "width": width, "cached": False},
+                     message="Variant rendered.")
+
+    def __account(self, rendered_path: str, written: int):
+        with self.__eviction_lock:
+            if self.__cache_bytes is None:
+                self.__cache_bytes = sum(entry[1] for entry in self.__scan())
+            else:
+                self.__cache_bytes += written
+            if self.__cache_bytes <= self.__max_cache_bytes:
+                return
+
+            # Remove the least recently served variants until the cache is 10% below its limit
+            target = int(self.__max_cache_bytes * 0.9)
+            for path, size, _ in sorted(self.__scan(), key=lambda entry: entry[2]):
+                if self.__cache_bytes <= target:
+                    break
+                if path == rendered_path:
+                    continue    # About to be served
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self.__cache_bytes -= size
+                self.__stats["evicted"] += 1
+
+    def __scan(self):
+        """Yields ``(path, size, mtime)`` of every cached variant."""
+        if not os.path.isdir(self.__cache_directory):
+            return
+        for shard in os.scandir(self.__cache_directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".jpg"):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns cache hit, render, failure and eviction counters."""
+        return dict(self.__stats, cache_bytes=self.__cache_bytes, sizes=self.get_sizes(),
+                    available=self.is_available())
+
+    def close(self):
+        """Shuts the render processes down."""
+        with self.__lock:
+            executor, self.__executor = self.__executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
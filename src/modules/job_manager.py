@@ -0,0 +1,147 @@
+import time
+import uuid
+import queue
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, List
+
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+
+
+class JobManager:
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+
+    def __init__(self, max_history: int = 1000):
+        """
+        Run camera operations as asynchronous jobs on a single worker thread.
+
+        Jobs execute one at a time in submission order, so two jobs never interleave their camera calls. Calls made
+        outside the queue (endpoints that talk to the camera directly) are not ordered against jobs.
+        Each job keeps its own result, and finished jobs are kept until ``max_history`` newer jobs exist.
+
+        :param max_history: Maximum number of jobs remembered.
+        """
+        self.__logger = Logger.get_logger("Job Manager")
+        self.__max_history = max_history
+
+        self.__jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.__functions: Dict[str, Callable[[], Dict]] = {}
+        self.__condition = threading.Condition()
+        self.__queue: "queue.Queue[str]" = queue.Queue()
+
+        self.__worker = threading.Thread(target=self.__run, name="job-worker", daemon=True)
+        self.__worker.start()
+
+    @staticmethod
+    def __public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(job)
+
+    def submit(self, kind: str, function: Callable[[], Dict], params: Optional[Dict[str, Any]] = None) -> Dict:
+        """
+        Queue a job.
+
+        :param kind: Job type, e.g. "capture".
+        :param function: Zero-argument callable returning a result dictionary.
+        :param params: Request parameters recorded with the job.
+        :return: The job record.
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "params": params or {},
+            "status": self.STATUS_QUEUED,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+        }
+        with self.__condition:
+            self.__jobs[job_id] = job
+            self.__functions[job_id] = function
+            self.__trim_history()
+            position = self.__queue.qsize()
+        self.__queue.put(job_id)
+        self.__logger.debug(f"Job {job_id} ({kind}) queued at position {position}")
+        return self.__public(job)
+
+    def __trim_history(self):
+        """Forget the oldest finished jobs beyond max_history. Must be called with the condition held."""
+        excess = len(self.__jobs) - self.__max_history
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self.__jobs.items()
+                       if job["status"] in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)][:excess]:
+            del self.__jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns a job record, or None if the job is unknown."""
+        with self.__condition:
+            job = self.__jobs.get(job_id)
+            return self.__public(job) if job else None
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Long-poll a job until it has finished or the timeout expires.
+
+        :param job_id: Job ID.
+        :param timeout: Maximum seconds to wait.
+        :return: The job record (finished or not), or None if the job is unknown.
+        """
+        deadline = time.monotonic() + timeout
+        with self.__condition:
+            while True:
+                job = self.__jobs.get(job_id)
+                if job is None:
+                    return None
+                remaining = deadline - time.monotonic()
+                if job["status"] in (self.STATUS_SUCCEEDED, self.STATUS_FAILED) or remaining <= 0:
+                    return self.__public(job)
+                self.__condition.wait(remaining)
+
+    def list_jobs(self, kind: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        List the most recent jobs, newest first.
+
+        :param kind: Only list jobs of this type.
+        :param status: Only list jobs with this status.
+        :param limit: Maximum number of jobs returned.
+        """
+        with self.__condition:
+            jobs = [job for job in reversed(self.__jobs.values())
+                    if (kind is None or job["kind"] == kind) and (status is None or job["status"] == status)]
+            return [self.__public(job) for job in jobs[:limit]]
+
+    def get_queue_length(self) -> int:
+        """Returns the number of jobs waiting to run."""
+        return self.__queue.qsize()
+
+    def __run(self):
+        while True:
+            job_id = self.__queue.get()
+            with self.__condition:
+                job = self.__jobs.get(job_id)
+                function = self.__functions.pop(job_id, None)
+                if job is None or function is None:
+                    continue
+                job["status"] = self.STATUS_RUNNING
+                job["started_at"] = time.time()
+
+            try:
+                result = function()
+            except Exception as e:
+                self.__logger.error(f"Job {job_id} ({job['kind']}) raised: {e}")
+                result = sdict(False, message=f"Unexpected error: {e}")
+
+            with self.__condition:
+                job["result"] = result
+                job["finished_at"] = time.time()
+                succeeded = isinstance(result, dict) and result.get("success")
+                job["status"] = self.STATUS_SUCCEEDED if succeeded else self.STATUS_FAILED
+                self.__trim_history()
+                self.__condition.notify_all()
+            self.__logger.debug(f"Job {job_id} ({job['kind']}) {job['status']}")
@@ -0,0 +1,363 @@
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable
+
+import yaml
+
+from src.modules.camera_manager import CameraManager
+from src.modules.config_handler import ConfigHandler
+from src.modules.capture_handler import CaptureHandler
+from src.modules.sequence_handler import SequenceHandler
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+
+STEP_TYPES = ("profile", "settings", "capture", "bracket", "sequence", "autofocus", "preview", "wait")
+# Steps that only write settings; consecutive ones are coalesced into one write
+SETTING_STEPS = ("profile", "settings")
+TIMING_KEYS = ("config_ms", "wait_ms", "capture_ms", "download_ms")
+
+DEFAULT_DIRECTORY = "./jobs/{job}_{date}_{time}"
+DEFAULT_NAME = "{job}_{step:02d}_{index:03d}{ext}"
+
+
+class JobRunner:
+    def __init__(self, camera_manager: CameraManager, config_handler: ConfigHandler, capture_handler: CaptureHandler,
+                 sequence_handler: SequenceHandler, focus_handler: Optional[Any] = None,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Runs declarative job files: camera selection, settings profiles, capture loops, brackets and output naming.
+
+        A job is a dictionary, usually loaded from YAML::
+
+            name: product
+            camera: {port: "usb:001,005"}            # or {name: "Canon EOS 80D"}; default: first camera
+            output: {directory: "./jobs/{job}_{date}", name: "{job}_{step:02d}_{index:03d}{ext}"}
+            download: interleaved                     # interleaved, deferred or none
+            restore: true                             # write the original settings back at the end
+            profiles:
+              studio: {iso: "100", aperture: "8"}
+            steps:
+              - profile: studio
+              - autofocus: {max_steps: 30}
+              - capture: {count: 10, interval: 2}
+              - bracket: {setting: shutterspeed, offsets: [-3, 0, 3]}
+
+        Capture loops, brackets and sequences run through SequenceHandler, so the download of each frame overlaps
+        the config write of the next one and files are written in the background. Consecutive profile and
+        settings steps are coalesced into a single config write.
+
+        :param camera_manager: CameraManager instance
+        :param config_handler: ConfigHandler instance
+        :param capture_handler: CaptureHandler instance
+        :param sequence_handler: SequenceHandler instance
+        :param focus_handler: Optional FocusHandler instance, required by autofocus steps.
+        :param progress: Optional callback receiving a dictionary per step start, captured frame and step end.
+        """
+        self.__camera_manager = camera_manager
+        self.__config_handler = config_handler
+        self.__capture_handler = capture_handler
+        self.__sequence_handler = sequence_handler
+        self.__focus_handler = focus_handler
+        self.__progress = progress
+        self.__logger = Logger.get_logger("Job Runner")
+
+    @staticmethod
+    def load_job(path: str) -> Dict:
+        """
+        Load a job file.
+
+        :param path: Path of a YAML (or JSON) job file.
+        :return: A dictionary with the job; its name defaults to the file name.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                job = yaml.safe_load(file)
+        except (OSError, yaml.YAMLError) as e:
+            return sdict(False, message=f"Failed to load job {path}: {e}")
+        if not isinstance(job, dict):
+            return sdict(False, message=f"Job {path} must be a mapping with a list of steps")
+        job.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+        return sdict(True, data=job, message=f"Job {job['name']} loaded.")
+
+    @staticmethod
+    def __step_type(step: Any) -> Optional[str]:
+        if not isinstance(step, dict):
+            return None
+        types = [key for key in step if key in STEP_TYPES]
+        return types[0] if len(types) == 1 else None
+
+    def validate(self, job: Dict[str, Any]) -> Dict:
+        """
+        Check the structure of a job without a camera: step types, profiles and parameters.
+
+        :param job: Job dictionary.
+        :return: A dictionary with ``success`` and, on failure, the offending step in the message.
+        """
+        steps = job.get("steps")
+        if not isinstance(steps, list) or not steps:
+            return sdict(False, message="A job needs a non-empty list of steps.")
+        if job.get("download", "interleaved") not in SequenceHandler.DOWNLOAD_MODES:
+            return sdict(False, message=f"Invalid download mode '{job.get('download')}', "
+                                        f"expected one of {SequenceHandler.DOWNLOAD_MODES}")
+        profiles = job.get("profiles") or {}
+        if not isinstance(profiles, dict) or not all(isinstance(value, dict) for value in profiles.values()):
+            return sdict(False, message="profiles must map profile names to settings")
+        output = job.get("output") or {}
+        if not isinstance(output, dict):
+            return sdict(False, message="output must be a mapping, e.g. {directory: ..., name: ...}")
+        error = self.__template_error(output.get("directory", DEFAULT_DIRECTORY), job, with_frame=False)
+        if error:
+            return sdict(False, message=f"output.directory: {error}")
+        error = self.__template_error(output.get("name") or DEFAULT_NAME, job)
+        if error:
+            return sdict(False, message=f"output.name: {error}")
+
+        for number, step in enumerate(steps, start=1):
+            step_type = self.__step_type(step)
+            if step_type is None:
+                return sdict(False, message=f"Step {number}: expected exactly one of {', '.join(STEP_TYPES)}")
+            value = step[step_type]
+            if step_type == "profile":
+                names = value if isinstance(value, list) else [value]
+                unknown = [name for name in names if name not in profiles]
+                if unknown:
+                    return sdict(False, message=f"Step {number}: unknown profile(s) {', '.join(map(str, unknown))}")
+            elif step_type == "settings" and not isinstance(value, dict):
+                return sdict(False, message=f"Step {number}: settings must be a mapping")
+            elif step_type == "capture" and not isinstance(value or {}, dict):
+                return sdict(False, message=f"Step {number}: capture must be a mapping, e.g. {{count: 3}}")
+            elif step_type == "bracket" and not (isinstance(value, dict) and value.get("setting")
+                                                 and isinstance(value.get("offsets"), list)):
+                return sdict(False, message=f"Step {number}: bracket needs a setting and a list of offsets")
+            elif step_type == "sequence":
+                sequence_steps = value.get("steps") if isinstance(value, dict) else value
+                if not isinstance(sequence_steps, list) or not all(isinstance(item, dict) for item in sequence_steps):
+                    return sdict(False, message=f"Step {number}: sequence needs a list of setting mappings")
+            elif step_type == "autofocus":
+                if self.__focus_handler is None:
+                    return sdict(False, message=f"Step {number}: autofocus is not available")
+                if not isinstance(value or {}, dict):
+                    return sdict(False, message=f"Step {number}: autofocus options must be a mapping")
+            elif step_type == "wait" and not (isinstance(value, (int, float)) and value >= 0):
+                return sdict(False, message=f"Step {number}: wait needs a number of seconds")
+            if isinstance(value, dict) and value.get("name"):
+                error = self.__template_error(value["name"], job)
+                if error:
+                    return sdict(False, message=f"Step {number}: name: {error}")
+        return sdict(True, message="Job is valid.")
+
+    @staticmethod
+    def __template_error(template: Any, job: Dict[str, Any], with_frame: bool = True) -> Optional[str]:
+        """
+        Format an output template with sample values of its fields.
+
+        :param template: Directory or file name template.
+        :param job: Job dictionary.
+        :param with_frame: Also allow the per-frame fields (step, label, index, name, stem, ext).
+        :return: The problem with the template, or None if it formats.
+        """
+        if not isinstance(template, str):
+            return "must be a string"
+        fields = {"job": job.get("name", "job"), "date": "20000101", "time": "000000"}
+        if with_frame:
+            fields.update(step=1, label="capture", index=0, name="IMG_0001.JPG", stem="IMG_0001", ext=".JPG")
+        try:
+            template.format(**fields)
+        except KeyError as e:
+            return f"unknown placeholder {{{e.args[0]}}}, available: {', '.join(sorted(fields))}"
+        except (IndexError, ValueError, AttributeError, TypeError) as e:
+            return f"invalid template: {e}"
+        return None
+
+    def __sequence_steps(self, step_type: str, value: Any) -> List[Dict[str, Any]]:
+        """Returns the SequenceHandler steps of a capture, bracket or sequence step."""
+        if step_type == "capture":
+            value = value or {}
+            return [dict(value.get("settings") or {}) for _ in range(int(value.get("count", 1)))]
+        if step_type == "bracket":
+            return SequenceHandler.build_bracket(value["setting"], value["offsets"])
+        return list(value.get("steps") if isinstance(value, dict) else value)
+
+    def __plan(self, job: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Coalesce consecutive setting steps into single writes."""
+        profiles = job.get("profiles") or {}
+        plan: List[Dict[str, Any]] = []
+        for number, step in enumerate(job["steps"], start=1):
+            step_type = self.__step_type(step)
+            value = step[step_type]
+            if step_type in SETTING_STEPS:
+                if step_type == "profile":
+                    names = value if isinstance(value, list) else [value]
+                    settings = {key: item for name in names for key, item in profiles[name].items()}
+                else:
+                    settings = dict(value)
+                if plan and plan[-1]["type"] == "settings":
+                    plan[-1]["settings"].update(settings)
+                    plan[-1]["steps"].append(number)
+                    continue
+                plan.append({"type": "settings", "steps": [number], "settings": settings,
+                             "label": step.get("label", step_type)})
+                continue
+            plan.append({"type": step_type, "steps": [number], "value": value, "label": step.get("label", step_type)})
+        return plan
+
+    def __notify(self, event: Dict[str, Any]):
+        if self.__progress is None:
+            return
+        try:
+            self.__progress(event)
+        except Exception as e:
+            self.__logger.error(f"[run] Progress callback failed: {e}")
+
+    def __check(self, plan: List[Dict[str, Any]]) -> Dict:
+        """Validate settings and sequences against the camera's choice lists without capturing."""
+        for entry in plan:
+            if entry["type"] == "settings":
+                checked = self.__config_handler.validate_settings(entry["settings"])
+            elif entry["type"] in ("capture", "bracket", "sequence"):
+                checked = self.__sequence_handler.prepare_sequence(self.__sequence_steps(entry["type"], entry["value"]))
+            else:
+                continue
+            if not checked["success"]:
+                return sdict(False, data=checked.get("data"),
+                             message=f"Step {entry['steps'][0]} ({entry['type']}): {checked['message']}")
+        return sdict(True, message="Job settings are valid.")
+
+    def __run_entry(self, entry: Dict[str, Any], job: Dict[str, Any], fields: Dict[str, Any],
+                    directory: str) -> Dict:
+        """Runs one planned step and returns its result."""
+        step_type, value = entry["type"], entry.get("value")
+        if step_type == "settings":
+            return self.__config_handler.write_settings(entry["settings"])
+        if step_type == "wait":
+            time.sleep(value)
+            return sdict(True, message=f"Waited {value} s.")
+        if step_type == "autofocus":
+            return self.__focus_handler.autofocus(**(value or {}))
+
+        options = value if isinstance(value, dict) else {}
+        step_fields = dict(fields, step=entry["steps"][0], label=entry["label"])
+        name_template = os.path.join(directory, options.get("name") or (job.get("output") or {}).get("name")
+                                     or DEFAULT_NAME)
+        if step_type == "preview":
+            save_path = SequenceHandler.format_save_path(name_template, 0, "preview.jpg", step_fields)
+            os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+            return self.__capture_handler.capture_preview(save_path=save_path)
+
+        return self.__sequence_handler.run_sequence(
+            self.__sequence_steps(step_type, value),
+            download=options.get("download", job.get("download", "interleaved")),
+            # Brackets and sequences return to their base values; capture loops keep the settings they applied
+            restore=options.get("restore", step_type != "capture"),
+            interval=float(options.get("interval", 0.0)),
+            name_template=name_template, name_fields=step_fields)
+
+    @staticmethod
+    def __summarize(entry: Dict[str, Any], result: Dict, elapsed_ms: float) -> Dict[str, Any]:
+        data = result.get("data") if isinstance(result.get("data"), dict) else {}
+        frames = data.get("frames") or []
+        timings = {key: round(sum(frame["timings"].get(key, 0) for frame in frames), 1) for key in TIMING_KEYS}
+        summary = {"step": entry["steps"][0], "steps": entry["steps"], "type": entry["type"],
+                   "label": entry["label"], "success": result["success"], "message": result.get("message"),
+                   "elapsed_ms": elapsed_ms, "frames": len(frames),
+                   "files": [frame["save_path"] for frame in frames if frame.get("save_path")]}
+        if frames:
+            summary["timings"] = timings
+        if entry["type"] == "preview" and data.get("save_path"):
+            summary["files"] = [data["save_path"]]
+        if entry["type"] == "autofocus":
+            summary["focus"] = {key: data.get(key) for key in ("peak", "score", "steps_used")}
+        return summary
+
+    def run(self, job: Dict[str, Any], dry_run: bool = False) -> Dict:
+        """
+        Connect the job's camera and run its steps in order, stopping at the first failure unless the job sets
+        ``continue_on_error``.
+
+        :param job: Job dictionary, e.g. from load_job.
+        :param dry_run: Only validate the job against the camera; nothing is captured or written.
+        :return: A dictionary with one summary per step, the files written and the timing totals.
+        """
+        method_name = "run"
+        validation = self.validate(job)
+        if not validation["success"]:
+            return validation
+
+        camera = job.get("camera") or {}
+        if camera or not self.__camera_manager.get_camera():
+            connected = self.__camera_manager.connect(camera_name=camera.get("name"), port=camera.get("port"))
+            if not connected["success"]:
+                return connected
+
+        plan = self.__plan(job)
+        checked = self.__check(plan)
+        if not checked["success"] or dry_run:
+            return checked
+
+        started_at = datetime.now()
+        fields = {"job": job["name"], "date": started_at.strftime("%Y%m%d"), "time": started_at.strftime("%H%M%S")}
+        directory = (job.get("output") or {}).get("directory", DEFAULT_DIRECTORY).format(**fields)
+
+        # Settings written by the job are read first, so that they can be restored afterwards
+        base_values = {}
+        if job.get("restore", False):
+            names = sorted({name for entry in plan for name in entry.get("settings", {})})
+            info = self.__config_handler.get_widget_info()
+            if info["success"]:
+                widgets = info["data"]["widgets"]
+                names = [name for name in names if not widgets[name]["path"].startswith("/main/actions/")]
+            if names:
+                current = self.__config_handler.read_settings(names)
+                if not current["success"]:
+                    return current
+                base_values = current["data"]["values"]
+
+        def on_event(event_type: str, data: Dict[str, Any]):
+            if event_type == "sequence":
+                self.__notify(dict(data, event="frame", step=running["step"], label=running["label"]))
+
+        running = {"step": None, "label": None}
+        self.__camera_manager.add_event_listener(on_event)
+        started = time.perf_counter()
+        summaries: List[Dict[str, Any]] = []
+        error_message: Optional[str] = None
+        try:
+            for entry in plan:
+                if error_message:
+                    summaries.append({"step": entry["steps"][0], "steps": entry["steps"], "type": entry["type"],
+                                      "label": entry["label"], "success": False, "skipped": True})
+                    continue
+                running.update(step=entry["steps"][0], label=entry["label"])
+                self.__notify({"event": "step_started", "step": entry["steps"][0], "steps": len(job["steps"]),
+                               "type": entry["type"], "label": entry["label"]})
+                entry_started = time.perf_counter()
+                try:
+                    result = self.__run_entry(entry, job, fields, directory)
+                except (KeyError, IndexError, ValueError, TypeError, OSError) as e:
+                    result = sdict(False, message=f"{type(e).__name__}: {e}")
+                summary = self.__summarize(entry, result, round((time.perf_counter() - entry_started) * 1000, 1))
+                summaries.append(summary)
+                self.__notify(dict(summary, event="step_finished"))
+                if not result["success"] and not job.get("continue_on_error", False):
+                    error_message = f"Step {entry['steps'][0]} ({entry['type']}) failed: {result.get('message')}"
+        finally:
+            self.__camera_manager.remove_event_listener(on_event)
+            if base_values:
+                restored = self.__config_handler.write_settings(base_values)
+                if not restored["success"]:
+                    self.__logger.warning(f"[{method_name}] Failed to restore settings: {restored['message']}")
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        frames = sum(summary.get("frames", 0) for summary in summaries)
+        timings = {key: round(sum(summary.get("timings", {}).get(key, 0) for summary in summaries), 1)
+                   for key in TIMING_KEYS}
+        data = {"job": job["name"], "directory": directory, "steps": summaries, "frames": frames,
+                "files": [path for summary in summaries for path in summary.get("files", [])],
+                "timings": timings, "total_ms": total_ms,
+                "frames_per_minute": round(frames * 60000 / total_ms, 1) if total_ms else None}
+        if error_message:
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, data=data, message=error_message)
+        self.__logger.info(f"[{method_name}] Job {job['name']} finished: {frames} frame(s) in {total_ms} ms")
+        return sdict(True, data=data, message=f"Job {job['name']} completed.")
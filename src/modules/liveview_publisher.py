@@ -0,0 +1,283 @@
+import os
+import time
+import atexit
+import struct
+import threading
+from multiprocessing import shared_memory, resource_tracker
+from typing import Optional, Dict, Any
+
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+
+# Shared memory layout
+#   header:      magic (u32) | slot count (u32) | slot size (u32) | owner pid (u32) | latest sequence (u64)
+#   slot header: sequence (u64) | length (u32) | reserved (u32)      -- one per slot, followed by the slot data
+# A slot's sequence is set to 0 while it is being written, so readers can detect torn frames.
+RING_MAGIC = 0x52435046  # "RCPF"
+HEADER_FORMAT = "<IIIIQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+SLOT_HEADER_FORMAT = "<QII"
+SLOT_HEADER_SIZE = struct.calcsize(SLOT_HEADER_FORMAT)
+LATEST_SEQUENCE_OFFSET = 16
+
+
+class Frame:
+    """A live-view frame read from the ring. ``data`` is a zero-copy view unless the frame was copied."""
+
+    def __init__(self, sequence: int, data, dropped: int, subscriber: Optional["FrameSubscriber"] = None,
+                 slot: int = 0):
+        self.sequence = sequence
+        self.data = data
+        self.dropped = dropped
+        self.__subscriber = subscriber
+        self.__slot = slot
+
+    def is_valid(self) -> bool:
+        """
+        Check that the publisher has not overwritten the frame since it was read.
+
+        Call this after processing a zero-copy frame; if it returns False, the result must be discarded.
+        """
+        if self.__subscriber is None:
+            return True
+        return self.__subscriber.get_slot_sequence(self.__slot) == self.sequence
+
+    def release(self):
+        """Releases the zero-copy view so that the subscriber can be closed."""
+        if isinstance(self.data, memoryview):
+            self.data.release()
+
+
+class FramePublisher:
+    def __init__(self, name: str = "rcp_liveview", slot_count: int = 4, slot_size: int = 4 * 1024 * 1024):
+        """
+        Publish preview frames into a shared memory ring that any number of local processes can read.
+
+        :param name: Name of the shared memory block.
+        :param slot_count: Number of frames kept in the ring.
+        :param slot_size: Maximum size of a single frame in bytes.
+        """
+        self.__logger = Logger.get_logger("Live View Publisher")
+        self.__name = name
+        self.__slot_count = slot_count
+        self.__slot_size = slot_size
+        self.__sequence = 0
+        self.__oversized = 0
+        self.__lock = threading.Lock()
+
+        size = HEADER_SIZE + slot_count * (SLOT_HEADER_SIZE + slot_size)
+        try:
+            self.__memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self.__remove_stale_block(name)
+            self.__memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.__closed = False
+
+        struct.pack_into(HEADER_FORMAT, self.__memory.buf, 0, RING_MAGIC, slot_count, slot_size, os.getpid(), 0)
+        for slot in range(slot_count):
+            struct.pack_into(SLOT_HEADER_FORMAT, self.__memory.buf, self.__slot_offset(slot), 0, 0, 0)
+
+        self.__capture_handler = None
+        self.__loop_thread: Optional[threading.Thread] = None
+        self.__running = False
+        self.__logger.info(f"Live view ring '{name}' created ({slot_count} x {slot_size} bytes)")
+        # Remove the block when the interpreter exits, so it is not leaked if the application never closes it
+        atexit.register(self.close)
+
+    def __remove_stale_block(self, name: str):
+        """
+        Unlink a block left behind by a publisher that did not shut down cleanly.
+
+        Only live view rings whose owner process is gone are removed; any other block is left alone.
+
+        :raises FileExistsError: If the block belongs to a running publisher or is not a live view ring.
+        """
+        existing = shared_memory.SharedMemory(name=name)
+        magic, owner = 0, 0
+        if existing.size >= HEADER_SIZE:
+            magic, _, _, owner, _ = struct.unpack_from(HEADER_FORMAT, existing.buf, 0)
+        existing.close()
+        if magic != RING_MAGIC:
+            resource_tracker.unregister(existing._name, "shared_memory")
+            raise FileExistsError(f"Shared memory block '{name}' exists and is not a live view ring")
+        if owner and self.__is_running(owner):
+            resource_tracker.unregister(existing._name, "shared_memory")
+            raise FileExistsError(f"Live view ring '{name}' is in use by process {owner}")
+        self.__logger.warning(f"Replacing stale live view ring '{name}' of process {owner}")
+        existing.unlink()
+
+    @staticmethod
+    def __is_running(pid: int) -> bool:
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def __slot_offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * (SLOT_HEADER_SIZE + self.__slot_size)
+
+    def publish(self, data: bytes) -> int:
+        """
+        Write a frame into the next slot of the ring.
+
+        :param data: JPEG bytes of the frame.
+        :return: The sequence number of the frame, or 0 if it was too large for a slot.
+        """
+        if len(data) > self.__slot_size:
+            self.__oversized += 1
+            self.__logger.warning(f"Frame of {len(data)} bytes exceeds the slot size of {self.__slot_size} bytes")
+            return 0
+
+        with self.__lock:
+            self.__sequence += 1
+            sequence = self.__sequence
+            offset = self.__slot_offset((sequence - 1) % self.__slot_count)
+            buffer = self.__memory.buf
+
+            struct.pack_into(SLOT_HEADER_FORMAT, buffer, offset, 0, 0, 0)
+            buffer[offset + SLOT_HEADER_SIZE:offset + SLOT_HEADER_SIZE + len(data)] = data
+            struct.pack_into(SLOT_HEADER_FORMAT, buffer, offset, sequence, len(data), 0)
+            struct.pack_into("<Q", buffer, LATEST_SEQUENCE_OFFSET, sequence)
+        return sequence
+
+    def attach(self, capture_handler):
+        """Publish every preview captured through a CaptureHandler, whoever requested it."""
+        self.__capture_handler = capture_handler
+        capture_handler.add_preview_listener(self.publish)
+
+    def start(self, capture_handler, interval: float = 0.0) -> Dict:
+        """
+        Continuously capture previews (without saving them) and publish them.
+
+        Do not combine with ``attach`` on the same handler, or each frame is published twice.
+
+        :param capture_handler: CaptureHandler (or worker proxy) used to grab previews.
+        :param interval: Minimum time between frames in seconds.
+        """
+        if self.__running:
+            return sdict(False, message="Live view publisher is already running.")
+        self.__running = True
+        self.__loop_thread = threading.Thread(target=self.__loop, args=(capture_handler, interval),
+                                              name="liveview-publisher", daemon=True)
+        self.__loop_thread.start()
+        return sdict(True, message="Live view publisher started.")
+
+    def stop(self) -> Dict:
+        """Stops the capture loop started with ``start``."""
+        self.__running = False
+        if self.__loop_thread:
+            self.__loop_thread.join(timeout=5)
+            self.__loop_thread = None
+        return sdict(True, message="Live view publisher stopped.")
+
+    def __loop(self, capture_handler, interval: float):
+        while self.__running:
+            started = time.monotonic()
+            result = capture_handler.capture_preview(save=False)
+            if result["success"]:
+                self.publish(result["data"]["frame"])
+            else:
+                time.sleep(0.5)
+            remaining = interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns the publisher's frame counters."""
+        return {"name": self.__name, "published": self.__sequence, "oversized": self.__oversized,
+                "running": self.__running}
+
+    def close(self):
+        """Stops publishing and removes the shared memory block."""
+        if self.__closed:
+            return
+        self.__closed = True
+        atexit.unregister(self.close)
+        self.stop()
+        if self.__capture_handler:
+            self.__capture_handler.remove_preview_listener(self.publish)
+            self.__capture_handler = None
+        self.__memory.close()
+        try:
+            self.__memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameSubscriber:
+    def __init__(self, name: str = "rcp_liveview"):
+        """
+        Read frames published by a FramePublisher, from any local process.
+
+        :param name: Name of the shared memory block.
+        """
+        self.__memory = shared_memory.SharedMemory(name=name)
+        # Only the publisher owns the block; stop this process's resource tracker from unlinking it on exit
+        resource_tracker.unregister(self.__memory._name, "shared_memory")
+        magic, self.__slot_count, self.__slot_size, _, _ = struct.unpack_from(HEADER_FORMAT, self.__memory.buf, 0)
+        if magic != RING_MAGIC:
+            self.__memory.close()
+            raise ValueError(f"Shared memory block '{name}' is not a live view ring")
+
+        self.__last_sequence = 0
+        self.__received = 0
+        self.__dropped = 0
+
+    def __slot_offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * (SLOT_HEADER_SIZE + self.__slot_size)
+
+    def get_slot_sequence(self, slot: int) -> int:
+        """Returns the sequence number currently held by a slot (0 while it is being written)."""
+        return struct.unpack_from("<Q", self.__memory.buf, self.__slot_offset(slot))[0]
+
+    def get_latest_sequence(self) -> int:
+        """Returns the sequence number of the newest published frame."""
+        return struct.unpack_from("<Q", self.__memory.buf, LATEST_SEQUENCE_OFFSET)[0]
+
+    def read_latest(self, copy: bool = False, timeout: Optional[float] = None) -> Optional[Frame]:
+        """
+        Read the newest frame that this subscriber has not seen yet.
+
+        :param copy: Return a bytes copy instead of a zero-copy view into shared memory.
+        :param timeout: Seconds to wait for a new frame. None returns immediately.
+        :return: The frame, or None if no new frame arrived in time.
+        """
+        deadline = time.monotonic() + (timeout or 0)
+        while True:
+            sequence = self.get_latest_sequence()
+            if sequence > self.__last_sequence:
+                slot = (sequence - 1) % self.__slot_count
+                offset = self.__slot_offset(slot)
+                slot_sequence, length, _ = struct.unpack_from(SLOT_HEADER_FORMAT, self.__memory.buf, offset)
+                if slot_sequence == sequence:
+                    view = self.__memory.buf[offset + SLOT_HEADER_SIZE:offset + SLOT_HEADER_SIZE + length]
+                    data = bytes(view) if copy else view
+                    if copy:
+                        view.release()
+                    if self.get_slot_sequence(slot) == sequence:
+                        dropped = max(0, sequence - self.__last_sequence - 1) if self.__last_sequence else 0
+                        self.__dropped += dropped
+                        self.__received += 1
+                        self.__last_sequence = sequence
+                        return Frame(sequence, data, dropped, None if copy else self, slot)
+                    if not copy:
+                        view.release()
+                # The slot was overwritten while reading; try the newest frame again
+                continue
+
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.002)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the number of frames received and dropped (skipped because the reader was too slow)."""
+        return {"received": self.__received, "dropped": self.__dropped, "last_sequence": self.__last_sequence}
+
+    def close(self):
+        """Detaches from the shared memory block. Release zero-copy frames first."""
+        self.__memory.close()
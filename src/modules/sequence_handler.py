@@ -0,0 +1,257 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from src.modules.camera_manager import CameraManager
+from src.modules.config_handler import ConfigHandler
+from src.modules.capture_handler import CaptureHandler
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+
+
+class SequenceHandler:
+    DOWNLOAD_MODES = ("interleaved", "deferred", "none")
+
+    def __init__(self, camera_manager: CameraManager, config_handler: ConfigHandler, capture_handler: CaptureHandler):
+        """
+        Initialize SequenceHandler, which runs exposure/focus bracketing sequences.
+
+        A sequence is a list of steps. Each step is a dictionary of setting changes applied before its frame:
+        an absolute value (``{"aperture": "8"}``), a choice-list offset relative to the value at the start of
+        the sequence (``{"shutterspeed": {"offset": -3}}``) or an action such as ``{"manualfocusdrive": "Near 2"}``.
+        All steps are validated against the cached choice lists before the first frame is taken.
+
+        :param camera_manager: CameraManager instance
+        :param config_handler: ConfigHandler instance
+        :param capture_handler: CaptureHandler instance
+        """
+        self.__camera_manager = camera_manager
+        self.__config_handler = config_handler
+        self.__capture_handler = capture_handler
+        self.__logger = Logger.get_logger("Sequence Handler")
+
+    @staticmethod
+    def build_bracket(setting_name: str, offsets: List[int]) -> List[Dict[str, Any]]:
+        """
+        Build the steps of a bracket that moves one setting through choice-list offsets.
+
+        For a 7-frame HDR bracket in 1 EV steps on a 1/3-stop body: ``build_bracket("shutterspeed", [-9, -6, -3, 0, 3, 6, 9])``.
+
+        :param setting_name: Setting to bracket, e.g. "shutterspeed", "aperture" or "iso".
+        :param offsets: Choice-list offsets relative to the current value, one per frame.
+        :return: List of sequence steps.
+        """
+        return [{setting_name: {"offset": offset}} for offset in offsets]
+
+    def prepare_sequence(self, steps: List[Dict[str, Any]]) -> Dict:
+        """
+        Resolve offsets to absolute values and validate every step without capturing anything.
+
+        :param steps: Sequence steps.
+        :return: A dictionary with the resolved writes per step, the base values and the action settings.
+        """
+        method_name = "prepare_sequence"
+        info = self.__config_handler.get_widget_info()
+        if not info["success"]:
+            return info
+        widgets = info["data"]["widgets"]
+
+        names = {name for step in steps for name in step}
+        unknown = [name for name in names if name not in widgets]
+        if unknown:
+            return sdict(False, message=f"Unknown settings in sequence: {', '.join(sorted(unknown))}")
+
+        # Action widgets (e.g. manualfocusdrive) trigger a movement and have no value to restore
+        actions = {name for name in names if widgets[name]["path"].startswith("/main/actions/")}
+        persistent = sorted(names - actions)
+
+        base_values = {}
+        if persistent:
+            current = self.__config_handler.read_settings(persistent)
+            if not current["success"]:
+                return current
+            base_values = current["data"]["values"]
+
+        resolved = []
+        for index, step in enumerate(steps):
+            writes = {}
+            for name, value in step.items():
+                if isinstance(value, dict) and "offset" in value:
+                    choices = widgets[name].get("choices")
+                    if not choices or str(base_values.get(name)) not in choices:
+                        return sdict(False, message=f"Step {index}: {name} does not support offsets from its current value")
+                    position = choices.index(str(base_values[name])) + int(value["offset"])
+                    if not 0 <= position < len(choices):
+                        return sdict(False, message=f"Step {index}: {name} offset {value['offset']} is out of range")
+                    value = choices[position]
+                writes[name] = value
+
+            validation = self.__config_handler.validate_settings(writes)
+            if not validation["success"]:
+                return sdict(False, data=validation["data"], message=f"Step {index}: {validation['message']}")
+            resolved.append(writes)
+
+        self.__logger.debug(f"[{method_name}] Prepared {len(resolved)} step(s)")
+        return sdict(True, data={"steps": resolved, "base_values": base_values, "actions": sorted(actions)},
+                     message="Sequence is valid.")
+
+    @staticmethod
+    def format_save_path(name_template: str, index: int, camera_name: str,
+                         fields: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Build the local path of a sequence frame from a template.
+
+        Besides ``fields``, the template can use ``{index}`` (frame index in the sequence), ``{name}`` (file name
+        on the camera), ``{stem}`` and ``{ext}`` (its base name and extension, e.g. ".JPG"),
+        e.g. ``"./shots/{job}_{index:03d}{ext}"``.
+
+        :param name_template: Path template.
+        :param index: Frame index in the sequence.
+        :param camera_name: Name of the file on the camera.
+        :param fields: Additional template fields.
+        :return: Local save path.
+        """
+        stem, ext = os.path.splitext(camera_name)
+        return name_template.format(**dict(fields or {}, index=index, name=camera_name, stem=stem, ext=ext))
+
+    def run_sequence(self, steps: List[Dict[str, Any]], download: str = "interleaved", restore: bool = True,
+                     interval: float = 0.0, name_template: Optional[str] = None,
+                     name_fields: Optional[Dict[str, Any]] = None) -> Dict:
+        """
+        Run a bracketing sequence: apply each step's settings, then capture a frame.
+
+        With ``download="interleaved"`` the previous frame is transferred right after the next step's config
+        write, so the camera settles the new settings (and finishes writing the last frame to its card) while
+        the USB link is busy with the download. Files are stored by a background writer so disk I/O and
+        hashing never block the camera. ``"deferred"`` captures all frames first and downloads at the end,
+        ``"none"`` leaves the frames on the card. With an ``interval`` the interleaved download and the config
+        write of the next step run while waiting for the next frame's start time.
+
+        A "sequence" event is published after every frame, so that callers can report progress.
+
+        :param steps: Sequence steps.
+        :param download: One of "interleaved", "deferred" or "none".
+        :param restore: Restore the settings changed by the sequence afterwards.
+        :param interval: Minimum seconds between the starts of consecutive captures (time-lapse). 0 captures
+                         as fast as the camera allows.
+        :param name_template: Optional local path template of the frames, see format_save_path. Without it the
+                              capture store names the files.
+        :param name_fields: Additional fields of the path template.
+        :return: A dictionary with per-frame results and timings.
+        """
+        method_name = "run_sequence"
+        if download not in self.DOWNLOAD_MODES:
+            return sdict(False, message=f"Invalid download mode '{download}', expected one of {self.DOWNLOAD_MODES}")
+        if not self.__camera_manager.get_camera():
+            self.__logger.error(f"[{method_name}] No connected camera available")
+            return sdict(False, message="No connected camera available.")
+
+        started = time.perf_counter()
+        prepared = self.prepare_sequence(steps)
+        if not prepared["success"]:
+            self.__logger.error(f"[{method_name}] {prepared['message']}")
+            return prepared
+        base_values = prepared["data"]["base_values"]
+        actions = set(prepared["data"]["actions"])
+
+        frames: List[Dict[str, Any]] = []
+        pending: List[Dict[str, Any]] = []   # Captured frames still waiting for download
+        current_settings = dict(base_values)
+        error_message: Optional[str] = None
+
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sequence-writer")
+        storing = []
+
+        def download_frame(frame: Dict[str, Any]):
+            transfer_started = time.perf_counter()
+            fetched = self.__capture_handler.fetch_file(frame["folder"], frame["name"])
+            frame["timings"]["download_ms"] = round((time.perf_counter() - transfer_started) * 1000, 1)
+            if not fetched["success"]:
+                frame["error"] = fetched["message"]
+                return
+            save_path = None
+            if name_template:
+                try:
+                    save_path = self.format_save_path(name_template, frame["index"], frame["name"], name_fields)
+                    os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+                except (KeyError, IndexError, ValueError, OSError) as e:
+                    frame["error"] = f"Invalid save path from template '{name_template}': {e}"
+                    return
+            storing.append((frame, writer.submit(self.__capture_handler.store_file, fetched["data"]["file"],
+                                                 frame["folder"], frame["name"], save_path=save_path,
+                                                 settings=frame["settings"])))
+
+        try:
+            for index, writes in enumerate(prepared["data"]["steps"]):
+                timings = {}
+                if writes:
+                    config_started = time.perf_counter()
+                    written = self.__config_handler.write_settings(writes, reuse_tree=True)
+                    timings["config_ms"] = round((time.perf_counter() - config_started) * 1000, 1)
+                    if not written["success"]:
+                        error_message = f"Step {index}: {written['message']}"
+                        break
+                    current_settings.update({name: value for name, value in writes.items() if name not in actions})
+
+                if download == "interleaved" and pending:
+                    download_frame(pending.pop())
+
+                if interval and frames:
+                    wait = interval - (time.perf_counter() - frames[-1]["started"])
+                    if wait > 0:
+                        timings["wait_ms"] = round(wait * 1000, 1)
+                        time.sleep(wait)
+
+                capture_started = time.perf_counter()
+                captured = self.__capture_handler.capture_image(download=False)
+                timings["capture_ms"] = round((time.perf_counter() - capture_started) * 1000, 1)
+                if not captured["success"]:
+                    error_message = f"Step {index}: {captured['message']}"
+                    break
+
+                folder, _, name = captured["data"]["camera_path"].rpartition('/')
+                frame = {"index": index, "settings": dict(current_settings, **writes), "folder": folder, "name": name,
+                         "camera_path": captured["data"]["camera_path"], "timings": timings, "started": capture_started}
+                frames.append(frame)
+                if download != "none":
+                    pending.append(frame)
+                self.__camera_manager.publish_event("sequence", {"frame": index,
+                                                                 "frames": len(prepared["data"]["steps"]),
+                                                                 "camera_path": frame["camera_path"],
+                                                                 "timings": dict(timings)})
+
+            for frame in pending:
+                download_frame(frame)
+        finally:
+            self.__config_handler.release_tree()
+            if restore and base_values:
+                restored = self.__config_handler.write_settings(base_values)
+                if not restored["success"]:
+                    self.__logger.warning(f"[{method_name}] Failed to restore settings: {restored['message']}")
+
+            for frame, future in storing:
+                stored = future.result()
+                if stored["success"]:
+                    frame.update(save_path=stored["data"]["save_path"], capture_id=stored["data"]["capture_id"])
+                else:
+                    frame["error"] = stored["message"]
+            writer.shutdown(wait=True)
+
+        for frame in frames:
+            # Stored frames may still be queued for the storage writer
+            if frame.get("save_path") and not self.__capture_handler.wait_for_file(frame["save_path"]):
+                frame["error"] = f"Image could not be written to {frame['save_path']}."
+            del frame["folder"], frame["name"], frame["started"]
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        data = {"frames": frames, "total_ms": total_ms, "download": download}
+        if error_message:
+            self.__logger.error(f"[{method_name}] {error_message}")
+            return sdict(False, data=data, message=error_message)
+
+        failed = [frame["index"] for frame in frames if "error" in frame]
+        if failed:
+            return sdict(False, data=data, message=f"Frames {failed} could not be downloaded.")
+        self.__logger.info(f"[{method_name}] Sequence of {len(frames)} frame(s) finished in {total_ms} ms")
+        return sdict(True, data=data, message=f"Sequence of {len(frames)} frame(s) completed.")
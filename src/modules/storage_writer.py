@@ -0,0 +1,369 @@
+import os
+import time
+import errno
+import queue
+import atexit
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, List
+
+from src.modules.capture_store import CaptureStore
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+
+MB = 1024 * 1024
+# Failed writes remembered for wait_for
+MAX_FAILED_PATHS = 1024
+
+
+class StorageWriter:
+    def __init__(self, write_behind: bool = True, batch_size: int = 16, flush_interval: float = 0.2,
+                 fsync: bool = True, max_pending_mb: float = 256, min_free_mb: float = 500,
+                 sweep_interval: float = 60.0):
+        """
+        Writes captured files to disk off the capture thread and keeps the save directories within their limits.
+
+        Files are queued and written by a background thread in batches of up to ``batch_size``; each file is
+        fsynced and every touched directory is fsynced once per batch. Files are rejected with ENOSPC before
+        anything is queued when the free space of their file system would drop below ``min_free_mb``.
+        Directories registered with a byte quota or a maximum age are trimmed by evicting their least recently
+        used captures (see ``CaptureStore.least_recently_used``) after each batch and every ``sweep_interval``.
+
+        :param write_behind: Queue writes for the background thread. If False, ``submit`` writes synchronously.
+        :param batch_size: Maximum number of files written per batch.
+        :param flush_interval: Seconds the writer waits to fill a batch.
+        :param fsync: Flush each file and its directory to stable storage.
+        :param max_pending_mb: ``submit`` blocks while more than this many bytes are waiting to be written.
+        :param min_free_mb: Free space that must remain on the file system after a write.
+        :param sweep_interval: Seconds between age-based retention sweeps.
+        """
+        self.__logger = Logger.get_logger("Storage Writer")
+        self.__write_behind = write_behind
+        self.__batch_size = max(1, batch_size)
+        self.__flush_interval = flush_interval
+        self.__fsync = fsync
+        self.__max_pending_bytes = int(max_pending_mb * MB)
+        self.__min_free_bytes = int(min_free_mb * MB)
+        self.__sweep_interval = sweep_interval
+
+        self.__queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self.__condition = threading.Condition()
+        self.__pending: Dict[str, int] = {}       # path -> size of files queued but not yet written
+        self.__pending_bytes = 0
+        self.__failed: "OrderedDict[str, str]" = OrderedDict()   # path -> error of the last failed write
+        self.__closed = False
+
+        self.__directories_lock = threading.Lock()
+        self.__retention_lock = threading.Lock()     # One eviction pass at a time (writer thread and register)
+        self.__directories: Dict[str, Dict[str, Any]] = {}
+
+        self.__stats = {"written": 0, "bytes_written": 0, "batches": 0, "failed": 0, "rejected": 0,
+                        "evicted": 0, "bytes_evicted": 0}
+        self.__last_sweep = time.monotonic()
+        self.__thread: Optional[threading.Thread] = None
+        if write_behind:
+            self.__thread = threading.Thread(target=self.__run, name="storage-writer", daemon=True)
+            self.__thread.start()
+            # Queued files must reach the disk before the interpreter exits
+            atexit.register(self.close)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "StorageWriter":
+        """
+        Create a writer from the ``storage`` section of config.yaml.
+
+        :param config: Full configuration dictionary.
+        """
+        settings = config.get('storage', {}) or {}
+        return cls(write_behind=settings.get('write_behind', True), batch_size=settings.get('batch_size', 16),
+                   flush_interval=settings.get('flush_interval', 0.2), fsync=settings.get('fsync', True),
+                   max_pending_mb=settings.get('max_pending_mb', 256), min_free_mb=settings.get('min_free_mb', 500),
+                   sweep_interval=settings.get('sweep_interval', 60))
+
+    def register(self, directory: str, store: CaptureStore, quota_mb: float = 0, max_age_hours: float = 0):
+        """
+        Put a save directory under retention.
+
+        :param directory: Root directory of the store.
+        :param store: Store indexing the files of the directory; evicted files are removed from it.
+        :param quota_mb: Maximum size of the directory's captures. 0 disables the quota.
+        :param max_age_hours: Captures older than this are evicted. 0 keeps them forever.
+        """
+        directory = os.path.abspath(directory)
+        used = store.total_size(under=directory)
+        with self.__directories_lock:
+            self.__directories[directory] = {"store": store, "quota": int(quota_mb * MB),
+                                             "max_age": max_age_hours * 3600, "used": used}
+        self.__logger.debug(f"Managing {directory} ({used / MB:.1f} MB used, quota {quota_mb or 'none'} MB)")
+        self.__enforce(directory)
+
+    def unregister(self, directory: str):
+        """
+        Take a save directory out of retention, e.g. before its store is closed.
+
+        :param directory: Directory passed to register.
+        """
+        with self.__retention_lock, self.__directories_lock:
+            self.__directories.pop(os.path.abspath(directory), None)
+
+    def is_write_behind(self) -> bool:
+        """Returns True if files are written by the background thread, False if submit writes them itself."""
+        return self.__write_behind and not self.__closed
+
+    def __directory_of(self, path: str) -> Optional[str]:
+        path = os.path.abspath(path)
+        with self.__directories_lock:
+            matches = [directory for directory in self.__directories
+                       if path == directory or path.startswith(directory + os.sep)]
+        return max(matches, key=len) if matches else None
+
+    def check_space(self, directory: str, size: int = 0) -> Dict:
+        """
+        Check that a file of ``size`` bytes can be written to ``directory`` without going below the free space limit.
+
+        :param directory: Target directory (or any path on the same file system).
+        :param size: Bytes about to be written.
+        :return: A dictionary with the free and required bytes.
+        """
+        try:
+            free = shutil.disk_usage(directory).free
+        except OSError:
+            # The directory may not exist yet; its parent is on the same file system
+            free = shutil.disk_usage(os.path.dirname(os.path.abspath(directory)) or ".").free
+        with self.__condition:
+            available = free - self.__pending_bytes
+        required = self.__min_free_bytes + size
+        data = {"free_bytes": available, "required_bytes": required}
+        if available < required:
+            return sdict(False, data=data, message=f"Not enough disk space for {directory}: {available / MB:.1f} MB "
+                                                   f"free, {required / MB:.1f} MB required.")
+        return sdict(True, data=data, message="Enough disk space.")
+
+    def submit(self, path: str, data: bytes, callback: Optional[Callable[[str, Optional[Exception]], None]] = None):
+        """
+        Queue a file for writing.
+
+        :param path: Destination path.
+        :param data: File contents.
+        :param callback: Called as ``callback(path, error)`` once the file is written (error is None) or has failed.
+        :raises OSError: ENOSPC if the file system is below the free space limit, and any write error when the
+                         writer is synchronous (``write_behind`` off, or after close).
+        """
+        space = self.check_space(os.path.dirname(path) or ".", len(data))
+        if not space["success"]:
+            self.__stats["rejected"] += 1
+            raise OSError(errno.ENOSPC, space["message"])
+
+        if self.__write_behind:
+            with self.__condition:
+                # Back-pressure: do not let unwritten files pile up in memory without bound
+                while self.__pending_bytes and self.__pending_bytes + len(data) > self.__max_pending_bytes:
+                    self.__condition.wait()
+                if not self.__closed:
+                    self.__pending[path] = len(data)
+                    self.__pending_bytes += len(data)
+                    self.__queue.put({"path": path, "data": data, "callback": callback})
+                    return
+
+        error = self.__write_batch([{"path": path, "data": data, "callback": callback}])[0]
+        if error is not None:
+            raise error
+
+    def is_pending(self, path: str) -> bool:
+        """Returns True while a file is queued but not yet written."""
+        with self.__condition:
+            return path in self.__pending
+
+    def wait_for(self, path: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a queued file (or every queued file) has been written.
+
+        :param path: File to wait for. None waits for all pending files.
+        :param timeout: Maximum seconds to wait.
+        :return: True if nothing is pending anymore and, for a single file, its last write did not fail.
+        """
+        with self.__condition:
+            if path is None:
+                return self.__condition.wait_for(lambda: not self.__pending, timeout)
+            return self.__condition.wait_for(lambda: path not in self.__pending, timeout) \
+                and path not in self.__failed
+
+    def get_error(self, path: str) -> Optional[str]:
+        """Returns the error of the last write of a file if it failed, None otherwise."""
+        with self.__condition:
+            return self.__failed.get(path)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every queued file has been written."""
+        return self.wait_for(None, timeout)
+
+    def close(self):
+        """Writes the queued files and stops the writer thread. Files submitted afterwards are written synchronously."""
+        with self.__condition:
+            # Under the condition, so no file is queued behind the stop marker
+            self.__closed = True
+            if self.__thread and self.__thread.is_alive():
+                self.__queue.put(None)
+        if self.__thread and self.__thread.is_alive():
+            self.__thread.join(timeout=30)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns write, rejection and eviction counters and the usage of each managed directory."""
+        with self.__directories_lock:
+            directories = {directory: {"used_bytes": entry["used"], "quota_bytes": entry["quota"],
+                                       "max_age_hours": entry["max_age"] / 3600}
+                           for directory, entry in self.__directories.items()}
+        with self.__condition:
+            pending = {"pending_files": len(self.__pending), "pending_bytes": self.__pending_bytes}
+        return dict(self.__stats, **pending, directories=directories)
+
+    def __run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self.__queue.get(timeout=self.__sweep_interval)
+            except queue.Empty:
+                self.__sweep()
+                continue
+
+            batch = []
+            deadline = time.monotonic() + self.__flush_interval
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.__batch_size:
+                    break
+                try:
+                    item = self.__queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            stopping = item is None
+
+            self.__write_batch(batch)
+            if time.monotonic() - self.__last_sweep >= self.__sweep_interval:
+                self.__sweep()
+
+    def __write_batch(self, batch: List[Dict[str, Any]]) -> List[Optional[OSError]]:
+        """Writes a batch and returns the error of each file (None if it was written)."""
+        results = []
+        directories = set()
+        for item in batch:
+            path, data = item["path"], item["data"]
+            try:
+                with open(path, 'wb') as file:
+                    file.write(data)
+                    if self.__fsync:
+                        file.flush()
+                        os.fsync(file.fileno())
+                directories.add(os.path.dirname(os.path.abspath(path)))
+                results.append((item, None))
+            except OSError as e:
+                self.__logger.error(f"[write] Failed to write {path}: {e}")
+                results.append((item, e))
+
+        if self.__fsync:
+            # New directory entries are only durable once their directory is synced
+            for directory in directories:
+                try:
+                    descriptor = os.open(directory, os.O_RDONLY)
+                    try:
+                        os.fsync(descriptor)
+                    finally:
+                        os.close(descriptor)
+                except OSError:
+                    pass
+
+        touched = set()
+        for item, error in results:
+            size = len(item["data"])
+            if error is None:
+                self.__stats["written"] += 1
+                self.__stats["bytes_written"] += size
+                directory = self.__directory_of(item["path"])
+                if directory:
+                    with self.__directories_lock:
+                        self.__directories[directory]["used"] += size
+                    touched.add(directory)
+            else:
+                self.__stats["failed"] += 1
+            with self.__condition:
+                if self.__pending.pop(item["path"], None) is not None:
+                    self.__pending_bytes -= size
+                self.__failed.pop(item["path"], None)
+                if error is not None:
+                    self.__failed[item["path"]] = str(error)
+                    while len(self.__failed) > MAX_FAILED_PATHS:
+                        self.__failed.popitem(last=False)
+                self.__condition.notify_all()
+            if item["callback"]:
+                try:
+                    item["callback"](item["path"], error)
+                except Exception as e:
+                    self.__logger.error(f"[write] Callback failed for {item['path']}: {e}")
+        self.__stats["batches"] += 1
+
+        for directory in touched:
+            self.__enforce(directory)
+        return [error for _, error in results]
+
+    def __sweep(self):
+        self.__last_sweep = time.monotonic()
+        with self.__directories_lock:
+            directories = list(self.__directories)
+        for directory in directories:
+            self.__enforce(directory)
+
+    def __enforce(self, directory: str):
+        """Evicts least recently used captures of a directory until it is within its quota and age limit."""
+        with self.__directories_lock:
+            entry = self.__directories.get(directory)
+        if entry is None or not (entry["quota"] or entry["max_age"]):
+            return
+
+        with self.__retention_lock:
+            self.__trim(directory, entry)
+
+    def __trim(self, directory: str, entry: Dict[str, Any]):
+        store = entry["store"]
+
+        def evict_from(before: Optional[float], over_quota: bool):
+            """One pass over the eviction order. Files saved outside the directory are never touched."""
+            skipped = 0
+            while True:
+                records = store.least_recently_used(limit=100, before=before, offset=skipped)
+                if not records:
+                    return
+                for record in records:
+                    if self.__directory_of(record["path"]) != directory or not self.__evict(entry, record):
+                        skipped += 1
+                    elif over_quota and entry["used"] <= entry["quota"]:
+                        return
+
+        try:
+            if entry["max_age"]:
+                evict_from(time.time() - entry["max_age"], over_quota=False)
+            if entry["quota"] and entry["used"] > entry["quota"]:
+                evict_from(None, over_quota=True)
+        except Exception as e:
+            # A closed or replaced store (config reload) is not an error worth stopping the writer for
+            self.__logger.error(f"[evict] Retention of {directory} failed: {e}")
+
+    def __evict(self, entry: Dict[str, Any], record: Dict[str, Any]) -> bool:
+        if self.is_pending(record["path"]):
+            # Not on disk yet; never evict a file before it has been written
+            return False
+        try:
+            os.remove(record["path"])
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.__logger.error(f"[evict] Failed to delete {record['path']}: {e}")
+            return False
+        if not entry["store"].remove(record["path"]):
+            return False
+        with self.__directories_lock:
+            entry["used"] -= record["size"]
+        self.__stats["evicted"] += 1
+        self.__stats["bytes_evicted"] += record["size"]
+        self.__logger.debug(f"[evict] Removed {record['path']} ({record['size']} bytes)")
+        return True
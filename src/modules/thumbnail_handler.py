@@ -0,0 +1,200 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+from src.modules.camera_manager import CameraManager
+from src.utils.rcp_logger import Logger
+from src.utils.utils import *
+from src.utils.gphoto_errors import GPhotoErrorInterpreter
+from src.utils.lazy_import import lazy_import
+
+gp = lazy_import("gphoto2")
+
+
+class ThumbnailHandler:
+    def __init__(self, camera_manager: CameraManager):
+        """
+        Initialize ThumbnailHandler, which serves the camera's embedded previews (GP_FILE_TYPE_PREVIEW).
+
+        Thumbnails are kept in a size-bounded LRU memory cache and, if ``capture.thumbnail_directory`` is
+        configured, in an on-disk cache keyed by camera, path, size and mtime. The disk cache is bounded by
+        ``capture.thumbnail_disk_mb`` and evicts the least recently used files; its directory is created on the
+        first write.
+
+        :param camera_manager: CameraManager instance
+        """
+        self.__camera_manager = camera_manager
+        self.__logger = Logger.get_logger("Thumbnail Handler")
+
+        capture_config = camera_manager.get_config().get('capture', {})
+        self.__max_cache_bytes = int(capture_config.get('thumbnail_cache_mb', 64) * 1024 * 1024)
+        self.__disk_directory = capture_config.get('thumbnail_directory')
+        self.__max_disk_bytes = int(capture_config.get('thumbnail_disk_mb', 256) * 1024 * 1024)
+
+        self.__lock = threading.Lock()
+        self.__cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self.__cache_bytes = 0
+
+        # Files of the disk cache in LRU order, indexed from the directory on first use
+        self.__disk_lock = threading.Lock()
+        self.__disk_files: Optional["OrderedDict[str, int]"] = None
+        self.__disk_bytes = 0
+        self.__stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self.__camera_manager.add_event_listener(self.__on_camera_event)
+
+    def __on_camera_event(self, event_type: str, data: Dict[str, Any]):
+        # A different body or card may be attached after a reconnect
+        if event_type in ("connected", "disconnected"):
+            self.clear_cache()
+
+    def __cache_get(self, key: str) -> Optional[bytes]:
+        with self.__lock:
+            data = self.__cache.get(key)
+            if data is not None:
+                self.__cache.move_to_end(key)
+            return data
+
+    def __cache_put(self, key: str, data: bytes):
+        if len(data) > self.__max_cache_bytes:
+            return
+        with self.__lock:
+            previous = self.__cache.pop(key, None)
+            if previous is not None:
+                self.__cache_bytes -= len(previous)
+            self.__cache[key] = data
+            self.__cache_bytes += len(data)
+            while self.__cache_bytes > self.__max_cache_bytes:
+                _, evicted = self.__cache.popitem(last=False)
+                self.__cache_bytes -= len(evicted)
+
+    def __disk_path(self, camera_name: str, path: str, size: int, mtime: int) -> str:
+        digest = hashlib.sha1(f"{camera_name}|{path}|{size}|{mtime}".encode()).hexdigest()
+        return os.path.join(self.__disk_directory, digest[:2], f"{digest}.jpg")
+
+    def __load_disk_index(self):
+        """Indexes the files already in the disk cache, oldest access first. Caller holds the disk lock."""
+        if self.__disk_files is not None:
+            return
+        entries = []
+        for directory, _, names in os.walk(self.__disk_directory):
+            for name in names:
+                file_path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, file_path, stat.st_size))
+        self.__disk_files = OrderedDict((file_path, size) for _, file_path, size in sorted(entries))
+        self.__disk_bytes = sum(self.__disk_files.values())
+
+    def __disk_touch(self, disk_path: str):
+        """Marks a disk cache file as recently used, also across restarts through its mtime."""
+        with self.__disk_lock:
+            self.__load_disk_index()
+            if disk_path in self.__disk_files:
+                self.__disk_files.move_to_end(disk_path)
+        try:
+            os.utime(disk_path)
+        except OSError:
+            pass
+
+    def __disk_put(self, disk_path: str, data: bytes):
+        """Writes a thumbnail to the disk cache and evicts the least recently used files above the bound."""
+        if len(data) > self.__max_disk_bytes:
+            return
+        os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+        with open(disk_path, 'wb') as file:
+            file.write(data)
+        with self.__disk_lock:
+            self.__load_disk_index()
+            self.__disk_bytes -= self.__disk_files.pop(disk_path, 0)
+            self.__disk_files[disk_path] = len(data)
+            self.__disk_bytes += len(data)
+            while self.__disk_bytes > self.__max_disk_bytes:
+                evicted, size = self.__disk_files.popitem(last=False)
+                self.__disk_bytes -= size
+                try:
+                    os.remove(evicted)
+                except OSError as e:
+                    self.__logger.warning(f"Failed to evict {evicted} from the thumbnail disk cache: {e}")
+
+    def clear_cache(self):
+        """Empties the in-memory thumbnail cache."""
+        with self.__lock:
+            self.__cache.clear()
+            self.__cache_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns cache hit/miss counters and the current memory and disk cache sizes."""
+        with self.__disk_lock:
+            disk_items = len(self.__disk_files) if self.__disk_files is not None else None
+            disk_bytes = self.__disk_bytes if self.__disk_files is not None else None
+        with self.__lock:
+            return dict(self.__stats, cached_items=len(self.__cache), cached_bytes=self.__cache_bytes,
+                        disk_items=disk_items, disk_bytes=disk_bytes)
+
+    def get_thumbnail(self, folder: str, name: str) -> Dict:
+        """
+        Get the embedded preview of a file on the camera.
+
+        :param folder: Folder of the file on the camera.
+        :param name: Name of the file on the camera.
+        :return: A dictionary with the thumbnail bytes under ``data["thumbnail"]`` and where it came from.
+        """
+        method_name = "get_thumbnail"
+        camera = self.__camera_manager.get_camera()
+        if not camera:
+            self.__logger.error(f"[{method_name}] No connected camera available")
+            return sdict(False, message="No connected camera available.")
+
+        camera_name = (self.__camera_manager.get_connected_camera_info() or {}).get("name", "")
+        path = f"{folder.rstrip('/')}/{name}"
+        key = f"{camera_name}|{path}"
+
+        data = self.__cache_get(key)
+        if data is not None:
+            with self.__lock:
+                self.__stats["memory_hits"] += 1
+            return sdict(True, data={"thumbnail": data, "source": "memory"}, message="Thumbnail retrieved.")
+
+        try:
+            disk_path = None
+            if self.__disk_directory:
+                info = camera.file_get_info(folder, name)
+                disk_path = self.__disk_path(camera_name, path, info.file.size, info.file.mtime)
+                if os.path.exists(disk_path):
+                    with open(disk_path, 'rb') as file:
+                        data = file.read()
+                    self.__disk_touch(disk_path)
+                    self.__cache_put(key, data)
+                    with self.__lock:
+                        self.__stats["disk_hits"] += 1
+                    return sdict(True, data={"thumbnail": data, "source": "disk"}, message="Thumbnail retrieved.")
+
+            camera_file = gp.CameraFile()
+            camera.file_get(folder, name, gp.GP_FILE_TYPE_PREVIEW, camera_file)
+            data = memoryview(camera_file.get_data_and_size()).tobytes()
+
+        except gp.GPhoto2Error as e:
+            error_message = GPhotoErrorInterpreter.interpret_error(e)
+            self.__logger.error(f"[{method_name}] Failed to get thumbnail for {path}: {error_message}")
+            return sdict(False, message=error_message)
+        except OSError as e:
+            self.__logger.error(f"[{method_name}] Failed to read cached thumbnail for {path}: {e}")
+            return sdict(False, message=f"Thumbnail cache error: {e}")
+
+        self.__cache_put(key, data)
+        with self.__lock:
+            self.__stats["misses"] += 1
+
+        if disk_path:
+            try:
+                self.__disk_put(disk_path, data)
+            except OSError as e:
+                self.__logger.warning(f"[{method_name}] Failed to write thumbnail to disk cache: {e}")
+
+        self.__logger.debug(f"[{method_name}] Thumbnail for {path} fetched from camera ({len(data)} bytes)")
+        return sdict(True, data={"thumbnail": data, "source": "camera"}, message="Thumbnail retrieved.")
@@ -0,0 +1,293 @@
+import os
+import copy
+import threading
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+import yaml
+
+from src.utils.utils import *
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                   'config.yaml')
+
+NUMBER = (int, float)
+
+# Expected types of the known keys of each section. Unknown sections and keys are accepted as they are,
+# so new features can add settings without touching the schema first.
+CONFIG_SCHEMA: Dict[str, Dict[str, Any]] = {
+    "camera": {"name": str, "connection_timeout": NUMBER, "settings": dict},
+    "capture": {"save_directory": str, "preview_directory": str, "retry_attempts": int, "retry_delay": NUMBER,
+                "thumbnail_cache_mb": NUMBER, "thumbnail_directory": (str, type(None)),
+                "thumbnail_disk_mb": NUMBER, "card_poll_interval": NUMBER},
+    "storage": {"write_behind": bool, "batch_size": int, "flush_interval": NUMBER, "fsync": bool,
+                "max_pending_mb": NUMBER, "min_free_mb": NUMBER, "capture_quota_mb": NUMBER,
+                "capture_max_age_hours": NUMBER, "preview_quota_mb": NUMBER, "preview_max_age_hours": NUMBER,
+                "sweep_interval": NUMBER},
+    "variants": {"sizes": list, "quality": int, "cache_directory": str, "cache_mb": NUMBER,
+                 "workers": (int, type(None)), "render_timeout": NUMBER},
+    "retry": {"busy": dict, "io": dict, "unsupported": dict, "generic": dict},
+    "worker": {"enabled": bool, "start_timeout": NUMBER, "watchdog_interval": NUMBER, "shm_threshold": int,
+               "operation_timeouts": dict},
+    "supervisor": {"enabled": bool, "shard_by": str, "cameras_per_worker": int, "parallel_calls": int},
+    "liveview": {"shm_name": str, "slot_count": int, "slot_size": int, "interval": NUMBER, "session": bool,
+                 "idle_timeout": NUMBER, "viewfinder_widget": str},
+    "preview_analysis": {"batch_size": int, "max_width": (int, type(None))},
+    "focus": {"widget": str, "coarse_step": int, "fine_step": int, "max_steps": int, "settle_ms": NUMBER,
+              "min_drop": NUMBER, "roi": NUMBER, "max_width": (int, type(None))},
+    "jobs": {"max_history": int},
+    "events": {"buffer_size": int, "heartbeat": NUMBER},
+    "flight_recorder": {"capacity": int, "dump_directory": str, "dump_on_failure": bool, "dump_interval": NUMBER,
+                        "max_arg_length": int, "max_dumps": int},
+    "profiling": {"token": (str, type(None)), "output_directory": str, "sample_interval_ms": NUMBER,
+                  "max_operations": int, "tracemalloc_frames": int},
+    "log_settings": {"console_level": str, "file_level": str, "log_dir": str, "max_log_size": int,
+                     "backup_count": int, "log_format": str, "date_format": str, "log_file_name": str,
+                     "handlers": dict},
+    "general": {"max_retries": int, "retry_delay": NUMBER, "lazy_init": bool, "config_watch_interval": NUMBER},
+}
+
+RETRY_POLICY_SCHEMA = {"max_attempts": int, "base_delay": NUMBER, "max_delay": NUMBER, "multiplier": NUMBER,
+                       "jitter": NUMBER, "reconnect": bool}
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+def _type_name(expected) -> str:
+    types = expected if isinstance(expected, tuple) else (expected,)
+    return " or ".join("null" if t is type(None) else t.__name__ for t in types)
+
+
+def _check_type(value, expected) -> bool:
+    # bool is a subclass of int; a flag where a number is expected (or the reverse) is a mistake
+    if isinstance(value, bool) and expected is not bool and not (isinstance(expected, tuple) and bool in expected):
+        return False
+    return isinstance(value, expected)
+
+
+def validate_config(config: Any) -> List[str]:
+    """
+    Validate a parsed configuration against CONFIG_SCHEMA.
+
+    :param config: Parsed YAML document.
+    :return: List of error messages; empty if the configuration is valid.
+    """
+    if not isinstance(config, dict):
+        return ["The configuration must be a mapping of sections"]
+
+    errors = []
+    for section_name, section in config.items():
+        schema = CONFIG_SCHEMA.get(section_name)
+        if schema is None:
+            continue
+        if not isinstance(section, dict):
+            errors.append(f"{section_name}: expected a mapping")
+            continue
+        for key, value in section.items():
+            if key in schema and not _check_type(value, schema[key]):
+                errors.append(f"{section_name}.{key}: expected {_type_name(schema[key])}, got {type(value).__name__}")
+
+    for policy_name, policy in (config.get("retry") or {}).items():
+        for key, value in (policy or {}).items() if isinstance(policy, dict) else ():
+            if key in RETRY_POLICY_SCHEMA and not _check_type(value, RETRY_POLICY_SCHEMA[key]):
+                errors.append(f"retry.{policy_name}.{key}: expected {_type_name(RETRY_POLICY_SCHEMA[key])}")
+
+    supervisor = config.get("supervisor")
+    if isinstance(supervisor, dict) and supervisor.get("shard_by", "bus") not in ("bus", "count"):
+        errors.append(f"supervisor.shard_by: expected 'bus' or 'count', got '{supervisor.get('shard_by')}'")
+
+    log_settings = config.get("log_settings")
+    if isinstance(log_settings, dict):
+        for key in ("console_level", "file_level"):
+            level = log_settings.get(key)
+            if isinstance(level, str) and level.upper() not in LOG_LEVELS:
+                errors.append(f"log_settings.{key}: unknown level '{level}'")
+    return errors
+
+
+class ConfigService:
+    """
+    Single source of the YAML configuration for a process.
+
+    The file is parsed and validated once; ``get`` returns the cached result. ``reload`` (called by the
+    optional watcher thread whenever the file's modification time or size changes) re-parses it, keeps the
+    previous configuration if the new one does not validate, and notifies the subscribers of every section
+    that changed. Subscribers receive ``callback(section, new_section, config)``.
+    """
+
+    _instances: Dict[str, "ConfigService"] = {}
+    _instances_lock = threading.Lock()
+    _default_path: Optional[str] = None
+
+    def __init__(self, config_path: Optional[str] = None):
+        """
+        :param config_path: Path to the YAML file. Defaults to config.yaml in the repository root.
+        """
+        self.__path = os.path.abspath(config_path or DEFAULT_CONFIG_PATH)
+        self.__lock = threading.RLock()
+        # Held by a reload until its subscribers are notified, so racing reloads deliver their changes in order
+        self.__reload_lock = threading.RLock()
+        self.__config: Dict[str, Any] = {}
+        self.__signature: Optional[Tuple[int, int]] = None
+        self.__errors: List[str] = []
+        self.__loaded = False
+        self.__version = 0
+        self.__subscribers: List[Tuple[Callable[[str, Any, Dict[str, Any]], None], Optional[Tuple[str, ...]]]] = []
+        self.__watch_thread: Optional[threading.Thread] = None
+        self.__watch_stop = threading.Event()
+        self.reload()
+
+    @classmethod
+    def get_instance(cls, config_path: Optional[str] = None) -> "ConfigService":
+        """
+        Returns the shared service of a configuration file, creating it on first use.
+
+        :param config_path: Path to the YAML file. Defaults to the process default (see set_default_path),
+                            else config.yaml in the repository root.
+        """
+        path = os.path.abspath(config_path or cls._default_path or DEFAULT_CONFIG_PATH)
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    @classmethod
+    def set_default_path(cls, config_path: Optional[str]):
+        """
+        Make a configuration file the process default, returned by ``get_instance()`` without a path.
+
+        Process-wide components (logger, flight recorder, profiler) read their sections from the default
+        service, so a process started with another file sets it before creating them.
+
+        :param config_path: Path to the YAML file. None restores config.yaml in the repository root.
+        """
+        cls._default_path = os.path.abspath(config_path) if config_path else None
+
+    def get_path(self) -> str:
+        """Returns the absolute path of the configuration file."""
+        return self.__path
+
+    def is_loaded(self) -> bool:
+        """Returns True if a valid configuration was read from the file."""
+        return self.__loaded
+
+    def get_errors(self) -> List[str]:
+        """Returns the problems found by the last reload (parse or validation errors)."""
+        return list(self.__errors)
+
+    def get_version(self) -> int:
+        """Returns a counter that increases every time a changed configuration is applied."""
+        return self.__version
+
+    def get(self) -> Dict[str, Any]:
+        """Returns the current configuration. Treat it as read-only; a reload replaces it with a new dictionary."""
+        return self.__config
+
+    def get_section(self, name: str) -> Dict[str, Any]:
+        """Returns one section of the current configuration, or an empty dictionary."""
+        return self.__config.get(name) or {}
+
+    def subscribe(self, callback: Callable[[str, Any, Dict[str, Any]], None], sections: Optional[List[str]] = None):
+        """
+        Register a callback for configuration changes.
+
+        :param callback: Called as ``callback(section, new_section, config)`` for each changed section.
+        :param sections: Only notify about these sections. None subscribes to all of them.
+        """
+        with self.__lock:
+            self.__subscribers.append((callback, tuple(sections) if sections else None))
+
+    def unsubscribe(self, callback: Callable[[str, Any, Dict[str, Any]], None]):
+        """Removes a callback registered with subscribe."""
+        with self.__lock:
+            self.__subscribers = [entry for entry in self.__subscribers if entry[0] != callback]
+
+    def __file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.__path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Re-read the file if it changed since the last read, and apply it if it is valid.
+
+        Subscribers are called outside the state lock, but one reload at a time: a reload waits until the
+        subscribers of the previous one were notified, so the newest configuration is always delivered last.
+
+        :param force: Re-read even if the modification time and size are unchanged.
+        :return: A dictionary with ``success``, the changed section names and any errors.
+        """
+        with self.__reload_lock:
+            return self.__read_and_apply(force)
+
+    def __read_and_apply(self, force: bool) -> Dict[str, Any]:
+        with self.__lock:
+            signature = self.__file_signature()
+            if not force and self.__signature is not None and signature == self.__signature:
+                return sdict(True, data={"changed": []}, message="Configuration unchanged.")
+            self.__signature = signature
+
+            try:
+                with open(self.__path, 'r') as file:
+                    new_config = yaml.safe_load(file) or {}
+            except FileNotFoundError:
+                self.__errors = [f"Configuration file not found at {self.__path}"]
+                return sdict(False, data={"errors": self.get_errors()}, message=self.__errors[0])
+            except (OSError, yaml.YAMLError) as e:
+                self.__errors = [f"Error parsing configuration file: {e}"]
+                return sdict(False, data={"errors": self.get_errors()}, message=self.__errors[0])
+
+            errors = validate_config(new_config)
+            if errors:
+                # Keep running with the last valid configuration
+                self.__errors = errors
+                print(f"Invalid configuration in {self.__path}, keeping the previous settings: {errors}")
+                return sdict(False, data={"errors": errors}, message="Invalid configuration.")
+
+            old_config = self.__config
+            changed = sorted(name for name in set(old_config) | set(new_config)
+                             if old_config.get(name) != new_config.get(name))
+            self.__config = new_config
+            self.__errors = []
+            first_load = not self.__loaded
+            self.__loaded = True
+            if changed:
+                self.__version += 1
+            subscribers = list(self.__subscribers)
+
+        if not first_load:
+            for section in changed:
+                for callback, sections in subscribers:
+                    if sections is None or section in sections:
+                        try:
+                            callback(section, copy.deepcopy(new_config.get(section)), new_config)
+                        except Exception as e:
+                            print(f"Configuration subscriber failed for section '{section}': {e}")
+        return sdict(True, data={"changed": changed}, message="Configuration reloaded.")
+
+    def start_watching(self, interval: float = 2.0):
+        """
+        Poll the file in a background thread and reload it when its modification time or size changes.
+
+        :param interval: Seconds between checks.
+        """
+        with self.__lock:
+            if self.__watch_thread and self.__watch_thread.is_alive():
+                return
+            self.__watch_stop.clear()
+            self.__watch_thread = threading.Thread(target=self.__watch_loop, args=(interval,),
+                                                   name="config-watcher", daemon=True)
+            self.__watch_thread.start()
+
+    def stop_watching(self):
+        """Stops the watcher thread."""
+        self.__watch_stop.set()
+        if self.__watch_thread:
+            self.__watch_thread.join(timeout=5)
+            self.__watch_thread = None
+
+    def __watch_loop(self, interval: float):
+        while not self.__watch_stop.wait(interval):
+            if self.__file_signature() != self.__signature:
+                self.reload()
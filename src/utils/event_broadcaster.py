@@ -0,0 +1,105 @@
+import json
+import time
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, Iterator
+
+
+class EventBroadcaster:
+    """
+    Fans camera events out to any number of Server-Sent Events subscribers.
+
+    Each event is serialized once into its SSE wire format and appended to a bounded ring buffer with a
+    sequence number. Subscribers only keep the last sequence they sent, so the cost of publishing does not
+    grow with the number of subscribers. A reconnecting client resumes from its ``Last-Event-ID`` as long
+    as the event is still in the buffer.
+    """
+
+    def __init__(self, buffer_size: int = 1024, heartbeat: float = 15.0):
+        """
+        :param buffer_size: Number of recent events kept for slow or reconnecting subscribers.
+        :param heartbeat: Seconds between keep-alive comments on an idle stream.
+        """
+        self.__buffer = deque(maxlen=buffer_size)
+        self.__heartbeat = heartbeat
+        self.__sequence = 0
+        self.__subscribers = 0
+        self.__condition = threading.Condition()
+
+    def publish(self, event_type: str, data: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Publish an event to all subscribers. Signature-compatible with camera event listeners.
+
+        :param event_type: Event name, sent as the SSE ``event`` field.
+        :param data: JSON-serializable payload.
+        :return: The sequence number of the event.
+        """
+        payload = json.dumps({"type": event_type, "time": time.time(), "data": data or {}}, default=str)
+        with self.__condition:
+            self.__sequence += 1
+            message = f"id: {self.__sequence}\nevent: {event_type}\ndata: {payload}\n\n"
+            self.__buffer.append((self.__sequence, message))
+            self.__condition.notify_all()
+            return self.__sequence
+
+    def get_sequence(self) -> int:
+        """Returns the sequence number of the newest event."""
+        return self.__sequence
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the current sequence number, buffered event count and subscriber count."""
+        with self.__condition:
+            return {"sequence": self.__sequence, "buffered": len(self.__buffer), "subscribers": self.__subscribers}
+
+    def __pending(self, last_sequence: int):
+        """Returns the buffered messages after last_sequence and whether older ones were lost. Hold the condition."""
+        if not self.__buffer or self.__buffer[-1][0] <= last_sequence:
+            return [], False
+        missed = self.__buffer[0][0] > last_sequence + 1
+        # Sequences are contiguous, so the first pending message sits at a fixed offset from the oldest one
+        start = max(0, last_sequence + 1 - self.__buffer[0][0])
+        return [self.__buffer[index][1] for index in range(start, len(self.__buffer))], missed
+
+    def stream(self, last_event_id: Optional[str] = None) -> Iterator[str]:
+        """
+        Generate the SSE stream of one subscriber.
+
+        :param last_event_id: Value of the client's ``Last-Event-ID`` header. Without it, the stream starts
+            with the next published event. An ID ahead of the newest event (e.g. from before a server restart)
+            is answered with ``resync`` and the stream continues from the newest event.
+        :return: Iterator over SSE messages.
+        """
+        try:
+            last_sequence = int(last_event_id)
+        except (TypeError, ValueError):
+            last_sequence = self.__sequence
+
+        with self.__condition:
+            self.__subscribers += 1
+            # Sequence numbers restart with the process; a client ahead of them would otherwise wait forever
+            unknown = last_sequence > self.__sequence
+            if unknown:
+                last_sequence = self.__sequence
+        try:
+            yield "retry: 2000\n\n"
+            if unknown:
+                yield "event: resync\ndata: {}\n\n"
+            while True:
+                with self.__condition:
+                    messages, missed = self.__pending(last_sequence)
+                    if not messages:
+                        self.__condition.wait(self.__heartbeat)
+                        messages, missed = self.__pending(last_sequence)
+                    if messages:
+                        last_sequence = self.__sequence
+
+                if missed:
+                    # The client fell behind the buffer; tell it to re-read the state it cares about
+                    yield "event: resync\ndata: {}\n\n"
+                if messages:
+                    yield "".join(messages)
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            with self.__condition:
+                self.__subscribers -= 1
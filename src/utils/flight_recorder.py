@@ -0,0 +1,282 @@
+import os
+import json
+import time
+import itertools
+import functools
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable
+
+from src.utils.config_service import ConfigService
+from src.utils.profiler import Profiler
+
+
+def _summarize(value: Any, max_length: int) -> str:
+    """Short, cheap description of an argument. Payloads are never copied or repr'd in full."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    text = repr(value)
+    return text if len(text) <= max_length else text[:max_length - 3] + "..."
+
+
+class FlightRecorder:
+    """
+    Always-on ring buffer of the most recent camera operations.
+
+    Every slot is preallocated as parallel lists; recording an operation writes a handful of list items and
+    takes two monotonic timestamps, without allocating record objects or taking a lock. Each
+    record holds the component, operation, summarized arguments, start/end monotonic timestamps, result
+    and the gphoto2 error code seen while the operation ran (noted by GPhotoErrorInterpreter).
+
+    The buffer can be read with ``snapshot`` and written to disk with ``dump``; with ``dump_on_failure``
+    a failed operation dumps it automatically (at most once per ``dump_interval`` seconds).
+    """
+
+    _instance: Optional["FlightRecorder"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, capacity: int = 4096, dump_directory: str = "./flight_recorder",
+                 dump_on_failure: bool = True, dump_interval: float = 10.0, max_arg_length: int = 120,
+                 max_dumps: int = 50):
+        """
+        :param capacity: Number of operations kept.
+        :param dump_directory: Directory of the JSON dumps.
+        :param dump_on_failure: Dump the buffer automatically when an operation fails.
+        :param dump_interval: Minimum seconds between automatic dumps.
+        :param max_arg_length: Arguments are summarized to at most this many characters.
+        :param max_dumps: Number of dump files kept in the dump directory; older ones are deleted. 0 keeps all.
+        """
+        self.__capacity = capacity
+        self.__dump_directory = dump_directory
+        self.__dump_on_failure = dump_on_failure
+        self.__dump_interval = dump_interval
+        self.__max_arg_length = max_arg_length
+        self.__max_dumps = max_dumps
+
+        self.__sequence = [0] * capacity
+        self.__component = [None] * capacity
+        self.__operation = [None] * capacity
+        self.__arguments = [None] * capacity
+        self.__started = [0.0] * capacity
+        self.__finished = [None] * capacity
+        self.__success = [None] * capacity
+        self.__error_code = [None] * capacity
+        self.__message = [None] * capacity
+        self.__thread = [None] * capacity
+
+        # next() on itertools.count is atomic under the GIL, so concurrent threads get distinct slots
+        self.__counter = itertools.count(1)
+        self.__local = threading.local()
+        self.__last_dump = 0.0
+        self.__dump_lock = threading.Lock()
+
+        # Lets snapshots convert monotonic timestamps to wall-clock time
+        self.__monotonic_anchor = time.monotonic()
+        self.__wall_anchor = time.time()
+
+    @classmethod
+    def get_instance(cls) -> "FlightRecorder":
+        """Returns the process-wide recorder, configured from the flight_recorder section of config.yaml."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    settings = ConfigService.get_instance().get_section("flight_recorder")
+                    cls._instance = cls(
+                        capacity=settings.get("capacity", 4096),
+                        dump_directory=settings.get("dump_directory", "./flight_recorder"),
+                        dump_on_failure=settings.get("dump_on_failure", True),
+                        dump_interval=settings.get("dump_interval", 10.0),
+                        max_arg_length=settings.get("max_arg_length", 120),
+                        max_dumps=settings.get("max_dumps", 50),
+                    )
+        return cls._instance
+
+    def __summarize_arguments(self, args: tuple, kwargs: Optional[Dict[str, Any]]) -> List[str]:
+        # Keeping references would pin large payloads (downloaded files) in memory until the slot is reused
+        arguments = [_summarize(value, self.__max_arg_length) for value in args]
+        if kwargs:
+            arguments += [f"{key}={_summarize(value, self.__max_arg_length)}" for key, value in kwargs.items()]
+        return arguments
+
+    def begin(self, component: str, operation: str, args: tuple = (), kwargs: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Record the start of an operation.
+
+        :return: Sequence number to pass to ``end``.
+        """
+        sequence = next(self.__counter)
+        slot = sequence % self.__capacity
+        self.__sequence[slot] = 0   # Marks the slot as being rewritten
+        self.__component[slot] = component
+        self.__operation[slot] = operation
+        self.__arguments[slot] = self.__summarize_arguments(args, kwargs)
+        self.__finished[slot] = None
+        self.__success[slot] = None
+        self.__error_code[slot] = None
+        self.__message[slot] = None
+        self.__thread[slot] = threading.get_ident()
+        self.__started[slot] = time.monotonic()
+        self.__sequence[slot] = sequence
+
+        stack = getattr(self.__local, "stack", None)
+        if stack is None:
+            stack = self.__local.stack = []
+        stack.append(sequence)
+        return sequence
+
+    def end(self, sequence: int, success: bool, message: Optional[str] = None, error_code: Optional[int] = None):
+        """
+        Record the end of an operation started with ``begin``.
+
+        :param sequence: Value returned by ``begin``.
+        :param success: Whether the operation succeeded.
+        :param message: Result or error message.
+        :param error_code: gphoto2 error code, if not already noted while the operation ran.
+        """
+        stack = getattr(self.__local, "stack", None)
+        if stack and stack[-1] == sequence:
+            stack.pop()
+
+        slot = sequence % self.__capacity
+        if self.__sequence[slot] != sequence:
+            return   # Overwritten by newer operations while this one ran
+        self.__finished[slot] = time.monotonic()
+        self.__success[slot] = success
+        self.__message[slot] = message
+        if error_code is not None:
+            self.__error_code[slot] = error_code
+
+        if not success and self.__dump_on_failure:
+            self.__auto_dump(f"{self.__component[slot]}.{self.__operation[slot]} failed")
+
+    def note_error(self, error_code: int):
+        """Attach a gphoto2 error code to the operations running on this thread (innermost and its callers)."""
+        for sequence in getattr(self.__local, "stack", None) or ():
+            slot = sequence % self.__capacity
+            if self.__sequence[slot] == sequence and self.__error_code[slot] is None:
+                self.__error_code[slot] = error_code
+
+    def __auto_dump(self, reason: str):
+        now = time.monotonic()
+        if now - self.__last_dump < self.__dump_interval:
+            return
+        self.__last_dump = now
+        threading.Thread(target=self.dump, kwargs={"reason": reason}, name="flight-recorder-dump", daemon=True).start()
+
+    def __record(self, slot: int) -> Dict[str, Any]:
+        started, finished = self.__started[slot], self.__finished[slot]
+        return {
+            "sequence": self.__sequence[slot],
+            "component": self.__component[slot],
+            "operation": self.__operation[slot],
+            "arguments": self.__arguments[slot],
+            "thread": self.__thread[slot],
+            "started": round(started, 6),
+            "finished": round(finished, 6) if finished is not None else None,
+            "started_at": datetime.fromtimestamp(self.__wall_anchor + started - self.__monotonic_anchor).isoformat(),
+            "duration_ms": round((finished - started) * 1000, 3) if finished is not None else None,
+            "success": self.__success[slot],
+            "error_code": self.__error_code[slot],
+            "message": self.__message[slot],
+        }
+
+    def snapshot(self, limit: Optional[int] = None, failures_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Returns the recorded operations, oldest first. Operations still running have no end timestamp.
+
+        :param limit: Only return the most recent records.
+        :param failures_only: Only return failed operations.
+        """
+        records = []
+        for slot in range(self.__capacity):
+            if not self.__sequence[slot]:
+                continue
+            record = self.__record(slot)
+            if record["sequence"] and (not failures_only or record["success"] is False):
+                records.append(record)
+        records.sort(key=lambda record: record["sequence"])
+        return records[-limit:] if limit else records
+
+    def dump(self, reason: str = "manual", path: Optional[str] = None) -> Optional[str]:
+        """
+        Write the buffer to a JSON file.
+
+        :param reason: Why the dump was taken (stored in the file).
+        :param path: Target file. Defaults to a timestamped file in the dump directory.
+        :return: The path of the file, or None if it could not be written.
+        """
+        with self.__dump_lock:
+            rotate = path is None
+            if path is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+                path = os.path.join(self.__dump_directory, f"flight_{os.getpid()}_{timestamp}.json")
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with open(path, "w") as file:
+                    json.dump({"reason": reason, "pid": os.getpid(), "dumped_at": datetime.now().isoformat(),
+                               "records": self.snapshot()}, file, indent=1, default=str)
+            except OSError as e:
+                print(f"Flight recorder dump failed: {e}")
+                return None
+            if rotate:
+                self.__rotate()
+            return path
+
+    def __rotate(self):
+        """Deletes the oldest dump files of the dump directory beyond max_dumps. Hold the dump lock."""
+        if not self.__max_dumps:
+            return
+        try:
+            dumps = [entry for entry in os.scandir(self.__dump_directory)
+                     if entry.name.startswith("flight_") and entry.name.endswith(".json") and entry.is_file()]
+            dumps.sort(key=lambda entry: entry.stat().st_mtime)
+        except OSError:
+            return
+        for entry in dumps[:max(0, len(dumps) - self.__max_dumps)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns the capacity and the number of operations recorded so far."""
+        recorded = max(self.__sequence)
+        return {"capacity": self.__capacity, "recorded": recorded, "kept": min(recorded, self.__capacity),
+                "dump_directory": self.__dump_directory}
+
+
+def recorded(component: str, operation: Optional[str] = None):
+    """
+    Decorator recording every call of a method in the process-wide flight recorder.
+
+    A returned result dictionary (``sdict``) or boolean decides success; an exception is recorded as a
+    failure and re-raised. While a profiling session is armed (see ``Profiler``), the call runs through it.
+
+    :param component: Component name, e.g. "capture_handler".
+    :param operation: Operation name. Defaults to the function name.
+    """
+    def decorator(function: Callable) -> Callable:
+        name = operation or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(self, *args, **kwargs):
+            recorder = FlightRecorder.get_instance()
+            sequence = recorder.begin(component, name, args, kwargs)
+            try:
+                profiler = Profiler.active
+                if profiler is None:
+                    result = function(self, *args, **kwargs)
+                else:
+                    result = profiler.run(component, name, function, self, *args, **kwargs)
+            except Exception as e:
+                recorder.end(sequence, False, f"{type(e).__name__}: {e}", error_code=getattr(e, "code", None))
+                raise
+            if isinstance(result, dict) and "success" in result:
+                recorder.end(sequence, bool(result["success"]), result.get("message"))
+            elif isinstance(result, bool):
+                recorder.end(sequence, result)
+            else:
+                recorder.end(sequence, True)
+            return result
+        return wrapper
+    return decorator
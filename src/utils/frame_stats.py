@@ -0,0 +1,174 @@
+import io
+from typing import Optional, Dict, List, Any
+
+# Optional dependencies: preview analysis needs NumPy and Pillow (pip install numpy Pillow)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class FrameAnalyzer:
+    """
+    Decodes preview JPEGs into preallocated grayscale arrays and computes image statistics in batches.
+
+    Per frame it reports a 256-bin luminance histogram, mean luminance, the percentage of clipped
+    shadows/highlights and the Laplacian variance as a sharpness score. All statistics are computed
+    with vectorized NumPy operations over the whole batch, reusing the same buffers between calls.
+    """
+
+    SHADOW_CLIP_LEVEL = 2
+    HIGHLIGHT_CLIP_LEVEL = 253
+
+    def __init__(self, batch_size: int = 8, max_width: Optional[int] = 640):
+        """
+        :param batch_size: Maximum number of frames analysed in one vectorized pass.
+        :param max_width: Decode frames at reduced size (JPEG DCT scaling) when they are wider than this.
+        """
+        if not self.is_available():
+            raise ImportError("Preview analysis requires NumPy and Pillow (pip install numpy Pillow)")
+
+        self.__batch_size = batch_size
+        self.__max_width = max_width
+        self.__shape = None
+        self.__frames = None      # uint8  (batch, height, width) decoded luminance
+        self.__work = None        # int32  (batch, height, width) histogram offsets
+        self.__laplacian = None   # float32 (batch, height - 2, width - 2)
+
+    @staticmethod
+    def is_available() -> bool:
+        """Returns True if the optional dependencies are installed."""
+        return np is not None and Image is not None
+
+    def __allocate(self, height: int, width: int):
+        if self.__shape == (height, width):
+            return
+        self.__shape = (height, width)
+        self.__frames = np.empty((self.__batch_size, height, width), dtype=np.uint8)
+        self.__work = np.empty((self.__batch_size, height, width), dtype=np.int32)
+        self.__laplacian = np.empty((self.__batch_size, height - 2, width - 2), dtype=np.float32)
+
+    def __decode(self, data: bytes):
+        image = Image.open(io.BytesIO(data))
+        if self.__max_width and image.width > self.__max_width:
+            scale = self.__max_width / image.width
+            image.draft('L', (self.__max_width, int(image.height * scale)))
+        return image.convert('L')
+
+    def decode_batch(self, frames: List[bytes]) -> "np.ndarray":
+        """
+        Decode up to ``batch_size`` JPEG frames into the reused luminance buffer.
+
+        Frames must share the same dimensions (as live view frames do); the buffer is reallocated when they change.
+
+        :param frames: JPEG bytes of each frame.
+        :return: View of shape (len(frames), height, width) into the reused buffer.
+        """
+        if len(frames) > self.__batch_size:
+            raise ValueError(f"At most {self.__batch_size} frames can be decoded at once")
+
+        for index, data in enumerate(frames):
+            image = self.__decode(data)
+            if index == 0:
+                self.__allocate(image.height, image.width)
+            elif (image.height, image.width) != self.__shape:
+                raise ValueError("All frames of a batch must have the same dimensions")
+            np.copyto(self.__frames[index], np.asarray(image))
+
+        return self.__frames[:len(frames)]
+
+    def compute_stats(self, frames: "np.ndarray") -> List[Dict[str, Any]]:
+        """
+        Compute statistics for a batch of decoded luminance frames.
+
+        :param frames: uint8 array of shape (count, height, width), e.g. from decode_batch.
+        :return: One dictionary of statistics per frame.
+        """
+        count, height, width = frames.shape
+        pixels = height * width
+        self.__allocate(height, width)
+
+        # Histogram of all frames with a single bincount: shift each frame's values into its own 256-bin range
+        work = self.__work[:count]
+        np.add(frames, (np.arange(count, dtype=np.int32) * 256)[:, None, None], out=work)
+        histograms = np.bincount(work.ravel(), minlength=count * 256).reshape(count, 256)
+
+        levels = np.arange(256)
+        means = histograms @ levels / pixels
+        shadows = histograms[:, :self.SHADOW_CLIP_LEVEL + 1].sum(axis=1) * 100.0 / pixels
+        highlights = histograms[:, self.HIGHLIGHT_CLIP_LEVEL:].sum(axis=1) * 100.0 / pixels
+
+        # 4-neighbour Laplacian over the frame interior
+        laplacian = self.__laplacian[:count]
+        np.multiply(frames[:, 1:-1, 1:-1], 4, out=laplacian, dtype=np.float32, casting='unsafe')
+        laplacian -= frames[:, :-2, 1:-1]
+        laplacian -= frames[:, 2:, 1:-1]
+        laplacian -= frames[:, 1:-1, :-2]
+        laplacian -= frames[:, 1:-1, 2:]
+        sharpness = laplacian.reshape(count, -1).var(axis=1)
+
+        return [
+            {
+                "width": width,
+                "height": height,
+                "histogram": histograms[index].tolist(),
+                "mean_luminance": round(float(means[index]), 2),
+                "clipped_shadows_pct": round(float(shadows[index]), 3),
+                "clipped_highlights_pct": round(float(highlights[index]), 3),
+                "sharpness": round(float(sharpness[index]), 3),
+            }
+            for index in range(count)
+        ]
+
+    @staticmethod
+    def focus_scores(frames: "np.ndarray", roi: float = 0.5) -> List[float]:
+        """
+        Gradient-energy focus measure of a batch of decoded luminance frames.
+
+        The score is the mean squared horizontal plus vertical intensity difference over a centred region of
+        interest. It rises steeply towards best focus and is far less sensitive to noise in flat areas than the
+        Laplacian variance, which makes it the better measure to compare frames of one focus sweep.
+
+        :param frames: uint8 array of shape (count, height, width), e.g. from decode_batch.
+        :param roi: Side length of the centred region as a fraction of the frame (0 < roi <= 1).
+        :return: One score per frame.
+        """
+        count, height, width = frames.shape
+        crop_height = max(3, int(height * roi))
+        crop_width = max(3, int(width * roi))
+        top = (height - crop_height) // 2
+        left = (width - crop_width) // 2
+        region = frames[:, top:top + crop_height, left:left + crop_width].astype(np.float32)
+
+        horizontal = region[:, :, 1:] - region[:, :, :-1]
+        vertical = region[:, 1:, :] - region[:, :-1, :]
+        energy = np.einsum('nij,nij->n', horizontal, horizontal) / horizontal[0].size
+        energy += np.einsum('nij,nij->n', vertical, vertical) / vertical[0].size
+        return [round(float(score), 3) for score in energy]
+
+    def analyze_batch(self, frames: List[bytes]) -> List[Dict[str, Any]]:
+        """
+        Decode and analyse JPEG frames, ``batch_size`` at a time.
+
+        :param frames: JPEG bytes of each frame.
+        :return: One dictionary of statistics per frame.
+        """
+        results = []
+        for start in range(0, len(frames), self.__batch_size):
+            batch = frames[start:start + self.__batch_size]
+            results.extend(self.compute_stats(self.decode_batch(batch)))
+        return results
+
+    def analyze(self, data: bytes) -> Dict[str, Any]:
+        """
+        Decode and analyse a single JPEG frame.
+
+        :param data: JPEG bytes.
+        :return: Dictionary of statistics.
+        """
+        return self.analyze_batch([data])[0]
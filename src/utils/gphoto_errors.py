@@ -1,62 +1,139 @@
-import gphoto2 as gp
+from __future__ import annotations
+
+from typing import Union
+
+from src.utils.lazy_import import lazy_import
+from src.utils.flight_recorder import FlightRecorder
+
+gp = lazy_import("gphoto2")
 
 class GPhotoErrorInterpreter:
     ERROR_CODES = {
-        # Core Errors
-        -1: "Generic Error",
+        # Port Library Errors (gphoto2-port-result.h)
+        -1: "Unspecified Error",
         -2: "Bad Parameters",
-        -3: "No Memory",
-        -4: "Internal Library Error",
+        -3: "Out of Memory",
+        -4: "Error Loading a Library",
         -5: "Unknown Port",
-        -6: "Operation Not Supported",
-        
-        # Camera Connection Errors
-        -10: "Camera Not Found",
-        -11: "Camera Busy",
-        -12: "Camera Self-Test Failed", 
-        -13: "Camera I/O Error",
-        
-        # File and Storage Errors
-        -20: "File Not Found",
-        -21: "File Already Exists",
-        -22: "Directory Not Found",
-        -23: "Storage Full",
-        
-        # Communication Errors
-        -30: "Communication Timeout",
-        -31: "Serial Port Error",
-        -32: "USB Communication Error",
-        -33: "Communication Protocol Error",
-        
-        # Capture Errors
-        -40: "Image Capture Failed",
-        -41: "Preview Capture Failed",
-        -42: "Autofocus Failed",
-        -43: "Exposure Setting Failed"
+        -6: "Unsupported Operation",
+        -7: "I/O Problem",
+        -8: "Fixed Limit Exceeded",
+        -10: "Timeout Reading From or Writing to the Port",
+        -20: "Serial Port Not Supported",
+        -21: "USB Port Not Supported",
+        -31: "Error Initializing the Port",
+        -34: "Error Reading From the Port",
+        -35: "Error Writing to the Port",
+        -37: "Error Updating the Port Settings",
+        -41: "Error Setting the Serial Port Speed",
+        -51: "Error Clearing a Halt Condition on the USB Port",
+        -52: "Could Not Find the Requested Device on the USB Port",
+        -53: "Could Not Claim the USB Device",
+        -60: "Could Not Lock the Device",
+        -70: "libhal Error",
+
+        # Camera Library Errors (gphoto2-result.h)
+        -102: "Corrupted Data",
+        -103: "File Already Exists",
+        -105: "Unknown Camera Model",
+        -107: "Directory Not Found",
+        -108: "File Not Found",
+        -109: "Directory Already Exists",
+        -110: "I/O in Progress (Camera Busy)",
+        -111: "Path Not Absolute",
+        -112: "Operation Cancelled",
+        -113: "Camera Error",
+        -114: "OS Failure",
+        -115: "Not Enough Space"
     }
 
+    # Error classes used by the retry policy engine
+    CLASS_BUSY = "busy"
+    CLASS_IO = "io"
+    CLASS_UNSUPPORTED = "unsupported"
+    CLASS_NOT_FOUND = "not_found"
+    CLASS_STORAGE = "storage"
+    CLASS_GENERIC = "generic"
+
+    ERROR_CLASSES = {
+        # Camera is busy or the port is locked; usually clears within milliseconds
+        -110: CLASS_BUSY,
+        -60: CLASS_BUSY,
+        -10: CLASS_BUSY,
+
+        # The USB link was lost or is unusable; a reconnect is needed
+        -7: CLASS_IO,
+        -31: CLASS_IO,
+        -34: CLASS_IO,
+        -35: CLASS_IO,
+        -37: CLASS_IO,
+        -51: CLASS_IO,
+        -52: CLASS_IO,
+        -53: CLASS_IO,
+
+        # Retrying cannot help
+        -2: CLASS_UNSUPPORTED,
+        -4: CLASS_UNSUPPORTED,
+        -5: CLASS_UNSUPPORTED,
+        -6: CLASS_UNSUPPORTED,
+        -8: CLASS_UNSUPPORTED,
+        -20: CLASS_UNSUPPORTED,
+        -21: CLASS_UNSUPPORTED,
+        -105: CLASS_UNSUPPORTED,
+        -111: CLASS_UNSUPPORTED,
+        -112: CLASS_UNSUPPORTED,
+        -107: CLASS_NOT_FOUND,
+        -108: CLASS_NOT_FOUND,
+        -103: CLASS_STORAGE,
+        -109: CLASS_STORAGE,
+        -115: CLASS_STORAGE,
+    }
+
+    @staticmethod
+    def get_error_code(error: Union[int, gp.GPhoto2Error]) -> int:
+        """
+        Extract the numeric code from a GPhoto2 exception or pass an integer code through.
+
+        :param error: GPhoto2 exception or error code
+        :return: Numeric libgphoto2 error code
+        """
+        return error.code if isinstance(error, gp.GPhoto2Error) else int(error)
+
     @classmethod
-    def interpret_error(cls, error_code: int) -> str:
+    def interpret_error(cls, error: Union[int, gp.GPhoto2Error]) -> str:
         """
-        Interpret a GPhoto2 error code.
-        
-        :param error_code: The error code from a GPhoto2 exception
+        Interpret a GPhoto2 error.
+
+        :param error: The GPhoto2 exception or its error code
         :return: Human-readable error description
         """
+        error_code = cls.get_error_code(error)
+        # Every handled gphoto2 error passes through here; attach its code to the operation being recorded
+        FlightRecorder.get_instance().note_error(error_code)
         return cls.ERROR_CODES.get(error_code, f"Unknown Error Code: {error_code}")
 
+    @classmethod
+    def classify_error(cls, error: Union[int, gp.GPhoto2Error]) -> str:
+        """
+        Classify a GPhoto2 error for retry handling.
+
+        :param error: The GPhoto2 exception or its error code
+        :return: One of the CLASS_* constants
+        """
+        return cls.ERROR_CLASSES.get(cls.get_error_code(error), cls.CLASS_GENERIC)
+
     @classmethod
     def log_error(cls, logger, method_name: str, error: gp.GPhoto2Error):
         """
         Log a GPhoto2 error with detailed interpretation.
-        
+
         :param logger: Logger instance
         :param method_name: Name of the method where error occurred
         :param error: GPhoto2 error exception
         """
         error_code = error.code
         error_message = cls.interpret_error(error_code)
-        
+
         logger.error(
             f"[{method_name}] GPhoto2 Error: {error_message} "
             f"(Error Code: {error_code}, Original: {str(error)})"
@@ -0,0 +1,50 @@
+import sys
+import types
+import importlib
+import threading
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    ``gp = lazy_import("gphoto2")`` keeps ``gp.Camera``, ``gp.GPhoto2Error`` etc. working unchanged while
+    moving the cost of loading libgphoto2 (and its camera drivers) from import time to the first camera call.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_LazyModule__module"] = None
+        self.__dict__["_LazyModule__lock"] = threading.Lock()
+
+    def load(self) -> types.ModuleType:
+        """Imports the module now, if it has not been imported yet, and returns it."""
+        module = self.__module
+        if module is None:
+            with self.__lock:
+                if self.__module is None:
+                    self.__dict__["_LazyModule__module"] = importlib.import_module(self.__name__)
+                module = self.__module
+        return module
+
+    def is_loaded(self) -> bool:
+        """Returns True once the module has been imported."""
+        return self.__module is not None
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.is_loaded() else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str):
+    """
+    Returns a module that is imported on first use, or the module itself if it has already been imported.
+
+    :param name: Module name, e.g. "gphoto2".
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
@@ -0,0 +1,356 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable, Iterable
+
+from src.utils.config_service import ConfigService
+from src.utils.utils import *
+
+MODE_CPROFILE = "cprofile"
+MODE_SAMPLING = "sampling"
+
+
+class Profiler:
+    """
+    Opt-in profiling of the camera operations of a running process.
+
+    A session profiles the next N operations recorded with ``@recorded`` (CameraManager, CaptureHandler,
+    ConfigHandler), optionally only those of some components, and writes one file when it ends:
+
+    * ``cprofile``: deterministic profile of each operation, merged into a ``.pstats`` file (snakeviz, flameprof,
+      ``python -m pstats``). Operations are profiled one at a time; concurrent ones run unprofiled.
+    * ``sampling``: a background thread samples the stacks of the threads running a profiled operation every
+      ``sample_interval_ms``. The profiled code runs untouched. Written as collapsed stacks (``.collapsed``) for
+      flamegraph.pl and speedscope.
+
+    ``memory`` takes tracemalloc snapshots, saved as ``.tracemalloc`` files, and compares each with the previous one
+    to show memory growth. Nothing is measured until a session or tracemalloc is started; while idle, the only
+    cost is one attribute check per recorded operation.
+    """
+
+    # The profiler with an armed session, checked by @recorded on every call
+    active: Optional["Profiler"] = None
+
+    _instance: Optional["Profiler"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, output_directory: str = "./profiles", sample_interval_ms: float = 5.0,
+                 max_operations: int = 1000, tracemalloc_frames: int = 25):
+        """
+        :param output_directory: Directory of the profile and snapshot files.
+        :param sample_interval_ms: Default interval of the sampling profiler.
+        :param max_operations: Maximum number of operations of one session.
+        :param tracemalloc_frames: Default number of frames stored per traced allocation.
+        """
+        self.__output_directory = output_directory
+        self.__sample_interval_ms = sample_interval_ms
+        self.__max_operations = max_operations
+        self.__tracemalloc_frames = tracemalloc_frames
+
+        self.__lock = threading.Lock()
+        self.__profile_lock = threading.Lock()      # Only one cProfile may be enabled at a time
+        self.__local = threading.local()
+        self.__session: Optional[Dict[str, Any]] = None
+        self.__last_session: Optional[Dict[str, Any]] = None
+        self.__sampled_threads: Dict[int, str] = {}   # thread id -> operation being sampled
+        self.__sampler: Optional[threading.Thread] = None
+        self.__sampler_stop = threading.Event()
+        self.__memory_snapshot: Optional[tracemalloc.Snapshot] = None
+
+    @classmethod
+    def get_instance(cls) -> "Profiler":
+        """Returns the process-wide profiler, configured from the profiling section of config.yaml."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    settings = ConfigService.get_instance().get_section("profiling")
+                    cls._instance = cls(
+                        output_directory=settings.get("output_directory", "./profiles"),
+                        sample_interval_ms=settings.get("sample_interval_ms", 5.0),
+                        max_operations=settings.get("max_operations", 1000),
+                        tracemalloc_frames=settings.get("tracemalloc_frames", 25),
+                    )
+        return cls._instance
+
+    def __file_path(self, prefix: str, extension: str) -> str:
+        os.makedirs(self.__output_directory, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return os.path.abspath(os.path.join(self.__output_directory, f"{prefix}_{os.getpid()}_{timestamp}.{extension}"))
+
+    def start(self, mode: str = MODE_CPROFILE, operations: int = 10, components: Optional[Iterable[str]] = None,
+              interval_ms: Optional[float] = None) -> Dict:
+        """
+        Profile the next ``operations`` camera operations.
+
+        :param mode: "cprofile" or "sampling".
+        :param operations: Number of operations to profile.
+        :param components: Only profile these components, e.g. ["capture_handler"]. None profiles all.
+        :param interval_ms: Sampling interval (sampling mode). Defaults to the configured interval.
+        :return: A dictionary with the session.
+        """
+        if mode not in (MODE_CPROFILE, MODE_SAMPLING):
+            return sdict(False, message=f"Unknown profiling mode '{mode}'. Use '{MODE_CPROFILE}' or '{MODE_SAMPLING}'.")
+        if isinstance(operations, bool) or not isinstance(operations, int) \
+                or not 1 <= operations <= self.__max_operations:
+            return sdict(False, message=f"operations must be between 1 and {self.__max_operations}.")
+        if interval_ms is not None and (isinstance(interval_ms, bool) or not isinstance(interval_ms, (int, float))
+                                        or interval_ms <= 0):
+            # The sampler thread would die on its first sleep while the session stays armed
+            return sdict(False, message="interval_ms must be a positive number.")
+
+        with self.__lock:
+            if self.__session is not None:
+                return sdict(False, data=self.__describe(self.__session),
+                             message="A profiling session is already running.")
+            self.__session = {
+                "mode": mode,
+                "operations": operations,
+                "components": sorted(components) if components else None,
+                "interval_ms": interval_ms or self.__sample_interval_ms,
+                "started_at": time.time(),
+                "finished_at": None,
+                "claimed": 0,
+                "profiled": 0,
+                "skipped": 0,
+                "per_operation": Counter(),
+                "stats": None,
+                "stacks": Counter(),
+                "samples": 0,
+                "file": None,
+                "top": [],
+            }
+            session = self.__session
+            if mode == MODE_SAMPLING:
+                self.__sampler_stop.clear()
+                self.__sampler = threading.Thread(target=self.__sample, args=(session,), name="profiler-sampler",
+                                                  daemon=True)
+                self.__sampler.start()
+            Profiler.active = self
+        return sdict(True, data=self.__describe(session), message=f"Profiling the next {operations} operation(s).")
+
+    def stop(self) -> Dict:
+        """Ends the running session early and writes its file."""
+        with self.__lock:
+            session = self.__session
+        if session is None:
+            return sdict(False, message="No profiling session is running.")
+        return self.__finish(session)
+
+    def run(self, component: str, operation: str, function: Callable, *args, **kwargs) -> Any:
+        """
+        Run one operation, profiling it if the session still wants it. Called by ``@recorded``.
+
+        :param component: Component of the operation.
+        :param operation: Operation name.
+        :param function: The operation.
+        :return: The result of the operation.
+        """
+        session = self.__session
+        # Operations called from a profiled operation are part of its profile
+        if session is None or getattr(self.__local, "profiling", False) or \
+                (session["components"] and component not in session["components"]):
+            return function(*args, **kwargs)
+
+        with self.__lock:
+            if self.__session is not session or session["claimed"] >= session["operations"]:
+                return function(*args, **kwargs)
+            session["claimed"] += 1
+
+        label = f"{component}.{operation}"
+        profile = None
+        if session["mode"] == MODE_CPROFILE:
+            if not self.__profile_lock.acquire(blocking=False):
+                with self.__lock:
+                    session["claimed"] -= 1
+                    session["skipped"] += 1
+                return function(*args, **kwargs)
+            profile = cProfile.Profile()
+
+        self.__local.profiling = True
+        try:
+            if profile is not None:
+                return profile.runcall(function, *args, **kwargs)
+            self.__sampled_threads[threading.get_ident()] = label
+            return function(*args, **kwargs)
+        finally:
+            self.__local.profiling = False
+            if profile is not None:
+                self.__profile_lock.release()
+            else:
+                self.__sampled_threads.pop(threading.get_ident(), None)
+            with self.__lock:
+                if profile is not None:
+                    if session["stats"] is None:
+                        session["stats"] = pstats.Stats(profile)
+                    else:
+                        session["stats"].add(profile)
+                session["profiled"] += 1
+                session["per_operation"][label] += 1
+                done = session["profiled"] >= session["operations"]
+            if done:
+                self.__finish(session)
+
+    def __sample(self, session: Dict[str, Any]):
+        interval = session["interval_ms"] / 1000
+        while not self.__sampler_stop.wait(interval):
+            if not self.__sampled_threads:
+                continue
+            frames = sys._current_frames()
+            for thread_id, label in list(self.__sampled_threads.items()):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    session["stacks"][";".join([label] + stack[::-1])] += 1
+                    session["samples"] += 1
+
+    def __finish(self, session: Dict[str, Any]) -> Dict:
+        method_name = "finish"
+        with self.__lock:
+            if self.__session is not session:
+                return sdict(True, data=self.__describe(session), message="Profiling session already finished.")
+            self.__session = None
+            Profiler.active = None
+        if session["mode"] == MODE_SAMPLING:
+            self.__sampler_stop.set()
+            if self.__sampler is not None and self.__sampler is not threading.current_thread():
+                self.__sampler.join(timeout=5)
+        session["finished_at"] = time.time()
+
+        try:
+            if session["mode"] == MODE_CPROFILE and session["stats"] is not None:
+                session["file"] = self.__file_path("profile", "pstats")
+                session["stats"].dump_stats(session["file"])
+                session["top"] = self.__top_functions(session["stats"])
+            elif session["mode"] == MODE_SAMPLING and session["stacks"]:
+                session["file"] = self.__file_path("samples", "collapsed")
+                with open(session["file"], "w") as file:
+                    for stack, count in session["stacks"].most_common():
+                        file.write(f"{stack} {count}\n")
+        except OSError as e:
+            self.__last_session = session
+            return sdict(False, data=self.__describe(session), message=f"{method_name}: could not write profile: {e}")
+
+        self.__last_session = session
+        return sdict(True, data=self.__describe(session),
+                     message=f"Profiled {session['profiled']} operation(s)." if session["file"]
+                     else "Session finished without profiled operations.")
+
+    @staticmethod
+    def __top_functions(stats: pstats.Stats, limit: int = 20) -> List[Dict[str, Any]]:
+        entries = []
+        for (file_name, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            entries.append({"function": f"{function} ({os.path.basename(file_name)}:{line})", "calls": calls,
+                            "total_ms": round(total * 1000, 3), "cumulative_ms": round(cumulative * 1000, 3)})
+        entries.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+        return entries[:limit]
+
+    @staticmethod
+    def __describe(session: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "mode": session["mode"],
+            "operations": session["operations"],
+            "components": session["components"],
+            "interval_ms": session["interval_ms"] if session["mode"] == MODE_SAMPLING else None,
+            "started_at": session["started_at"],
+            "finished_at": session["finished_at"],
+            "profiled": session["profiled"],
+            "skipped": session["skipped"],
+            "per_operation": dict(session["per_operation"]),
+            "samples": session["samples"],
+            "file": os.path.basename(session["file"]) if session["file"] else None,
+            "top": session["top"],
+        }
+
+    def memory(self, action: str = "snapshot", frames: Optional[int] = None, top: int = 20) -> Dict:
+        """
+        Control tracemalloc.
+
+        :param action: "start" begins tracing, "snapshot" saves a snapshot and compares it with the previous one,
+                       "stop" ends tracing.
+        :param frames: Frames stored per allocation when starting. Defaults to the configured number.
+        :param top: Number of allocation sites returned by a snapshot.
+        :return: A dictionary with the traced memory and, for snapshots, the largest sites or growth.
+        """
+        if action == "start":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames or self.__tracemalloc_frames)
+            self.__memory_snapshot = None
+            return sdict(True, data=self.__memory_usage(), message="tracemalloc started.")
+        if action == "stop":
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self.__memory_snapshot = None
+            return sdict(True, data=self.__memory_usage(), message="tracemalloc stopped.")
+        if action != "snapshot":
+            return sdict(False, message=f"Unknown memory action '{action}'. Use 'start', 'snapshot' or 'stop'.")
+        if not tracemalloc.is_tracing():
+            return sdict(False, message="tracemalloc is not running. Start it first.")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        path = self.__file_path("memory", "tracemalloc")
+        try:
+            snapshot.dump(path)
+        except OSError as e:
+            return sdict(False, message=f"Could not write snapshot: {e}")
+
+        previous, self.__memory_snapshot = self.__memory_snapshot, snapshot
+        if previous is None:
+            sites = [{"location": str(statistic.traceback), "size_kb": round(statistic.size / 1024, 1),
+                      "count": statistic.count} for statistic in snapshot.statistics("lineno")[:top]]
+        else:
+            sites = [{"location": str(statistic.traceback), "size_kb": round(statistic.size / 1024, 1),
+                      "size_diff_kb": round(statistic.size_diff / 1024, 1), "count": statistic.count,
+                      "count_diff": statistic.count_diff}
+                     for statistic in snapshot.compare_to(previous, "lineno")[:top]]
+        return sdict(True, data=dict(self.__memory_usage(), file=os.path.basename(path),
+                                     compared_to_previous=previous is not None, sites=sites),
+                     message="Memory snapshot taken.")
+
+    @staticmethod
+    def __memory_usage() -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        current, peak = tracemalloc.get_traced_memory()
+        return {"tracing": True, "current_kb": round(current / 1024, 1), "peak_kb": round(peak / 1024, 1)}
+
+    def get_status(self) -> Dict[str, Any]:
+        """Returns the running and the last finished session and the tracemalloc state."""
+        with self.__lock:
+            session = self.__describe(self.__session) if self.__session else None
+        return {"session": session,
+                "last_session": self.__describe(self.__last_session) if self.__last_session else None,
+                "memory": self.__memory_usage(), "pid": os.getpid()}
+
+    def list_files(self) -> List[Dict[str, Any]]:
+        """Returns the profile and snapshot files of the output directory, newest first."""
+        if not os.path.isdir(self.__output_directory):
+            return []
+        files = []
+        for entry in os.scandir(self.__output_directory):
+            if entry.is_file() and entry.name.endswith((".pstats", ".collapsed", ".tracemalloc")):
+                stat = entry.stat()
+                files.append({"name": entry.name, "size": stat.st_size, "modified": stat.st_mtime})
+        return sorted(files, key=lambda file: file["modified"], reverse=True)
+
+    def get_file_path(self, name: str) -> Optional[str]:
+        """
+        Returns the absolute path of a file of the output directory, or None if there is no such file.
+
+        :param name: File name as returned by ``list_files``.
+        """
+        if name != os.path.basename(name) or name not in {file["name"] for file in self.list_files()}:
+            return None
+        return os.path.abspath(os.path.join(self.__output_directory, name))
@@ -1,37 +1,51 @@
 import os
-import yaml
 import logging
+import threading
 
 from logging.handlers import RotatingFileHandler
 from datetime import datetime
 
+from src.utils.config_service import ConfigService
+
 
 class Logger:
     """
     Merkezi log sistemi.
     Varsayılan log dosya adı: rcp_log_<timestamp>.log
     Varsayılan log dizini: Masaüstünde 'SRC_LOGS/' klasörü.
+
+    Yapılandırma ortak ConfigService üzerinden okunur ve tüm logger'lar aynı log dosyasını paylaşır.
+    Log dosyası ilk kayıt yazılana kadar açılmaz. config.yaml'daki log seviyesi ve format
+    değişiklikleri yeniden başlatmadan uygulanır.
     """
 
+    _config = None
+    _config_service = None
+    _file_handler = None
+    _console_handlers = {}
+    _logger_names = set()
+    _lock = threading.RLock()
+
     @staticmethod
-    def get_default_log_dir():
+    def get_default_log_dir(create: bool = True):
         """
         Masaüstünde varsayılan 'SRC_LOGS/' klasörünü döndürür.
+        :param create: Klasör yoksa oluşturulsun mu
         """
         desktop_path = os.path.expanduser("~")
         default_log_dir = os.path.join(desktop_path, "SRC_LOGS")
-        if not os.path.exists(default_log_dir):
+        if create and not os.path.exists(default_log_dir):
             os.makedirs(default_log_dir)  # Klasör yoksa oluştur
         return default_log_dir
 
     @staticmethod
-    def load_config():
+    def load_config(config_service=None):
         """
         YAML yapılandırma dosyasını yükler.
         Eğer dosyaya ulaşılamazsa varsayılan yapılandırmayı döndürür.
+        :param config_service: Okunacak ConfigService (varsayılan: sürecin varsayılan yapılandırması)
         """
-        default_log_dir = Logger.get_default_log_dir()
-        config_path = "../config.yaml"
+        default_log_dir = Logger.get_default_log_dir(create=False)
         default_config = {
             "console_level": "INFO",
             "file_level": "DEBUG",
@@ -47,19 +61,99 @@ class Logger:
             }
         }
 
-        try:
-            if os.path.exists(config_path):
-                with open(config_path, "r") as file:
-                    config = yaml.safe_load(file)
-                    return config.get("log_settings", default_config)
-        except yaml.YAMLError as e:
-            print(f"YAML dosyasından okuma hatası: {e}")
-        except Exception as e:
-            print(f"Yapılandırma dosyası yüklenirken hata: {e}")
+        config_service = config_service or ConfigService.get_instance()
+        if config_service.is_loaded():
+            return config_service.get().get("log_settings", default_config)
 
+        for error in config_service.get_errors():
+            print(f"Yapılandırma dosyası yüklenirken hata: {error}")
         print("config.yaml bulunamadı, varsayılan ayarlar kullanılacak.")
         return default_config
 
+    @staticmethod
+    def get_config():
+        """
+        Log yapılandırmasını döndürür. Dosya süreç başına yalnızca bir kez okunur; sürecin varsayılan
+        yapılandırma dosyası değişirse (ör. CameraManager özel bir config_path ile oluşturulduğunda) yenisi okunur.
+        """
+        with Logger._lock:
+            config_service = ConfigService.get_instance()
+            if Logger._config_service is not config_service:
+                if Logger._config_service is not None:
+                    Logger._config_service.unsubscribe(Logger.apply_settings)
+                Logger._config_service = config_service
+                Logger._config = None
+                log_settings = Logger.load_config(config_service)
+                # Daha önce oluşturulan logger'lar yeni seviyeleri ve formatı alır (log dizini aynı kalır)
+                Logger.apply_settings("log_settings", log_settings, None)
+                # config.yaml değiştiğinde log seviyelerini ve formatı güncelle
+                config_service.subscribe(Logger.apply_settings, sections=["log_settings"])
+            return Logger._config
+
+    @staticmethod
+    def get_levels(config):
+        """
+        Yapılandırmadaki konsol ve dosya log seviyelerini döndürür.
+        """
+        console_level = getattr(logging, config.get("console_level", "INFO").upper(), logging.INFO)
+        file_level = getattr(logging, config.get("file_level", "DEBUG").upper(), logging.DEBUG)
+        return console_level, file_level
+
+    @staticmethod
+    def apply_settings(section, log_settings, config):
+        """
+        Değişen log ayarlarını (seviyeler ve format) mevcut tüm logger'lara uygular.
+        ConfigService aboneliği olarak çağrılır. Log dizini ve dosya adı değişiklikleri yeniden başlatma gerektirir.
+        """
+        with Logger._lock:
+            if log_settings is None:
+                return
+            Logger._config = log_settings
+            console_level, file_level = Logger.get_levels(log_settings)
+            formatter = logging.Formatter(
+                fmt=log_settings.get("log_format", "%(asctime)s - [%(name)s] - %(levelname)s - %(message)s"),
+                datefmt=log_settings.get("date_format", "%Y-%m-%d %H:%M:%S"),
+            )
+
+            if Logger._file_handler is not None:
+                Logger._file_handler.setLevel(file_level)
+                Logger._file_handler.setFormatter(formatter)
+            for console_handler in Logger._console_handlers.values():
+                console_handler.setLevel(console_level)
+                console_handler.setFormatter(formatter)
+            for name in Logger._logger_names:
+                logging.getLogger(name).setLevel(min(console_level, file_level))
+
+    @staticmethod
+    def get_file_handler(config, formatter, file_level, max_bytes, backup_count):
+        """
+        Tüm logger'ların paylaştığı dosya handler'ını döndürür, ilk çağrıda oluşturur.
+        Dosya, ilk log kaydı yazılana kadar açılmaz (delay=True).
+        """
+        with Logger._lock:
+            if Logger._file_handler is None:
+                # Log dizinini al
+                log_dir = config.get("log_dir") or Logger.get_default_log_dir()
+                if not os.path.exists(log_dir):
+                    os.makedirs(log_dir)
+
+                # Log dosyasının adı (süreç başına tek dosya)
+                timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+                log_file_name = config.get("log_file_name", "rcp_log")
+                log_file = os.path.join(log_dir, f"{log_file_name}-{timestamp}.log")
+
+                file_handler = RotatingFileHandler(
+                    log_file,
+                    maxBytes=max_bytes,
+                    backupCount=backup_count,
+                    encoding="utf-8",
+                    delay=True,
+                )
+                file_handler.setFormatter(formatter)
+                file_handler.setLevel(file_level)
+                Logger._file_handler = file_handler
+            return Logger._file_handler
+
     @staticmethod
     def get_logger(name: str):
         """
@@ -67,22 +161,11 @@ class Logger:
         :param name: Logger adı (genelde modül adı)
         :return: logging.Logger instance
         """
-        # Yapılandırmayı yükle
-        config = Logger.load_config()
-
-        # Log dizinini al
-        log_dir = config.get("log_dir", Logger.get_default_log_dir())
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-
-        # Log dosyasının adı
-        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-        log_file_name = config.get("log_file_name", "rcp_log")
-        log_file = os.path.join(log_dir, f"{log_file_name}-{timestamp}.log")
+        # Yapılandırmayı yükle (önbellekten)
+        config = Logger.get_config()
 
         # Log seviyelerini al
-        console_level = getattr(logging, config.get("console_level", "INFO").upper(), logging.INFO)
-        file_level = getattr(logging, config.get("file_level", "DEBUG").upper(), logging.DEBUG)
+        console_level, file_level = Logger.get_levels(config)
 
         # Log formatını al
         log_format = config.get("log_format", "%(asctime)s - [%(name)s] - %(levelname)s - %(message)s")
@@ -103,16 +186,8 @@ class Logger:
             formatter = logging.Formatter(fmt=log_format, datefmt=date_format)
 
             if handlers.get("file", True):
-                # Dosya Handler
-                file_handler = RotatingFileHandler(
-                    log_file,
-                    maxBytes=max_bytes,
-                    backupCount=backup_count,
-                    encoding="utf-8",
-                )
-                file_handler.setFormatter(formatter)
-                file_handler.setLevel(file_level)
-                logger.addHandler(file_handler)
+                # Dosya Handler (tüm logger'lar için ortak)
+                logger.addHandler(Logger.get_file_handler(config, formatter, file_level, max_bytes, backup_count))
 
             if handlers.get("console", True):
                 # Konsol Handler
@@ -120,6 +195,8 @@ class Logger:
                 console_handler.setFormatter(formatter)
                 console_handler.setLevel(console_level)
                 logger.addHandler(console_handler)
+                Logger._console_handlers[name] = console_handler
 
         logger.setLevel(min(console_level, file_level))  # Genel log seviyesi, en düşük seviyeye ayarlanır.
+        Logger._logger_names.add(name)
         return logger
@@ -0,0 +1,156 @@
+import time
+import random
+from typing import Optional, Dict, Any, Callable
+
+from src.utils.gphoto_errors import GPhotoErrorInterpreter
+from src.utils.lazy_import import lazy_import
+
+gp = lazy_import("gphoto2")
+
+
+class RetryPolicy:
+    """
+    Retry behaviour for one class of gphoto2 errors.
+
+    The delay before retry ``n`` (0-based) is ``min(max_delay, base_delay * multiplier ** n)``,
+    randomised by +/- ``jitter`` (a fraction of the delay).
+    """
+
+    def __init__(self, max_attempts: int = 1, base_delay: float = 0.0, max_delay: float = 0.0,
+                 multiplier: float = 2.0, jitter: float = 0.0, reconnect: bool = False):
+        """
+        :param max_attempts: Total number of attempts, including the first one. 1 means fail fast.
+        :param base_delay: Delay before the first retry in seconds.
+        :param max_delay: Upper bound for a single delay in seconds.
+        :param multiplier: Growth factor of the delay between retries.
+        :param jitter: Random spread applied to each delay, as a fraction (0.2 = +/-20%).
+        :param reconnect: Reconnect the camera before retrying.
+        """
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max(max_delay, base_delay))
+        self.multiplier = float(multiplier)
+        self.jitter = float(jitter)
+        self.reconnect = bool(reconnect)
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any], defaults: "RetryPolicy") -> "RetryPolicy":
+        """Build a policy from a config section, falling back to ``defaults`` for missing keys."""
+        return cls(
+            max_attempts=values.get('max_attempts', defaults.max_attempts),
+            base_delay=values.get('base_delay', defaults.base_delay),
+            max_delay=values.get('max_delay', defaults.max_delay),
+            multiplier=values.get('multiplier', defaults.multiplier),
+            jitter=values.get('jitter', defaults.jitter),
+            reconnect=values.get('reconnect', defaults.reconnect),
+        )
+
+    def get_delay(self, retry_number: int) -> float:
+        """
+        :param retry_number: 0-based number of the retry about to happen.
+        :return: Seconds to wait before it.
+        """
+        delay = min(self.max_delay, self.base_delay * (self.multiplier ** retry_number))
+        if self.jitter:
+            delay *= random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+        return max(0.0, delay)
+
+
+class RetryEngine:
+    """
+    Runs camera operations and retries gphoto2 errors according to the policy of their error class.
+
+    Busy errors get a short jittered exponential backoff, I/O losses reconnect the camera before
+    retrying, and unsupported / not-found / storage errors fail fast. Unclassified errors use the
+    fixed ``retry_attempts`` / ``retry_delay`` of the ``capture`` config section.
+    """
+
+    DEFAULT_POLICIES = {
+        GPhotoErrorInterpreter.CLASS_BUSY: RetryPolicy(max_attempts=8, base_delay=0.05, max_delay=1.0, jitter=0.3),
+        GPhotoErrorInterpreter.CLASS_IO: RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=2.0, reconnect=True),
+        GPhotoErrorInterpreter.CLASS_UNSUPPORTED: RetryPolicy(max_attempts=1),
+        GPhotoErrorInterpreter.CLASS_NOT_FOUND: RetryPolicy(max_attempts=1),
+        GPhotoErrorInterpreter.CLASS_STORAGE: RetryPolicy(max_attempts=1),
+        GPhotoErrorInterpreter.CLASS_GENERIC: RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=1.0, multiplier=1.0),
+    }
+
+    def __init__(self, policies: Optional[Dict[str, RetryPolicy]] = None,
+                 reconnect: Optional[Callable[[], bool]] = None, logger=None):
+        """
+        :param policies: Policies per error class. Missing classes use DEFAULT_POLICIES.
+        :param reconnect: Callable that reconnects the camera and returns True on success.
+        :param logger: Logger used for retry messages.
+        """
+        self.__policies = dict(self.DEFAULT_POLICIES)
+        self.__policies.update(policies or {})
+        self.__reconnect = reconnect
+        self.__logger = logger
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], reconnect: Optional[Callable[[], bool]] = None,
+                    logger=None) -> "RetryEngine":
+        """
+        Build an engine from the ``retry`` and ``capture`` sections of the configuration.
+
+        :param config: Full configuration dictionary.
+        :param reconnect: Callable that reconnects the camera and returns True on success.
+        :param logger: Logger used for retry messages.
+        """
+        capture_config = config.get('capture', {})
+        generic_default = RetryPolicy(max_attempts=capture_config.get('retry_attempts', 3),
+                                      base_delay=capture_config.get('retry_delay', 1),
+                                      max_delay=capture_config.get('retry_delay', 1), multiplier=1.0)
+        defaults = dict(cls.DEFAULT_POLICIES, **{GPhotoErrorInterpreter.CLASS_GENERIC: generic_default})
+
+        retry_config = config.get('retry', {}) or {}
+        policies = {
+            error_class: RetryPolicy.from_dict(retry_config.get(error_class, {}) or {}, default)
+            for error_class, default in defaults.items()
+        }
+        return cls(policies, reconnect=reconnect, logger=logger)
+
+    def get_policy(self, error_class: str) -> RetryPolicy:
+        """Returns the policy used for an error class."""
+        return self.__policies.get(error_class, self.__policies[GPhotoErrorInterpreter.CLASS_GENERIC])
+
+    def run(self, operation: str, function: Callable[[], Any]) -> Any:
+        """
+        Call ``function`` and retry it on gphoto2 errors.
+
+        The function must look up the camera on every call, since a reconnect replaces it.
+
+        :param operation: Operation name used in log messages.
+        :param function: Zero-argument callable performing the camera operation.
+        :return: The return value of ``function``.
+        :raises gp.GPhoto2Error: The last error once its policy gives up.
+        """
+        attempts: Dict[str, int] = {}
+        while True:
+            try:
+                return function()
+            except gp.GPhoto2Error as e:
+                error_class = GPhotoErrorInterpreter.classify_error(e)
+                policy = self.get_policy(error_class)
+                attempts[error_class] = attempts.get(error_class, 0) + 1
+
+                if attempts[error_class] >= policy.max_attempts:
+                    if self.__logger and policy.max_attempts > 1:
+                        self.__logger.error(
+                            f"[{operation}] Giving up after {attempts[error_class]} attempt(s) on "
+                            f"{error_class} error: {GPhotoErrorInterpreter.interpret_error(e)}"
+                        )
+                    raise
+
+                delay = policy.get_delay(attempts[error_class] - 1)
+                if self.__logger:
+                    self.__logger.warning(
+                        f"[{operation}] {GPhotoErrorInterpreter.interpret_error(e)} ({error_class}), "
+                        f"retry {attempts[error_class]}/{policy.max_attempts - 1} in {delay * 1000:.0f} ms"
+                    )
+                time.sleep(delay)
+
+                if policy.reconnect and self.__reconnect:
+                    if not self.__reconnect():
+                        if self.__logger:
+                            self.__logger.error(f"[{operation}] Reconnect failed, giving up")
+                        raise
@@ -0,0 +1,94 @@
+import copy
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one.
+
+    While a call for a key is in flight, further ``do`` calls with the same key wait for it and receive its
+    result (or its exception) instead of starting their own. Nothing is cached: the next call after the
+    first one finishes runs again. Waiters get a deep copy of the result, so callers may modify it.
+
+    Every instance counts hits (coalesced calls) and misses (calls that ran); ``collect_stats`` sums the
+    counters of all live instances of this process by name.
+    """
+
+    _instances: "weakref.WeakSet[SingleFlight]" = weakref.WeakSet()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, name: str):
+        """
+        :param name: Name the counters are reported under, e.g. "camera_manager".
+        """
+        self.__name = name
+        self.__lock = threading.Lock()
+        self.__calls: Dict[Hashable, Dict[str, Any]] = {}
+        self.__hits = 0
+        self.__misses = 0
+        with SingleFlight._instances_lock:
+            SingleFlight._instances.add(self)
+
+    def get_name(self) -> str:
+        """Returns the name the counters are reported under."""
+        return self.__name
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """
+        Run ``function`` unless a call with the same key is already running, in which case wait for its result.
+
+        :param key: Identifies identical calls, e.g. ("config", "iso").
+        :param function: Zero-argument callable doing the actual read.
+        :return: The result of the call that ran.
+        """
+        with self.__lock:
+            call = self.__calls.get(key)
+            if call is None:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self.__calls[key] = call
+                self.__misses += 1
+                leader = True
+            else:
+                self.__hits += 1
+                leader = False
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return copy.deepcopy(call["result"])
+
+        try:
+            call["result"] = function()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self.__lock:
+                self.__calls.pop(key, None)
+            call["done"].set()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the hit, miss and in-flight counts of this instance."""
+        with self.__lock:
+            return {"hits": self.__hits, "misses": self.__misses, "in_flight": len(self.__calls)}
+
+    @classmethod
+    def collect_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Returns the counters of all live instances of this process, summed per name, with the hit ratio."""
+        with cls._instances_lock:
+            instances = list(cls._instances)
+
+        totals: Dict[str, Dict[str, Any]] = {}
+        for instance in instances:
+            stats = instance.get_stats()
+            total = totals.setdefault(instance.get_name(), {"hits": 0, "misses": 0, "in_flight": 0})
+            for key, value in stats.items():
+                total[key] += value
+        for total in totals.values():
+            calls = total["hits"] + total["misses"]
+            total["hit_ratio"] = round(total["hits"] / calls, 4) if calls else None
+        return totals
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIRECTORY not in sys.path:
+    sys.path.insert(0, ROOT_DIRECTORY)
+
+
+@pytest.fixture(autouse=True)
+def work_directory(tmp_path, monkeypatch):
+    """Runs every test in its own directory, so relative paths (logs, stores) never end up in the repository."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
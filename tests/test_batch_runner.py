@@ -0,0 +1,75 @@
+from src.modules.batch_runner import BatchRunner
+from src.utils.utils import sdict
+
+
+class FakeCapture:
+    def __init__(self):
+        self.calls = []
+
+    def capture_image(self, **params):
+        self.calls.append(("capture_image", params))
+        return sdict(True, data={"camera_path": "/DCIM/100/IMG_0001.JPG", "sizes": [10, 20, 30]})
+
+    def download_file(self, **params):
+        self.calls.append(("download_file", params))
+        return sdict(True, data=params)
+
+    def wait_until_ready(self, **params):
+        self.calls.append(("wait_until_ready", params))
+        return False
+
+
+def make_runner():
+    capture = FakeCapture()
+    return BatchRunner({"capture_handler": capture}), capture
+
+
+def test_references_resolve_fields_list_items_and_escapes():
+    runner, capture = make_runner()
+    result = runner.run([
+        {"op": "capture", "id": "shot"},
+        {"op": "download", "params": {"camera_path": "$shot.data.camera_path", "size": "$shot.data.sizes.-1",
+                                      "nested": {"items": ["$shot.data.sizes.0", "$$literal"]}}},
+    ])
+    assert result["success"], result["message"]
+    assert capture.calls[1] == ("download_file", {"camera_path": "/DCIM/100/IMG_0001.JPG", "size": 30,
+                                                   "nested": {"items": [10, "$literal"]}})
+
+
+def test_validate_rejects_forward_and_unknown_references():
+    runner, capture = make_runner()
+    forward = runner.validate([{"op": "download", "params": {"camera_path": "$shot.data.camera_path"}},
+                               {"op": "capture", "id": "shot"}])
+    assert not forward["success"] and "'shot'" in forward["message"]
+    assert capture.calls == []
+
+
+def test_validate_rejects_duplicate_ids_unknown_ops_and_path_parameters():
+    runner, _ = make_runner()
+    assert not runner.validate([{"op": "capture", "id": "a"}, {"op": "capture", "id": "a"}])["success"]
+    assert not runner.validate([{"op": "format_card"}])["success"]
+    assert not runner.validate([{"op": "sequence"}])["success"]   # No sequence_handler target
+    refused = runner.validate([{"op": "capture", "params": {"save_path": "/etc/passwd"}}])
+    assert not refused["success"] and "save_path" in refused["message"]
+
+
+def test_missing_field_fails_the_operation_and_skips_the_rest():
+    runner, capture = make_runner()
+    result = runner.run([
+        {"op": "capture", "id": "shot"},
+        {"op": "download", "params": {"camera_path": "$shot.data.missing"}},
+        {"op": "capture"},
+    ])
+    assert not result["success"]
+    entries = result["data"]["operations"]
+    assert "no field 'missing'" in entries[1]["result"]["message"]
+    assert entries[2] == {"index": 2, "id": None, "op": "capture", "success": False, "skipped": True}
+    assert [name for name, _ in capture.calls] == ["capture_image"]
+
+
+def test_continue_on_error_and_boolean_results():
+    runner, capture = make_runner()
+    result = runner.run([{"op": "wait_ready", "continue_on_error": True}, {"op": "capture"}])
+    assert not result["data"]["operations"][0]["success"]
+    assert result["success"]
+    assert [name for name, _ in capture.calls] == ["wait_until_ready", "capture_image"]
@@ -0,0 +1,91 @@
+import os
+import time
+
+import pytest
+
+from src.modules.capture_store import CaptureStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CaptureStore(str(tmp_path / "captures"))
+    yield store
+    store.close()
+
+
+def test_ids_are_monotonic_and_unique(store):
+    ids = [store.allocate()["capture_id"] for _ in range(200)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_ids_stay_ahead_of_the_index_after_a_restart(tmp_path):
+    root = str(tmp_path / "captures")
+    store = CaptureStore(root)
+    # An ID from the future (e.g. written before the clock was set back) must still never be reused
+    future_id = (time.time_ns() // 1000) + 3600 * 1_000_000
+    store.index(future_id, os.path.join(root, "future.jpg"), data=b"x")
+    store.close()
+
+    reopened = CaptureStore(root)
+    try:
+        assert reopened.allocate()["capture_id"] == future_id + 1
+    finally:
+        reopened.close()
+
+
+def test_allocate_puts_files_in_hour_shards(store):
+    allocation = store.allocate(".cr2")
+    shard = time.strftime('%Y/%m/%d/%H', time.localtime(allocation["created_at"]))
+    assert os.path.dirname(allocation["path"]) == os.path.join(store.get_root_directory(), shard)
+    assert allocation["path"].endswith(f"_{allocation['capture_id']}.cr2")
+
+
+def test_save_indexes_size_and_hash(store):
+    record = store.save(b"jpeg bytes", camera="Body A")
+    assert store.get(record["capture_id"]) == record
+    assert record["size"] == len(b"jpeg bytes")
+    with open(record["path"], "rb") as file:
+        assert file.read() == b"jpeg bytes"
+
+
+def test_keyset_pagination_returns_every_capture_once(store):
+    saved = [store.save(bytes([index]), camera="A" if index % 2 else "B")["capture_id"] for index in range(25)]
+
+    pages, after_id = [], None
+    while True:
+        page = store.query(limit=10, after_id=after_id)
+        if not page:
+            break
+        pages.append([record["capture_id"] for record in page])
+        after_id = page[-1]["capture_id"]
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [capture_id for page in pages for capture_id in page] == saved
+
+
+def test_keyset_pagination_newest_first_with_filter(store):
+    saved = [store.save(bytes([index]), camera="A" if index % 2 else "B")["capture_id"] for index in range(9)]
+    expected = [capture_id for index, capture_id in enumerate(saved) if index % 2][::-1]
+
+    first = store.query(camera="A", limit=3, newest_first=True)
+    second = store.query(camera="A", limit=3, newest_first=True, after_id=first[-1]["capture_id"])
+    assert [record["capture_id"] for record in first + second] == expected
+    assert store.count(camera="A") == len(expected)
+
+
+def test_pagination_is_stable_while_captures_are_added(store):
+    for index in range(5):
+        store.save(bytes([index]))
+    first = store.query(limit=3)
+    store.save(b"new")
+    second = store.query(limit=10, after_id=first[-1]["capture_id"])
+    ids = [record["capture_id"] for record in first + second]
+    assert len(ids) == 6 and ids == sorted(ids)
+
+
+def test_least_recently_used_prefers_unread_captures(store):
+    first, second, third = (store.save(bytes([index]))["capture_id"] for index in range(3))
+    store.touch(first)
+    order = [record["capture_id"] for record in store.least_recently_used()]
+    assert order == [second, third, first]
+    assert [record["capture_id"] for record in store.least_recently_used(offset=1)] == [third, first]
@@ -0,0 +1,104 @@
+import os
+import time
+import threading
+
+import yaml
+
+from src.utils.config_service import ConfigService, validate_config, DEFAULT_CONFIG_PATH
+
+
+def write_config(path, config):
+    with open(path, "w") as file:
+        yaml.safe_dump(config, file)
+
+
+def test_repository_config_is_valid():
+    with open(DEFAULT_CONFIG_PATH) as file:
+        assert validate_config(yaml.safe_load(file)) == []
+
+
+def test_type_errors_are_reported_per_key():
+    errors = validate_config({
+        "capture": {"retry_attempts": "3", "thumbnail_directory": None},
+        "storage": {"write_behind": 1, "capture_quota_mb": True},
+        "worker": {"shm_threshold": 65536},
+        "custom_section": {"anything": object()},
+    })
+    assert errors == ["capture.retry_attempts: expected int, got str",
+                      "storage.write_behind: expected bool, got int",
+                      "storage.capture_quota_mb: expected int or float, got bool"]
+
+
+def test_structural_errors():
+    assert validate_config(["not", "a", "mapping"]) == ["The configuration must be a mapping of sections"]
+    assert validate_config({"camera": "canon"}) == ["camera: expected a mapping"]
+    assert validate_config({"supervisor": {"shard_by": "serial"}}) == [
+        "supervisor.shard_by: expected 'bus' or 'count', got 'serial'"]
+    assert validate_config({"log_settings": {"console_level": "verbose"}}) == [
+        "log_settings.console_level: unknown level 'verbose'"]
+    assert validate_config({"retry": {"busy": {"max_attempts": 2.5}}}) == ["retry.busy.max_attempts: expected int"]
+
+
+def test_invalid_reload_keeps_the_previous_configuration(tmp_path):
+    path = str(tmp_path / "config.yaml")
+    write_config(path, {"capture": {"retry_attempts": 3}})
+    service = ConfigService(path)
+
+    write_config(path, {"capture": {"retry_attempts": "many"}})
+    result = service.reload(force=True)
+
+    assert not result["success"]
+    assert service.get_section("capture") == {"retry_attempts": 3}
+    assert service.get_errors() == ["capture.retry_attempts: expected int, got str"]
+
+
+def test_subscribers_are_notified_of_changed_sections_only(tmp_path):
+    path = str(tmp_path / "config.yaml")
+    write_config(path, {"capture": {"retry_attempts": 3}, "jobs": {"max_history": 10}})
+    service = ConfigService(path)
+    version = service.get_version()
+    received, capture_only = [], []
+    service.subscribe(lambda section, value, config: received.append((section, value)))
+    service.subscribe(lambda section, value, config: capture_only.append(section), sections=["capture"])
+
+    write_config(path, {"capture": {"retry_attempts": 3}, "jobs": {"max_history": 20}})
+    assert service.reload(force=True)["data"]["changed"] == ["jobs"]
+
+    assert received == [("jobs", {"max_history": 20})]
+    assert capture_only == []
+    assert service.get_version() == version + 1
+
+
+def test_racing_reloads_deliver_the_newest_configuration_last(tmp_path):
+    path = str(tmp_path / "config.yaml")
+    write_config(path, {"jobs": {"max_history": 0}})
+    service = ConfigService(path)
+    delivered = []
+
+    def slow_subscriber(section, value, config):
+        if value["max_history"] == 1:
+            time.sleep(0.3)
+        delivered.append(value["max_history"])
+
+    service.subscribe(slow_subscriber)
+    write_config(path, {"jobs": {"max_history": 1}})
+    first = threading.Thread(target=service.reload, kwargs={"force": True})
+    first.start()
+    time.sleep(0.1)
+    write_config(path, {"jobs": {"max_history": 2}})
+    service.reload(force=True)
+    first.join(5)
+
+    assert delivered == [1, 2]
+    assert service.get_section("jobs") == {"max_history": 2}
+
+
+def test_default_path_is_used_by_get_instance(tmp_path):
+    path = str(tmp_path / "other.yaml")
+    write_config(path, {"jobs": {"max_history": 5}})
+    try:
+        ConfigService.set_default_path(path)
+        assert ConfigService.get_instance().get_path() == os.path.abspath(path)
+    finally:
+        ConfigService.set_default_path(None)
+    assert ConfigService.get_instance().get_path() == os.path.abspath(DEFAULT_CONFIG_PATH)
@@ -0,0 +1,61 @@
+import json
+
+from src.utils.event_broadcaster import EventBroadcaster
+
+RESYNC = "event: resync\ndata: {}\n\n"
+
+
+def event_ids(chunk: str):
+    return [int(line[len("id: "):]) for line in chunk.splitlines() if line.startswith("id: ")]
+
+
+def test_new_subscriber_starts_with_the_next_event():
+    broadcaster = EventBroadcaster(heartbeat=0.01)
+    broadcaster.publish("old")
+    stream = broadcaster.stream()
+    assert next(stream) == "retry: 2000\n\n"
+    broadcaster.publish("file_added", {"name": "IMG_0001.JPG"})
+
+    chunk = next(stream)
+    assert event_ids(chunk) == [2]
+    payload = json.loads(chunk.split("data: ", 1)[1])
+    assert payload["type"] == "file_added" and payload["data"] == {"name": "IMG_0001.JPG"}
+    stream.close()
+    assert broadcaster.get_stats()["subscribers"] == 0
+
+
+def test_reconnect_resumes_after_last_event_id():
+    broadcaster = EventBroadcaster(heartbeat=0.01)
+    for index in range(5):
+        broadcaster.publish("tick", {"index": index})
+    stream = broadcaster.stream("2")
+    next(stream)
+    assert event_ids(next(stream)) == [3, 4, 5]
+
+
+def test_client_behind_the_buffer_is_told_to_resync():
+    broadcaster = EventBroadcaster(buffer_size=3, heartbeat=0.01)
+    for index in range(10):
+        broadcaster.publish("tick", {"index": index})
+    stream = broadcaster.stream("2")
+    next(stream)
+    assert next(stream) == RESYNC
+    assert event_ids(next(stream)) == [8, 9, 10]
+
+
+def test_client_ahead_of_the_server_is_told_to_resync():
+    # A Last-Event-ID from before a server restart is ahead of the new sequence numbers
+    broadcaster = EventBroadcaster(heartbeat=0.01)
+    broadcaster.publish("tick")
+    stream = broadcaster.stream("500")
+    assert next(stream) == "retry: 2000\n\n"
+    assert next(stream) == RESYNC
+    broadcaster.publish("tick")
+    assert event_ids(next(stream)) == [2]
+
+
+def test_idle_stream_sends_keep_alives():
+    broadcaster = EventBroadcaster(heartbeat=0.01)
+    stream = broadcaster.stream()
+    next(stream)
+    assert next(stream) == ": keep-alive\n\n"
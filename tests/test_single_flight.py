@@ -0,0 +1,89 @@
+import time
+import threading
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+def run_concurrently(single_flight, key, function, count):
+    """Starts ``count`` callers of the same key while the leader is blocked, and returns their results."""
+    results, errors = [None] * count, [None] * count
+
+    def call(index):
+        try:
+            results[index] = single_flight.do(key, function)
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(single_flight, hits):
+    for _ in range(500):
+        if single_flight.get_stats()["hits"] >= hits:
+            return
+        time.sleep(0.01)
+    raise AssertionError("callers did not join the call in flight")
+
+
+def test_concurrent_calls_share_one_execution():
+    single_flight = SingleFlight("test")
+    release, calls = threading.Event(), []
+
+    def read():
+        calls.append(1)
+        release.wait(5)
+        return {"value": [1, 2]}
+
+    threads, results, errors = run_concurrently(single_flight, "key", read, 8)
+    wait_for_waiters(single_flight, 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"value": [1, 2]}] * 8 and errors == [None] * 8
+    # Waiters get copies, so one caller modifying its result does not affect the others
+    assert len({id(result) for result in results}) == 8
+    assert single_flight.get_stats() == {"hits": 7, "misses": 1, "in_flight": 0}
+
+
+def test_waiters_receive_the_exception():
+    single_flight = SingleFlight("test")
+    release = threading.Event()
+
+    def read():
+        release.wait(5)
+        raise ValueError("camera busy")
+
+    threads, results, errors = run_concurrently(single_flight, "key", read, 3)
+    wait_for_waiters(single_flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert all(isinstance(error, ValueError) for error in errors)
+
+
+def test_nothing_is_cached_between_calls_and_keys_are_independent():
+    single_flight = SingleFlight("test")
+    calls = []
+    for key in ("a", "a", "b"):
+        single_flight.do(key, lambda: calls.append(key))
+    assert calls == ["a", "a", "b"]
+    assert single_flight.get_stats()["misses"] == 3
+
+    with pytest.raises(KeyError):
+        single_flight.do("a", lambda: {}["missing"])
+    assert single_flight.do("a", lambda: "recovered") == "recovered"
+
+
+def test_collect_stats_sums_instances_by_name():
+    first, second = SingleFlight("collect_test"), SingleFlight("collect_test")
+    first.do("key", lambda: None)
+    second.do("key", lambda: None)
+    stats = SingleFlight.collect_stats()["collect_test"]
+    assert stats["misses"] == 2 and stats["hits"] == 0 and stats["hit_ratio"] == 0.0
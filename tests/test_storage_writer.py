@@ -0,0 +1,97 @@
+import os
+import time
+
+import pytest
+
+from src.modules.capture_store import CaptureStore
+from src.modules.storage_writer import StorageWriter, MB
+
+FILE_SIZE = 1000
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CaptureStore(str(tmp_path / "captures"))
+    yield store
+    store.close()
+
+
+def make_writer(write_behind: bool = False) -> StorageWriter:
+    return StorageWriter(write_behind=write_behind, fsync=False, min_free_mb=0, flush_interval=0.01)
+
+
+def write_capture(writer: StorageWriter, store: CaptureStore, created_at: float = None) -> dict:
+    """Writes a capture through the writer and indexes it, as CaptureHandler does."""
+    allocation = store.allocate()
+    data = os.urandom(FILE_SIZE)
+    writer.submit(allocation["path"], data)
+    writer.wait_for(allocation["path"], timeout=5)
+    return store.index(allocation["capture_id"], allocation["path"], data=data, created_at=created_at)
+
+
+def test_quota_evicts_least_recently_used_captures(store):
+    writer = make_writer()
+    writer.register(store.get_root_directory(), store, quota_mb=2.5 * FILE_SIZE / MB)
+    first, second = write_capture(writer, store), write_capture(writer, store)
+    store.touch(first["capture_id"])
+
+    third = write_capture(writer, store)
+
+    assert os.path.exists(first["path"]) and os.path.exists(third["path"])
+    assert not os.path.exists(second["path"])
+    assert store.get(second["capture_id"]) is None
+    assert writer.get_stats()["evicted"] == 1
+
+
+def test_quota_is_enforced_on_register(store):
+    writer = make_writer()
+    records = [write_capture(writer, store) for _ in range(4)]
+
+    writer.register(store.get_root_directory(), store, quota_mb=2 * FILE_SIZE / MB)
+
+    assert [os.path.exists(record["path"]) for record in records] == [False, False, True, True]
+    assert store.total_size() == 2 * FILE_SIZE
+
+
+def test_age_limit_evicts_old_captures_only(store):
+    writer = make_writer()
+    old = write_capture(writer, store, created_at=time.time() - 3 * 3600)
+    recent = write_capture(writer, store)
+
+    writer.register(store.get_root_directory(), store, max_age_hours=1)
+
+    assert not os.path.exists(old["path"])
+    assert os.path.exists(recent["path"])
+    assert store.count() == 1
+
+
+def test_retention_never_touches_files_outside_the_directory(store, tmp_path):
+    writer = make_writer()
+    outside = tmp_path / "elsewhere.jpg"
+    outside.write_bytes(b"x" * FILE_SIZE)
+    store.index(store.allocate()["capture_id"], str(outside), created_at=time.time() - 3 * 3600)
+    inside = write_capture(writer, store, created_at=time.time() - 3 * 3600)
+
+    writer.register(store.get_root_directory(), store, quota_mb=FILE_SIZE / (2 * MB), max_age_hours=1)
+
+    assert outside.exists()
+    assert not os.path.exists(inside["path"])
+
+
+def test_write_behind_files_are_not_evicted_before_they_are_written(store):
+    writer = make_writer(write_behind=True)
+    try:
+        writer.register(store.get_root_directory(), store, quota_mb=1.5 * FILE_SIZE / MB)
+        records = [write_capture(writer, store) for _ in range(3)]
+        assert writer.flush(timeout=5)
+        assert os.path.exists(records[-1]["path"])
+        assert store.total_size() <= 2 * FILE_SIZE
+    finally:
+        writer.close()
+
+
+def test_synchronous_write_errors_are_raised(tmp_path):
+    writer = make_writer()
+    with pytest.raises(OSError):
+        writer.submit(str(tmp_path / "missing" / "file.jpg"), b"data")
+    assert writer.get_stats()["failed"] == 1